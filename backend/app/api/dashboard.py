@@ -11,6 +11,7 @@ from sqlalchemy import func, and_
 
 from app.api.deps import get_db, get_current_active_user
 from app import models, schemas
+from app.services.habit_rollup import daily_rollup
 
 router = APIRouter(prefix="/dashboard", tags=["仪表盘"])
 
@@ -79,20 +80,15 @@ def get_dashboard_stats(
         models.Task.completed_at >= week_start
     ).count()
     
-    # 近7天打卡热力图数据
+    # 近7天打卡热力图数据（读取每日汇总，一次查询）
+    rollup = daily_rollup(db, current_user.id, today - timedelta(days=6), today)
     heatmap_data = []
     for i in range(6, -1, -1):
         check_date = today - timedelta(days=i)
-        
-        # 计算当天的总打卡次数
-        total_checks = db.query(func.sum(models.HabitLog.count)).filter(
-            models.HabitLog.user_id == current_user.id,
-            models.HabitLog.date == check_date
-        ).scalar() or 0
-        
+        row = rollup.get(check_date)
         heatmap_data.append({
             "date": check_date.isoformat(),
-            "count": int(total_checks)
+            "count": row.checkins if row else 0
         })
     
     return {
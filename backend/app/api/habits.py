@@ -11,6 +11,7 @@ from sqlalchemy import func, and_
 
 from app.api.deps import get_db, get_current_active_user
 from app import models, schemas
+from app.services.habit_rollup import record_checkin, remove_habit_checkins
 
 router = APIRouter(prefix="/habits", tags=["习惯追踪"])
 
@@ -122,6 +123,8 @@ def delete_habit(
     if not habit:
         raise HTTPException(status_code=404, detail="习惯不存在")
     
+    # 打卡记录随习惯一起删除，先从每日汇总中扣减
+    remove_habit_checkins(db, habit)
     db.delete(habit)
     db.commit()
     
@@ -208,6 +211,8 @@ def check_in_habit(
         )
         db.add(log)
     
+    # 每日汇总与打卡记录在同一事务中提交
+    record_checkin(db, current_user.id, today, 1)
     db.commit()
     db.refresh(log)
     return log
@@ -11,6 +11,7 @@ from sqlalchemy import func, and_
 
 from app.api.deps import get_db, get_current_active_user
 from app import models, schemas
+from app.services.loaders import GOAL_KEY_RESULTS, PROJECT_MILESTONES
 from app.models.task import TaskStatus
 from app.models.goal import GoalStatus, GoalPeriod
 from app.models.project import ProjectStatus
@@ -98,45 +99,51 @@ def get_period_summary(
         start_date = date(year, 1, 1)
         end_date = date(year, 12, 31)
     
-    # 任务统计
-    tasks_query = db.query(models.Task).filter(
+    # 任务统计（总数和完成数用 FILTER 子句在一次聚合中算出）
+    period_filter = and_(
         models.Task.user_id == current_user.id,
         models.Task.created_at >= start_date,
         models.Task.created_at <= end_date + timedelta(days=1)
     )
-    total_tasks = tasks_query.count()
-    completed_tasks = tasks_query.filter(models.Task.status == TaskStatus.COMPLETED).count()
-    completed_tasks_list = tasks_query.filter(models.Task.status == TaskStatus.COMPLETED).order_by(models.Task.completed_at.desc()).all()
+    total_tasks, completed_tasks = db.query(
+        func.count(models.Task.id),
+        func.count(models.Task.id).filter(models.Task.status == TaskStatus.COMPLETED)
+    ).filter(period_filter).one()
+    completed_tasks_list = db.query(models.Task).filter(
+        period_filter,
+        models.Task.status == TaskStatus.COMPLETED
+    ).order_by(models.Task.completed_at.desc()).limit(10).all()
     
     tasks_summary = {
         "total": total_tasks,
         "completed": completed_tasks,
         "completion_rate": round(completed_tasks / total_tasks * 100, 1) if total_tasks > 0 else 0,
-        "completed_list": [{"id": t.id, "title": t.title, "completed_at": t.completed_at.isoformat() if t.completed_at else None} for t in completed_tasks_list[:10]]
+        "completed_list": [{"id": t.id, "title": t.title, "completed_at": t.completed_at.isoformat() if t.completed_at else None} for t in completed_tasks_list]
     }
     
-    # 习惯统计
+    # 习惯统计（各习惯的打卡次数一次分组求和）
     habits = db.query(models.Habit).filter(models.Habit.user_id == current_user.id, models.Habit.is_active == True).all()
+    checkin_counts = dict(db.query(HabitLog.habit_id, func.sum(HabitLog.count)).filter(
+        HabitLog.user_id == current_user.id,
+        HabitLog.date >= start_date,
+        HabitLog.date <= end_date
+    ).group_by(HabitLog.habit_id).all())
     habits_summary = []
     total_checkins = 0
     total_target = 0
     
     for habit in habits:
+        count = int(checkin_counts.get(habit.id) or 0)
+        total_checkins += count
         if period == models.ReviewPeriod.DAILY:
-            check_date = end_date
-            log = db.query(HabitLog).filter(HabitLog.habit_id == habit.id, HabitLog.date == check_date).first()
-            count = log.count if log else 0
-            target = habit.get_target_for_date(check_date)
+            target = habit.get_target_for_date(end_date)
         else:
-            logs = db.query(HabitLog).filter(HabitLog.habit_id == habit.id, HabitLog.date >= start_date, HabitLog.date <= end_date).all()
-            count = sum(log.count for log in logs)
             if period == models.ReviewPeriod.WEEKLY:
                 target = habit.get_weekly_target_total()
             else:
                 days = (end_date - start_date).days + 1
                 target = days * habit.times_per_day
         
-        total_checkins += count
         total_target += target
         habits_summary.append({
             "id": habit.id, "name": habit.name, "icon": habit.icon, "color": habit.color,
@@ -151,33 +158,33 @@ def get_period_summary(
     
     # 目标进度
     if period == models.ReviewPeriod.DAILY:
-        related_goals = db.query(models.Goal).filter(
+        related_goals = db.query(models.Goal).options(GOAL_KEY_RESULTS).filter(
             models.Goal.user_id == current_user.id,
             models.Goal.period.in_([GoalPeriod.MONTH, GoalPeriod.QUARTER, GoalPeriod.YEAR]),
             models.Goal.year == year, models.Goal.status == GoalStatus.ACTIVE
         ).all()
     elif period == models.ReviewPeriod.WEEKLY:
-        related_goals = db.query(models.Goal).filter(
+        related_goals = db.query(models.Goal).options(GOAL_KEY_RESULTS).filter(
             models.Goal.user_id == current_user.id,
             models.Goal.period.in_([GoalPeriod.MONTH, GoalPeriod.QUARTER]),
             models.Goal.year == year, models.Goal.status == GoalStatus.ACTIVE
         ).all()
     elif period == models.ReviewPeriod.MONTHLY:
-        related_goals = db.query(models.Goal).filter(
+        related_goals = db.query(models.Goal).options(GOAL_KEY_RESULTS).filter(
             models.Goal.user_id == current_user.id,
             models.Goal.period.in_([GoalPeriod.MONTH, GoalPeriod.QUARTER, GoalPeriod.YEAR]),
             models.Goal.year == year, models.Goal.month == month if month else True,
             models.Goal.status.in_([GoalStatus.ACTIVE, GoalStatus.COMPLETED])
         ).all()
     elif period == models.ReviewPeriod.QUARTERLY:
-        related_goals = db.query(models.Goal).filter(
+        related_goals = db.query(models.Goal).options(GOAL_KEY_RESULTS).filter(
             models.Goal.user_id == current_user.id,
             models.Goal.period.in_([GoalPeriod.QUARTER, GoalPeriod.YEAR]),
             models.Goal.year == year, models.Goal.quarter == quarter if quarter else True,
             models.Goal.status.in_([GoalStatus.ACTIVE, GoalStatus.COMPLETED])
         ).all()
     else:
-        related_goals = db.query(models.Goal).filter(
+        related_goals = db.query(models.Goal).options(GOAL_KEY_RESULTS).filter(
             models.Goal.user_id == current_user.id,
             models.Goal.period.in_([GoalPeriod.LIFE, GoalPeriod.YEAR]),
             models.Goal.year == year,
@@ -195,22 +202,23 @@ def get_period_summary(
     goals_data = {"total": len(goals_summary), "goals": goals_summary}
     
     # 项目里程碑
-    projects = db.query(models.Project).filter(
+    projects = db.query(models.Project).options(PROJECT_MILESTONES).filter(
         models.Project.user_id == current_user.id,
         models.Project.status.in_([ProjectStatus.ACTIVE, ProjectStatus.COMPLETED])
     ).all()
     
+    # 各项目本周期新建的任务数（一次分组计数）
+    project_task_counts = dict(db.query(models.Task.project_id, func.count(models.Task.id)).filter(
+        period_filter,
+        models.Task.project_id.in_([p.id for p in projects])
+    ).group_by(models.Task.project_id).all()) if projects else {}
+    
     projects_summary = []
     for project in projects:
         milestones = [{"id": pg.id, "title": pg.title, "completed": pg.is_completed, "sort_order": pg.sort_order} for pg in project.project_goals]
-        project_tasks = db.query(models.Task).filter(
-            models.Task.project_id == project.id,
-            models.Task.created_at >= start_date,
-            models.Task.created_at <= end_date + timedelta(days=1)
-        ).all()
         projects_summary.append({
             "id": project.id, "name": project.name, "progress": project.progress,
-            "status": project.status.value, "milestones": milestones, "tasks_count": len(project_tasks)
+            "status": project.status.value, "milestones": milestones, "tasks_count": project_task_counts.get(project.id, 0)
         })
     
     projects_data = {"total": len(projects_summary), "projects": projects_summary}
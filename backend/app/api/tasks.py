@@ -11,6 +11,7 @@ from sqlalchemy import or_
 
 from app.api.deps import get_db, get_current_active_user
 from app import models, schemas
+from app.services.project_counters import NO_PROJECT, task_counter_state, apply_task_counter_change
 
 router = APIRouter(prefix="/tasks", tags=["任务管理"])
 
@@ -40,8 +41,9 @@ def list_tasks(
     if goal_id:
         query = query.filter(models.Task.goal_id == goal_id)
     
+    # priority_rank 是整数等级（枚举按名称存储，直接按 priority 排序是字母序），与索引顺序一致
     tasks = query.order_by(
-        models.Task.priority.desc(),
+        models.Task.priority_rank.desc(),
         models.Task.due_date.asc()
     ).all()
     
@@ -69,7 +71,7 @@ def get_today_tasks(
             models.Task.due_date <= today
         ),
         models.Task.status != models.TaskStatus.COMPLETED
-    ).order_by(models.Task.priority.desc()).all()
+    ).order_by(models.Task.priority_rank.desc()).all()
     
     return tasks
 
@@ -99,6 +101,8 @@ def create_task(
         **task_in.model_dump()
     )
     db.add(db_task)
+    db.flush()
+    apply_task_counter_change(db, NO_PROJECT, task_counter_state(db_task))
     db.commit()
     db.refresh(db_task)
     return db_task
@@ -138,10 +142,14 @@ def update_task(
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
     
+    counter_before = task_counter_state(task)
+    
     # 更新字段
     for field, value in task_in.model_dump(exclude_unset=True).items():
         setattr(task, field, value)
     
+    # 状态或所属项目变化时更新项目任务计数
+    apply_task_counter_change(db, counter_before, task_counter_state(task))
     db.commit()
     db.refresh(task)
     return task
@@ -164,9 +172,11 @@ def complete_task(
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
     
+    counter_before = task_counter_state(task)
     task.status = models.TaskStatus.COMPLETED
     task.completed_at = datetime.utcnow()
     
+    apply_task_counter_change(db, counter_before, task_counter_state(task))
     db.commit()
     db.refresh(task)
     return task
@@ -187,6 +197,7 @@ def delete_task(
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
     
+    apply_task_counter_change(db, task_counter_state(task), NO_PROJECT)
     db.delete(task)
     db.commit()
     
@@ -19,6 +19,52 @@ class Settings(BaseSettings):
     # 数据库配置（开发环境使用 SQLite，生产环境使用 PostgreSQL）
     DATABASE_URL: str = "sqlite:///./lifeflow.db"
     
+    # 连接池配置（PostgreSQL 等服务端数据库生效，SQLite 写连接不使用）
+    DB_POOL_SIZE: int = 10            # 常驻连接数
+    DB_MAX_OVERFLOW: int = 20         # 高峰期允许额外创建的连接数
+    DB_POOL_PRE_PING: bool = True     # 取出连接前先检测是否可用（数据库重启、网络闪断后自动重连）
+    DB_POOL_RECYCLE: int = 1800       # 连接最长使用秒数，避免被服务端/防火墙静默断开
+    
+    # SQLite 存储配置（见 app/db/database.py 中的 SQLITE_PROFILES）
+    # default: SQLite 默认设置；production: WAL + mmap 等并发/性能调优
+    SQLITE_PROFILE: str = "default"
+    
+    # 只读连接（GET 请求使用）：PostgreSQL 可指向只读副本，留空则连接主库
+    DATABASE_READ_URL: str = ""
+    READ_POOL_SIZE: int = 5
+    READ_MAX_OVERFLOW: int = 10
+    
+    # 异步数据库连接（只读，留空则由只读连接地址推导：SQLite 使用 aiosqlite，PostgreSQL 使用 asyncpg）
+    ASYNC_DATABASE_URL: str = ""
+    
+    # 在线备份（仅 SQLite，见 app/db/backup.py）
+    BACKUP_DIR: str = "./backups"
+    BACKUP_KEEP: int = 7                 # 保留最近几份
+    BACKUP_COMPRESS: bool = True         # gzip 压缩
+    BACKUP_PAGES_PER_STEP: int = 256     # 每批复制的页数，越小写请求被阻塞的时间越短
+    BACKUP_STEP_SLEEP: float = 0.005     # 两批之间休眠的秒数，让出锁给写请求
+    BACKUP_MAX_RESTARTS: int = 3         # 分批复制被写入打断重来的次数上限，超过后一次复制完
+    
+    # 增量复制（仅 SQLite，见 app/db/replication.py），REPLICA_DIR 留空则不启动
+    REPLICA_DIR: str = ""
+    REPLICA_INTERVAL: float = 60         # 复制间隔（秒），即最多丢失多长时间的数据
+    REPLICA_FULL_EVERY: int = 360        # 每多少个增量快照生成一次全量快照
+    REPLICA_KEEP_FULL: int = 8           # 保留最近几轮（全量 + 其后的增量）
+    
+    # 仪表盘结果缓存（进程内 LRU，见 app/services/dashboard.py），0 表示不缓存
+    DASHBOARD_CACHE_SIZE: int = 1024
+    
+    # SQL 编译缓存（SQLAlchemy query_cache_size）：每个引擎缓存的已编译语句条数，
+    # 命中率见 GET /api/admin/cache，未命中次数持续增长时调大
+    SQL_COMPILED_CACHE_SIZE: int = 500
+    
+    # 数据导出（见 app/services/export.py）：每次从游标读取、编码并发送的行数
+    EXPORT_BATCH_SIZE: int = 1000
+    
+    # 实时事件推送（SSE，见 app/services/events.py）
+    SSE_QUEUE_SIZE: int = 100            # 每个订阅者最多积压的事件数，超出后丢弃并通知客户端全量刷新
+    SSE_HEARTBEAT: float = 15            # 心跳间隔（秒），防止代理断开空闲连接
+    
     # JWT密钥（生产环境必须用强密码）
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
     ALGORITHM: str = "HS256"
@@ -0,0 +1,248 @@
+"""
+在线备份（仅 SQLite）
+
+直接 cp 正在使用的数据库文件，要么得到写了一半的损坏副本，要么只能先停服务。
+这里使用 SQLite 的在线备份接口（sqlite3.Connection.backup），分两种方式：
+- 分批复制：每次只复制 BACKUP_PAGES_PER_STEP 页，两批之间释放锁并短暂休眠，写请求最多只会被阻塞一批页面的时间。
+  但两批之间只要有其他连接写入，SQLite 就会从第一页重新复制，写入不断时可能永远复制不完
+- 一次复制：在一个读事务里复制全部页面（pages=-1），不会被写入打断，得到一致的快照；
+  WAL 模式下读事务不阻塞写入，回滚日志模式下写请求要等这次复制结束
+
+先分批复制，被写入打断重来超过 BACKUP_MAX_RESTARTS 次后改为一次复制，备份一定能完成；
+结果中的 restarts / mode 记录了实际走的是哪一种。
+
+备份文件名为 lifeflow-YYYYmmdd-HHMMSS.db（压缩时为 .db.gz），保留最近 BACKUP_KEEP 份。
+
+用法：
+    python -m app.db.backup                     # 按配置备份到 BACKUP_DIR
+    python -m app.db.backup --dir /opt/backup --keep 14 --no-compress
+    python -m app.db.backup --list              # 列出已有备份
+"""
+import argparse
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.engine import make_url
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+BACKUP_PREFIX = "lifeflow-"
+_BACKUP_FILE = re.compile(r"^lifeflow-\d{8}-\d{6}\.db(\.gz)?$")
+
+# (已复制页数, 总页数) 进度回调
+ProgressCallback = Callable[[int, int], None]
+
+# 同一时间只允许一个备份任务
+_backup_lock = threading.Lock()
+
+# 备份状态与指标（管理接口读取）
+backup_status: Dict[str, object] = {
+    "running": False,
+    "pages_copied": 0,
+    "pages_total": 0,
+    "started_at": None,
+    "last_result": None,
+    "last_error": None,
+    "total_runs": 0,
+    "failed_runs": 0,
+}
+
+
+class BackupInProgress(RuntimeError):
+    """已有备份任务在执行"""
+
+
+class _BackupRestarted(Exception):
+    """分批复制被写入打断的次数超过上限（在进度回调中抛出，中止这次复制）"""
+
+
+def sqlite_database_path(url: Optional[str] = None) -> str:
+    """从数据库连接地址取 SQLite 文件路径；不是文件型 SQLite 时抛出 ValueError"""
+    url = make_url(url or settings.DATABASE_URL)
+    if url.get_backend_name() != "sqlite":
+        raise ValueError("在线备份仅支持 SQLite，PostgreSQL 请使用 pg_dump")
+    if not url.database or url.database == ":memory:":
+        raise ValueError("内存数据库无法备份")
+    return os.path.abspath(url.database)
+
+
+def list_backups(backup_dir: Optional[str] = None) -> List[Dict[str, object]]:
+    """已有的备份文件（按时间从新到旧）"""
+    backup_dir = backup_dir or settings.BACKUP_DIR
+    if not os.path.isdir(backup_dir):
+        return []
+    names = sorted((n for n in os.listdir(backup_dir) if _BACKUP_FILE.match(n)), reverse=True)
+    return [
+        {"file": name, "size": os.path.getsize(os.path.join(backup_dir, name))}
+        for name in names
+    ]
+
+
+def rotate_backups(backup_dir: str, keep: int) -> List[str]:
+    """只保留最近 keep 份备份，返回删除的文件名"""
+    removed = []
+    for item in list_backups(backup_dir)[max(keep, 1):]:
+        os.remove(os.path.join(backup_dir, item["file"]))
+        removed.append(item["file"])
+    return removed
+
+
+def _compress(path: str) -> str:
+    """gzip 压缩并删除原文件，返回压缩后的路径"""
+    gz_path = path + ".gz"
+    with open(path, "rb") as src, gzip.open(gz_path + ".part", "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(gz_path + ".part", gz_path)
+    os.remove(path)
+    return gz_path
+
+
+def reserve_backup() -> None:
+    """
+    占用备份任务并标记为执行中（接口安排后台任务前调用），已有备份在执行时抛出 BackupInProgress
+
+    检查和占用是原子的，并发的两个请求只有一个能成功；成功后必须调用 run_backup(reserved=True)，由它释放
+    """
+    if not _backup_lock.acquire(blocking=False):
+        raise BackupInProgress("已有备份任务在执行")
+    backup_status["running"] = True
+
+
+def run_backup(
+    backup_dir: Optional[str] = None,
+    keep: Optional[int] = None,
+    compress: Optional[bool] = None,
+    pages_per_step: Optional[int] = None,
+    max_restarts: Optional[int] = None,
+    source: Optional[str] = None,
+    progress: Optional[ProgressCallback] = None,
+    reserved: bool = False,
+) -> Dict[str, object]:
+    """
+    执行一次在线备份，返回本次备份的结果与指标
+
+    先每批 pages_per_step 页分批复制；期间被其他连接的写入打断重来超过 max_restarts 次时，
+    放弃分批、改为在一个读事务里一次复制完（回滚日志模式下这段时间写请求需要等待）。
+    未传入的参数使用配置中的 BACKUP_* 默认值；已有备份在执行时抛出 BackupInProgress。
+    reserved 为 True 表示调用方已经用 reserve_backup 占用了备份任务（结束时同样由这里释放）
+    """
+    if not reserved and not _backup_lock.acquire(blocking=False):
+        raise BackupInProgress("已有备份任务在执行")
+    part_path = None
+    try:
+        backup_dir = backup_dir or settings.BACKUP_DIR
+        keep = settings.BACKUP_KEEP if keep is None else keep
+        compress = settings.BACKUP_COMPRESS if compress is None else compress
+        pages_per_step = pages_per_step or settings.BACKUP_PAGES_PER_STEP
+        max_restarts = settings.BACKUP_MAX_RESTARTS if max_restarts is None else max_restarts
+        source = source or sqlite_database_path()
+        backup_status.update(running=True, pages_copied=0, pages_total=0,
+                             started_at=datetime.now().isoformat(), last_error=None)
+        os.makedirs(backup_dir, exist_ok=True)
+        name = f"{BACKUP_PREFIX}{datetime.now().strftime('%Y%m%d-%H%M%S')}.db"
+        path = os.path.join(backup_dir, name)
+        part_path = path + ".part"
+        steps = restarts = copied = 0
+
+        def on_progress(status, remaining, total):
+            nonlocal steps, restarts, copied
+            steps += 1
+            # 已复制页数变少：源库被写入，SQLite 从头重新复制
+            if total - remaining < copied:
+                restarts += 1
+                if restarts > max_restarts:
+                    raise _BackupRestarted()
+            copied = total - remaining
+            backup_status.update(pages_copied=copied, pages_total=total)
+            if progress:
+                progress(copied, total)
+
+        start = time.perf_counter()
+        mode = "batched"
+        src = sqlite3.connect(source, timeout=30)
+        try:
+            dst = sqlite3.connect(part_path)
+            try:
+                src.backup(dst, pages=pages_per_step, progress=on_progress, sleep=settings.BACKUP_STEP_SLEEP)
+            except _BackupRestarted:
+                mode = "single_step"
+                copied = 0
+                src.backup(dst, pages=-1, progress=on_progress)
+            finally:
+                dst.close()
+        finally:
+            src.close()
+        os.replace(part_path, path)
+        copy_ms = (time.perf_counter() - start) * 1000
+
+        if compress:
+            path = _compress(path)
+        removed = rotate_backups(backup_dir, keep)
+
+        result = {
+            "file": os.path.basename(path),
+            "path": path,
+            "size": os.path.getsize(path),
+            "pages": backup_status["pages_total"],
+            "steps": steps,
+            "restarts": restarts,
+            "mode": mode,
+            "compressed": compress,
+            "copy_ms": round(copy_ms, 1),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+            "removed": removed,
+            "finished_at": datetime.now().isoformat(),
+        }
+        backup_status.update(last_result=result, total_runs=backup_status["total_runs"] + 1)
+        return result
+    except Exception as e:
+        backup_status.update(last_error=str(e), failed_runs=backup_status["failed_runs"] + 1)
+        if part_path and os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    finally:
+        backup_status["running"] = False
+        _backup_lock.release()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite 在线备份")
+    parser.add_argument("--dir", default=None, help="备份目录（默认 BACKUP_DIR）")
+    parser.add_argument("--keep", type=int, default=None, help="保留份数（默认 BACKUP_KEEP）")
+    parser.add_argument("--no-compress", action="store_true", help="不压缩")
+    parser.add_argument("--pages", type=int, default=None, help="每批复制的页数（默认 BACKUP_PAGES_PER_STEP）")
+    parser.add_argument("--max-restarts", type=int, default=None,
+                        help="分批复制被写入打断重来的次数上限，超过后一次复制完（默认 BACKUP_MAX_RESTARTS）")
+    parser.add_argument("--list", action="store_true", help="列出已有备份")
+    args = parser.parse_args()
+
+    if args.list:
+        for item in list_backups(args.dir):
+            print(f"[BACKUP] {item['file']}  {item['size']} 字节")
+        raise SystemExit(0)
+
+    def print_progress(copied: int, total: int) -> None:
+        print(f"\r[BACKUP] {copied}/{total} 页", end="", flush=True)
+
+    result = run_backup(
+        backup_dir=args.dir,
+        keep=args.keep,
+        compress=False if args.no_compress else None,
+        pages_per_step=args.pages,
+        max_restarts=args.max_restarts,
+        progress=print_progress,
+    )
+    print()
+    print(f"[BACKUP] 已备份到 {result['path']}（{result['size']} 字节，{result['pages']} 页，"
+          f"{result['steps']} 批，重来 {result['restarts']} 次，用时 {result['duration_ms']}ms）")
+    for name in result["removed"]:
+        print(f"[BACKUP] 已删除过期备份 {name}")
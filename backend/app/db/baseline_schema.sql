@@ -0,0 +1,169 @@
+-- 初始版本（迁移 1 之前）的数据库结构，python -m app.db.migration_check 用它检查旧库能否升级到最新版本
+-- 由当时的模型 create_all 生成（sqlite3 .schema），不要修改
+CREATE TABLE users (
+	id INTEGER NOT NULL, 
+	username VARCHAR(50) NOT NULL, 
+	email VARCHAR(100), 
+	hashed_password VARCHAR(255) NOT NULL, 
+	life_vision VARCHAR(1000), 
+	is_active BOOLEAN, 
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), 
+	updated_at DATETIME, 
+	PRIMARY KEY (id)
+);
+CREATE UNIQUE INDEX ix_users_username ON users (username);
+CREATE UNIQUE INDEX ix_users_email ON users (email);
+CREATE INDEX ix_users_id ON users (id);
+CREATE TABLE projects (
+	id INTEGER NOT NULL, 
+	user_id INTEGER NOT NULL, 
+	name VARCHAR(200) NOT NULL, 
+	description TEXT, 
+	status VARCHAR(9), 
+	start_date DATE, 
+	target_date DATE, 
+	completed_date DATE, 
+	progress FLOAT, 
+	outline TEXT, 
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), 
+	updated_at DATETIME, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE INDEX ix_projects_id ON projects (id);
+CREATE TABLE habits (
+	id INTEGER NOT NULL, 
+	user_id INTEGER NOT NULL, 
+	name VARCHAR(100) NOT NULL, 
+	description TEXT, 
+	icon VARCHAR(50), 
+	color VARCHAR(20), 
+	frequency_type VARCHAR(8), 
+	weekly_target INTEGER, 
+	times_per_day INTEGER, 
+	custom_schedule JSON, 
+	allow_overflow BOOLEAN, 
+	is_active BOOLEAN, 
+	is_archived BOOLEAN, 
+	archived_at DATETIME, 
+	sort_order INTEGER, 
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE INDEX ix_habits_id ON habits (id);
+CREATE TABLE reviews (
+	id INTEGER NOT NULL, 
+	user_id INTEGER NOT NULL, 
+	period VARCHAR(9) NOT NULL, 
+	year INTEGER NOT NULL, 
+	quarter INTEGER, 
+	month INTEGER, 
+	week INTEGER, 
+	date DATE, 
+	highlights TEXT, 
+	challenges TEXT, 
+	learnings TEXT, 
+	next_steps TEXT, 
+	gratitude TEXT, 
+	mood INTEGER, 
+	keep TEXT, 
+	problem TEXT, 
+	try TEXT, 
+	objective_summary TEXT, 
+	reflective_summary TEXT, 
+	interpretive_summary TEXT, 
+	decisional_summary TEXT, 
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), 
+	updated_at DATETIME, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE INDEX ix_reviews_id ON reviews (id);
+CREATE TABLE goals (
+	id INTEGER NOT NULL, 
+	user_id INTEGER NOT NULL, 
+	title VARCHAR(200) NOT NULL, 
+	description TEXT, 
+	period VARCHAR(7), 
+	year INTEGER, 
+	quarter INTEGER, 
+	month INTEGER, 
+	area VARCHAR(50), 
+	status VARCHAR(9), 
+	progress FLOAT, 
+	project_id INTEGER, 
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), 
+	updated_at DATETIME, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(user_id) REFERENCES users (id), 
+	FOREIGN KEY(project_id) REFERENCES projects (id)
+);
+CREATE INDEX ix_goals_id ON goals (id);
+CREATE TABLE project_goals (
+	id INTEGER NOT NULL, 
+	project_id INTEGER NOT NULL, 
+	user_id INTEGER NOT NULL, 
+	title VARCHAR(300) NOT NULL, 
+	description TEXT, 
+	is_completed BOOLEAN, 
+	completed_at DATETIME, 
+	sort_order INTEGER, 
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), 
+	updated_at DATETIME, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(project_id) REFERENCES projects (id) ON DELETE CASCADE, 
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE INDEX ix_project_goals_id ON project_goals (id);
+CREATE TABLE tasks (
+	id INTEGER NOT NULL, 
+	user_id INTEGER NOT NULL, 
+	project_id INTEGER, 
+	title VARCHAR(200) NOT NULL, 
+	description TEXT, 
+	task_type VARCHAR(8), 
+	status VARCHAR(11), 
+	priority VARCHAR(6), 
+	due_date DATE, 
+	scheduled_date DATE, 
+	scheduled_type VARCHAR(20), 
+	completed_at DATETIME, 
+	estimated_pomodoros INTEGER, 
+	actual_pomodoros INTEGER, 
+	is_inbox INTEGER, 
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), 
+	updated_at DATETIME, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(user_id) REFERENCES users (id), 
+	FOREIGN KEY(project_id) REFERENCES projects (id)
+);
+CREATE INDEX ix_tasks_id ON tasks (id);
+CREATE TABLE habit_logs (
+	id INTEGER NOT NULL, 
+	habit_id INTEGER NOT NULL, 
+	user_id INTEGER NOT NULL, 
+	date DATE NOT NULL, 
+	count INTEGER, 
+	note VARCHAR(200), 
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), 
+	PRIMARY KEY (id), 
+	CONSTRAINT unique_habit_date UNIQUE (habit_id, date), 
+	FOREIGN KEY(habit_id) REFERENCES habits (id), 
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE INDEX ix_habit_logs_id ON habit_logs (id);
+CREATE TABLE key_results (
+	id INTEGER NOT NULL, 
+	goal_id INTEGER NOT NULL, 
+	title VARCHAR(200) NOT NULL, 
+	target_value FLOAT, 
+	current_value FLOAT, 
+	unit VARCHAR(50), 
+	is_completed BOOLEAN, 
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), 
+	updated_at DATETIME, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(goal_id) REFERENCES goals (id)
+);
+CREATE INDEX ix_key_results_id ON key_results (id);
@@ -0,0 +1,171 @@
+"""
+数据库后端基准测试
+
+在同样的数据规模下比较 SQLite 和 PostgreSQL 执行仪表盘、任务统计、复盘汇总聚合的耗时，
+用于判断单文件 SQLite 是否已经到了需要迁移的时候。
+
+每个后端都会重建一份独立的测试库（删表 → 建表 → 写入样本数据 → ANALYZE），
+不要指向正在使用的数据库。
+
+用法：
+    python -m app.db.benchmark                                   # 只测 SQLite（临时文件）
+    python -m app.db.benchmark --pg postgresql://u:p@host/bench  # 同时测 PostgreSQL
+    python -m app.db.benchmark --tasks 200000 --repeat 20
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import models
+from app.db.query_plan import sample_task_rows
+from app.services.task_queries import DASHBOARD_TASK_COUNTS, task_query_params, week_range
+
+PROJECT_COUNT = 50
+HABIT_COUNT = 10
+
+
+def seed(engine: Engine, task_count: int, log_days: int = 365, seed_value: int = 42) -> None:
+    """重建表结构并写入样本数据"""
+    from app.db.database import Base
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    rnd = random.Random(seed_value)
+    today = date.today()
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [{"id": 1, "username": "bench", "hashed_password": "-"}])
+        conn.execute(models.Project.__table__.insert(), [
+            {"id": i, "user_id": 1, "name": f"项目{i}", "status": models.ProjectStatus.ACTIVE.name}
+            for i in range(1, PROJECT_COUNT + 1)
+        ])
+        conn.execute(models.Habit.__table__.insert(), [
+            {"id": i, "user_id": 1, "name": f"习惯{i}", "frequency_type": models.HabitFrequency.DAILY.name,
+             "weekly_target": 7, "times_per_day": 1, "is_active": True, "is_archived": False}
+            for i in range(1, HABIT_COUNT + 1)
+        ])
+        conn.execute(models.HabitLog.__table__.insert(), [
+            {"habit_id": h, "user_id": 1, "date": today - timedelta(days=d), "count": 1}
+            for h in range(1, HABIT_COUNT + 1)
+            for d in range(log_days)
+            if rnd.random() < 0.7
+        ])
+        conn.execute(models.Task.__table__.insert(), sample_task_rows(task_count, seed_value))
+
+        if engine.dialect.name == "postgresql":
+            # 显式插入了主键，需要把序列推进到当前最大值之后
+            for table in ("users", "projects", "habits"):
+                conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"))
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("ANALYZE")
+
+
+def workloads(today: date) -> Dict[str, Callable[[Session], object]]:
+    """被测的聚合查询（与接口中的实现一致）"""
+    Task = models.Task
+    week_start, _ = week_range(today)
+    month_start = today.replace(day=1)
+
+    def dashboard(db: Session):
+        return db.execute(DASHBOARD_TASK_COUNTS, task_query_params(1, today)).one()
+
+    def task_stats(db: Session):
+        return db.query(
+            Task.project_id,
+            Task.priority,
+            func.count(Task.id),
+            func.count(Task.id).filter(Task.completed_at >= week_start)
+        ).filter(
+            Task.user_id == 1,
+            Task.status == models.TaskStatus.COMPLETED
+        ).group_by(Task.project_id, Task.priority).all()
+
+    def review_summary(db: Session):
+        period = (Task.user_id == 1) & (Task.created_at >= month_start) & (Task.created_at <= today + timedelta(days=1))
+        totals = db.query(
+            func.count(Task.id),
+            func.count(Task.id).filter(Task.status == models.TaskStatus.COMPLETED)
+        ).filter(period).one()
+        checkins = db.query(models.HabitLog.habit_id, func.sum(models.HabitLog.count)).filter(
+            models.HabitLog.user_id == 1,
+            models.HabitLog.date >= month_start,
+            models.HabitLog.date <= today
+        ).group_by(models.HabitLog.habit_id).all()
+        per_project = db.query(Task.project_id, func.count(Task.id)).filter(
+            period, Task.project_id != None
+        ).group_by(Task.project_id).all()
+        return totals, checkins, per_project
+
+    return {"dashboard": dashboard, "task_stats": task_stats, "review_summary": review_summary}
+
+
+def run(engine: Engine, repeat: int) -> Dict[str, List[float]]:
+    """每个查询先预热一次，再执行 repeat 次，返回每次耗时（毫秒）"""
+    db = sessionmaker(bind=engine)()
+    timings = {}
+    try:
+        for name, work in workloads(date.today()).items():
+            work(db)
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                work(db)
+                samples.append((time.perf_counter() - start) * 1000)
+            timings[name] = samples
+    finally:
+        db.close()
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite / PostgreSQL 聚合查询基准测试")
+    parser.add_argument("--tasks", type=int, default=50000, help="样本任务数")
+    parser.add_argument("--repeat", type=int, default=10, help="每个查询的执行次数")
+    parser.add_argument("--sqlite", default="", help="SQLite 测试库路径（默认临时文件）")
+    parser.add_argument("--pg", default="", help="PostgreSQL 测试库连接串（留空则跳过）")
+    args = parser.parse_args()
+
+    from app.core.config import get_settings
+    from app.db.database import apply_sqlite_profile, get_sqlite_profile
+
+    tmp_dir = None
+    if args.sqlite:
+        sqlite_path = args.sqlite
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix="lifeflow-bench-")
+        sqlite_path = os.path.join(tmp_dir, "bench.db")
+    sqlite_engine = create_engine(f"sqlite:///{sqlite_path}", connect_args={"check_same_thread": False})
+    apply_sqlite_profile(sqlite_engine, get_sqlite_profile(get_settings().SQLITE_PROFILE))
+    backends = {f"sqlite ({get_settings().SQLITE_PROFILE})": sqlite_engine}
+    if args.pg:
+        backends["postgresql"] = create_engine(args.pg)
+
+    results = {}
+    for label, engine in backends.items():
+        start = time.perf_counter()
+        seed(engine, args.tasks)
+        print(f"[BENCH] {label}: 写入 {args.tasks} 条任务用时 {time.perf_counter() - start:.1f}s")
+        results[label] = run(engine, args.repeat)
+        engine.dispose()
+
+    print(f"[BENCH] 每个查询执行 {args.repeat} 次（毫秒，中位数 / 最大值）")
+    for label, timings in results.items():
+        for name, samples in timings.items():
+            print(f"  {label:<22} {name:<16} {statistics.median(samples):8.2f} / {max(samples):8.2f}")
+
+    if tmp_dir:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
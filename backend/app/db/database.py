@@ -4,13 +4,124 @@
 SQLAlchemy 是 Python 最流行的 ORM 工具，
 它让我们可以用 Python 类来操作数据库表，不用写 SQL 语句。
 """
+import threading
+from typing import Any, Dict
+from fastapi import Request
 from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.default import CacheStats
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import get_settings
 
 settings = get_settings()
 
+
+
+class CompiledCacheStats:
+    """
+    SQL 编译缓存的命中统计（所有引擎）
+
+    每条语句执行前 SQLAlchemy 已在执行上下文中记下这次是否命中编译缓存（context.cache_hit），
+    这里只做计数。exec_driver_sql、DDL 等没有缓存键的语句计入 uncached
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+
+    def record(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        """before_cursor_execute 事件"""
+        if context is None:
+            return
+        with self._lock:
+            if context.cache_hit == CacheStats.CACHE_HIT:
+                self.hits += 1
+            elif context.cache_hit == CacheStats.CACHE_MISS:
+                self.misses += 1
+            else:
+                self.uncached += 1
+
+    def stats(self) -> Dict[str, Any]:
+        engines = {"write": engine, "read": read_engine, "async": async_engine.sync_engine}
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "uncached": self.uncached,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+                # 每个引擎各有一份编译缓存（LRU），容量为 SQL_COMPILED_CACHE_SIZE
+                "engines": {
+                    name: {
+                        "size": len(e._compiled_cache) if e._compiled_cache is not None else 0,
+                        "max_size": settings.SQL_COMPILED_CACHE_SIZE,
+                    }
+                    for name, e in engines.items()
+                },
+            }
+
+
+compiled_cache_stats = CompiledCacheStats()
+event.listen(Engine, "before_cursor_execute", compiled_cache_stats.record)
+
+# SQLite 存储配置：每个新连接建立时执行的 PRAGMA
+# production：
+# - journal_mode=WAL     读写互不阻塞（写入时读者仍能读取旧快照）
+# - synchronous=NORMAL   WAL 模式下只在检查点时 fsync，断电最多丢失最后几个事务，不会损坏
+# - mmap_size=256MB      通过内存映射读取数据库文件，减少 read() 系统调用
+# - cache_size=-65536    每个连接 64MB 页缓存（负数单位为 KB）
+# - temp_store=MEMORY    排序、临时索引放在内存中
+# - busy_timeout=5000    遇到写锁时最多等待 5 秒，而不是立刻报 database is locked
+SQLITE_PROFILES: Dict[str, Dict[str, object]] = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+
+# 启动时报告的 PRAGMA（不管哪个配置都会输出实际生效值）
+REPORTED_PRAGMAS = ("journal_mode", "synchronous", "mmap_size", "cache_size", "temp_store", "busy_timeout")
+
+
+def get_sqlite_profile(name: str) -> Dict[str, object]:
+    """按名称获取 SQLite 存储配置"""
+    if name not in SQLITE_PROFILES:
+        raise ValueError(f"未知的 SQLITE_PROFILE: {name}（可选：{', '.join(SQLITE_PROFILES)}）")
+    return SQLITE_PROFILES[name]
+
+
+def apply_sqlite_profile(engine: Engine, profile: Dict[str, object]) -> None:
+    """在引擎的每个新连接上执行存储配置中的 PRAGMA"""
+    if not profile:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for key, value in profile.items():
+            cursor.execute(f"PRAGMA {key}={value}")
+        cursor.close()
+
+
+def sqlite_pragma_report(engine: Engine) -> Dict[str, object]:
+    """读取一个连接上实际生效的 PRAGMA 值"""
+    with engine.connect() as conn:
+        return {
+            key: conn.exec_driver_sql(f"PRAGMA {key}").scalar()
+            for key in REPORTED_PRAGMAS
+        }
+
+
 # 创建数据库引擎
 # SQLite 配置：check_same_thread=False 允许多线程访问
 if settings.DATABASE_URL.startswith("sqlite"):
@@ -18,31 +129,135 @@ if settings.DATABASE_URL.startswith("sqlite"):
         settings.DATABASE_URL,
         connect_args={"check_same_thread": False},
         echo=settings.DEBUG,
+        query_cache_size=settings.SQL_COMPILED_CACHE_SIZE,
     )
+    apply_sqlite_profile(engine, get_sqlite_profile(settings.SQLITE_PROFILE))
 else:
     engine = create_engine(
         settings.DATABASE_URL,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
         echo=settings.DEBUG,
+        query_cache_size=settings.SQL_COMPILED_CACHE_SIZE,
     )
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+# ==================== 只读连接池 ====================
+# GET 请求使用独立的只读引擎，读请求突发时不会占满写连接池，两边的连接数也可以分别调整
+# - SQLite：同一个数据库文件，每个连接设置 query_only=ON（配合 WAL，读写互不阻塞）
+# - PostgreSQL：连接 DATABASE_READ_URL（只读副本），未配置时连接主库，事务默认只读
+READ_DATABASE_URL = settings.DATABASE_READ_URL or settings.DATABASE_URL
+
+# 内存数据库每个连接都是独立的库，不能拆分出只读引擎
+_is_memory_sqlite = READ_DATABASE_URL in ("sqlite://", "sqlite:///:memory:")
+
+if _is_memory_sqlite:
+    read_engine = engine
+elif READ_DATABASE_URL.startswith("sqlite"):
+    read_engine = create_engine(
+        READ_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=settings.READ_POOL_SIZE,
+        max_overflow=settings.READ_MAX_OVERFLOW,
+        echo=settings.DEBUG,
+        query_cache_size=settings.SQL_COMPILED_CACHE_SIZE,
+    )
+    apply_sqlite_profile(read_engine, {**get_sqlite_profile(settings.SQLITE_PROFILE), "query_only": "ON"})
+else:
+    read_engine = create_engine(
+        READ_DATABASE_URL,
+        connect_args={"options": "-c default_transaction_read_only=on"},
+        pool_size=settings.READ_POOL_SIZE,
+        max_overflow=settings.READ_MAX_OVERFLOW,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        echo=settings.DEBUG,
+        query_cache_size=settings.SQL_COMPILED_CACHE_SIZE,
+    )
+
+# 只读会话工厂
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+
+def async_database_url(url: str) -> str:
+    """由同步连接地址推导异步驱动的连接地址"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:") or url.startswith("postgresql+psycopg2:"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+
+# 异步引擎：高频读接口（都是 GET）使用，等待数据库 I/O 时不占用线程池
+# 与同步只读引擎一样连接只读库；需要安装对应的异步驱动（aiosqlite / asyncpg，见 requirements.txt）
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or async_database_url(READ_DATABASE_URL)
+
+if ASYNC_DATABASE_URL.startswith("sqlite"):
+    # aiosqlite 默认不复用连接（NullPool），每次都要重新打开文件并执行 PRAGMA，这里改为连接池
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.READ_POOL_SIZE,
+        max_overflow=settings.READ_MAX_OVERFLOW,
+        echo=settings.DEBUG,
+        query_cache_size=settings.SQL_COMPILED_CACHE_SIZE,
+    )
+    apply_sqlite_profile(
+        async_engine.sync_engine,
+        {**get_sqlite_profile(settings.SQLITE_PROFILE), "query_only": "ON"},
+    )
+else:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        connect_args={"server_settings": {"default_transaction_read_only": "on"}},
+        pool_size=settings.READ_POOL_SIZE,
+        max_overflow=settings.READ_MAX_OVERFLOW,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        echo=settings.DEBUG,
+        query_cache_size=settings.SQL_COMPILED_CACHE_SIZE,
+    )
+
+# 异步会话工厂（提交后不过期对象，避免在 await 之外触发懒加载）
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
 # 声明基类，所有模型都继承这个类
 Base = declarative_base()
 
 
-def get_db():
+def get_db(request: Request):
     """
     获取数据库会话（用于 FastAPI 依赖注入）
     
+    GET / HEAD 请求自动使用只读连接池，其他请求使用读写连接池
+    
     用法：
         @app.get("/items/")
         def read_items(db: Session = Depends(get_db)):
             ...
     """
-    db = SessionLocal()
+    factory = ReadSessionLocal if request.method in ("GET", "HEAD") else SessionLocal
+    db = factory()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    获取异步数据库会话（用于 async def 路由）
+    
+    用法：
+        @app.get("/items/")
+        async def read_items(db: AsyncSession = Depends(get_async_db)):
+            result = await db.execute(select(Item))
+            ...
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,177 @@
+"""
+数据导出基准测试
+
+重建一份独立的测试库，写入 --habits 个习惯 --years 年的每日打卡记录（默认 20 个习惯 × 10 年，打卡率 80%，约 5.8 万条），
+--tasks 条任务和每天一篇的日复盘，然后测量每种导出（CSV / NDJSON）的：
+- 吞吐：行 / 秒、MB / 秒（不开内存跟踪）
+- 内存：导出过程中 Python 分配的峰值（tracemalloc），以及进程 RSS 的增长
+
+最后用同样的数据测一次"一次性读出全部行再生成整个响应"的峰值内存作为对比。
+流式导出的峰值只与 --batch 有关，把 --years 调大十倍峰值也基本不变。
+
+不要指向正在使用的数据库。
+
+用法：
+    python -m app.db.export_benchmark
+    python -m app.db.export_benchmark --years 30 --habits 50 --batch 2000
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import Callable, Iterator, Tuple
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.engine import Engine
+
+from app import models
+from app.services.export import EXPORT_FORMATS, EXPORT_SOURCES, export_chunks, export_columns
+
+BATCH = 20000
+
+
+def seed(engine: Engine, habits: int, years: int, tasks: int, seed_value: int = 42) -> None:
+    """重建表结构并写入样本数据（打卡率约 80%）"""
+    from app.db.database import Base
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    rnd = random.Random(seed_value)
+    first_day = date.today() - timedelta(days=365 * years)
+    days = [first_day + timedelta(days=i) for i in range(365 * years)]
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [{"id": 1, "username": "bench", "hashed_password": "-"}])
+        conn.execute(models.Habit.__table__.insert(), [
+            {"id": h, "user_id": 1, "name": f"习惯 {h}", "frequency_type": models.HabitFrequency.DAILY.name}
+            for h in range(1, habits + 1)
+        ])
+        logs = (
+            {"habit_id": h, "user_id": 1, "date": day, "count": 1,
+             "note": "完成" if rnd.random() < 0.1 else None}
+            for day in days for h in range(1, habits + 1) if rnd.random() < 0.8
+        )
+        _insert_batches(conn, models.HabitLog.__table__, logs)
+        _insert_batches(conn, models.Task.__table__, (
+            {"user_id": 1, "title": f"任务 {i}", "description": "描述 " * rnd.randint(0, 20),
+             "task_type": models.TaskType.TODO.name, "status": models.TaskStatus.PENDING.name,
+             "priority": models.TaskPriority.MEDIUM.name, "priority_rank": 2, "is_inbox": 0}
+            for i in range(tasks)
+        ))
+        _insert_batches(conn, models.Review.__table__, (
+            {"user_id": 1, "period": models.ReviewPeriod.DAILY.name, "year": day.year, "date": day,
+             "highlights": "今天完成了计划中的大部分任务，" * 3, "mood": rnd.randint(1, 10)}
+            for day in days
+        ))
+
+
+def _insert_batches(conn, table, rows: Iterator[dict]) -> None:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            conn.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        conn.execute(table.insert(), batch)
+
+
+def _max_rss_mb() -> float:
+    """进程 RSS 的历史峰值（MB）：一次性读取的对比放在最后测，前面各项的增长不受它影响"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / 1024 / 1024 if sys.platform == "darwin" else usage / 1024
+
+
+def consume(chunks: Iterator[bytes]) -> Tuple[int, int]:
+    """读完导出内容，返回 (字节数, 行数)"""
+    size = lines = 0
+    for chunk in chunks:
+        size += len(chunk)
+        lines += chunk.count(b"\n")
+    return size, lines
+
+
+def measure(run: Callable[[], Tuple[int, int]]) -> Tuple[Tuple[int, int], float, float, float]:
+    """返回 (结果, 秒数, Python 峰值 MB, RSS 峰值增长 MB)：先计时，再开 tracemalloc 跑第二遍测内存"""
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+
+    rss_before = _max_rss_mb()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024, _max_rss_mb() - rss_before
+
+
+def materialized(engine: Engine) -> Tuple[int, int]:
+    """对比用：一次性读出全部打卡记录，生成完整的 NDJSON 响应体"""
+    table = models.HabitLog.__table__
+    columns = export_columns("habit_logs")
+    with engine.connect() as conn:
+        rows = conn.execute(select(table).where(table.c.user_id == 1).order_by(table.c.id)).all()
+    body = "".join(json.dumps(dict(zip(columns, map(str, row))), ensure_ascii=False) + "\n" for row in rows)
+    data = body.encode("utf-8")
+    return len(data), len(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="数据导出基准测试")
+    parser.add_argument("--habits", type=int, default=20, help="习惯数")
+    parser.add_argument("--years", type=int, default=10, help="打卡记录覆盖的年数")
+    parser.add_argument("--tasks", type=int, default=100000, help="任务数")
+    parser.add_argument("--batch", type=int, default=None, help="每批行数（默认 EXPORT_BATCH_SIZE）")
+    parser.add_argument("--sqlite", default="", help="测试库路径（默认临时文件）")
+    args = parser.parse_args()
+
+    from app.core.config import get_settings
+    from app.db.database import apply_sqlite_profile, get_sqlite_profile
+
+    batch = args.batch or get_settings().EXPORT_BATCH_SIZE
+    tmp_dir = None
+    if args.sqlite:
+        path = args.sqlite
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix="lifeflow-export-bench-")
+        path = os.path.join(tmp_dir, "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    apply_sqlite_profile(engine, get_sqlite_profile(get_settings().SQLITE_PROFILE))
+
+    try:
+        start = time.perf_counter()
+        seed(engine, args.habits, args.years, args.tasks)
+        print(f"[BENCH] 写入样本数据用时 {time.perf_counter() - start:.1f}s，"
+              f"数据库 {os.path.getsize(path) / 1024 / 1024:.0f}MB，每批 {batch} 行")
+
+        print("[BENCH] 流式导出（行/秒、MB/秒；峰值内存为 Python 分配的峰值 / 进程 RSS 峰值的增长）")
+        for kind in EXPORT_SOURCES:
+            for fmt in EXPORT_FORMATS:
+                (size, lines), elapsed, peak, rss = measure(
+                    lambda: consume(export_chunks(engine, kind, fmt, 1, batch))
+                )
+                rows = lines - (1 if fmt == "csv" else 0)
+                print(f"  {kind:<10} {fmt:<6} {rows:>8} 行 {size / 1024 / 1024:7.1f}MB  "
+                      f"{rows / elapsed:>9.0f} 行/s {size / 1024 / 1024 / elapsed:6.1f}MB/s  "
+                      f"峰值 {peak:6.1f}MB / RSS +{rss:.1f}MB")
+
+        (size, rows), elapsed, peak, rss = measure(lambda: materialized(engine))
+        print(f"[BENCH] 对比：一次性读取 habit_logs 生成 NDJSON，{rows} 行 {size / 1024 / 1024:.1f}MB，"
+              f"峰值 {peak:.1f}MB / RSS +{rss:.1f}MB")
+    finally:
+        engine.dispose()
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+迁移升级检查（仅 SQLite）
+
+用初始版本的表结构（baseline_schema.sql）建一个临时库、写入几条旧格式的数据，
+执行全部迁移，然后检查：
+- 每个迁移都能在旧库上按顺序执行成功（后面的迁移才加的字段不会被前面的迁移提前用到）
+- 升级后的表、字段、索引、触发器与新建库（create_all + 迁移）一致
+- 回填的数据正确（任务优先级等级、项目计数）
+- 再执行一遍每个迁移函数不报错（幂等）
+
+新增迁移后运行一次，旧库升级失败时返回码为 1：
+    python -m app.db.migration_check
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Engine
+
+from app import models
+from app.db.database import Base
+from app.db.migrations import MIGRATIONS, run_migrations
+from app.models.task import PRIORITY_RANKS
+
+BASELINE_SCHEMA = os.path.join(os.path.dirname(__file__), "baseline_schema.sql")
+
+# 旧格式的样本数据（枚举按名称存储）
+BASELINE_ROWS = [
+    "INSERT INTO users (id, username, hashed_password) VALUES (1, 'admin', '-')",
+    "INSERT INTO projects (id, user_id, name, status, progress) VALUES (1, 1, '旧项目', 'ACTIVE', 0)",
+    "INSERT INTO tasks (id, user_id, project_id, title, task_type, status, priority, is_inbox, created_at) VALUES "
+    "(1, 1, 1, '紧急任务', 'TODO', 'COMPLETED', 'URGENT', 0, '2024-01-01 08:00:00'), "
+    "(2, 1, 1, '普通任务', 'TODO', 'PENDING', 'MEDIUM', 0, NULL), "
+    "(3, 1, NULL, '收集箱', 'TODO', 'PENDING', 'LOW', 1, '2024-01-02 08:00:00')",
+    "INSERT INTO project_goals (id, project_id, user_id, title, is_completed) VALUES (1, 1, 1, '里程碑', 1)",
+    "INSERT INTO goals (id, user_id, title, period, year, status, progress) VALUES (1, 1, '年度目标', 'YEARLY', 2024, 'ACTIVE', 0)",
+    "INSERT INTO key_results (id, goal_id, title, target_value, current_value) VALUES (1, 1, '读 12 本书', 12, 3)",
+    "INSERT INTO habits (id, user_id, name, frequency_type) VALUES (1, 1, '跑步', 'DAILY')",
+    "INSERT INTO habit_logs (id, habit_id, user_id, date, count) VALUES (1, 1, 1, '2024-01-01', 1)",
+    "INSERT INTO reviews (id, user_id, period, year, date, highlights) VALUES (1, 1, 'DAILY', 2024, '2024-01-01', '完成了计划')",
+]
+
+
+def create_baseline(path: str) -> None:
+    """按初始版本的表结构建库并写入样本数据"""
+    with open(BASELINE_SCHEMA, encoding="utf-8") as f:
+        schema = f.read()
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(schema)
+        for statement in BASELINE_ROWS:
+            conn.execute(statement)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def schema_signature(engine: Engine) -> Dict[str, Set[Tuple[str, str]]]:
+    """表 -> {(类型, 名称)}：字段、索引、触发器（不含 SQLite 自动创建的对象）"""
+    signature: Dict[str, Set[Tuple[str, str]]] = {}
+    with engine.connect() as conn:
+        inspector = inspect(conn)
+        for table in inspector.get_table_names():
+            signature[table] = {("column", c["name"]) for c in inspector.get_columns(table)}
+        for kind, name, table in conn.execute(text(
+            "SELECT type, name, tbl_name FROM sqlite_master "
+            "WHERE type IN ('index', 'trigger') AND name NOT LIKE 'sqlite_autoindex_%'"
+        )):
+            signature.setdefault(table, set()).add((kind, name))
+    return signature
+
+
+def check_backfill(engine: Engine) -> List[str]:
+    """回填的数据是否正确"""
+    problems = []
+    with engine.connect() as conn:
+        for task_id, priority, rank in conn.execute(text("SELECT id, priority, priority_rank FROM tasks")):
+            expected = PRIORITY_RANKS[models.TaskPriority[priority]]
+            if rank != expected:
+                problems.append(f"任务 {task_id} 的 priority_rank 为 {rank}，应为 {expected}")
+        project = conn.execute(text(
+            "SELECT total_tasks, completed_tasks, total_goals, completed_goals, progress FROM projects WHERE id = 1"
+        )).one()
+        if tuple(project) != (2, 1, 1, 1, 100.0):
+            problems.append(f"项目计数回填错误：{tuple(project)}")
+        if conn.execute(text("SELECT count(*) FROM tasks WHERE created_at IS NULL")).scalar():
+            problems.append("仍有 created_at 为空的任务")
+    return problems
+
+
+def check_upgrade(work_dir: str) -> List[str]:
+    """旧库升级到最新版本，返回发现的问题"""
+    problems = []
+    old_path = os.path.join(work_dir, "baseline.db")
+    new_path = os.path.join(work_dir, "fresh.db")
+    create_baseline(old_path)
+    old = create_engine(f"sqlite:///{old_path}")
+    new = create_engine(f"sqlite:///{new_path}")
+    try:
+        try:
+            applied = run_migrations(old)
+        except Exception as e:  # noqa: BLE001 - 报告哪一个迁移失败
+            return [f"旧库升级失败：{e.__class__.__name__}: {str(e).splitlines()[0]}"]
+        if len(applied) != len(MIGRATIONS):
+            problems.append(f"只应用了 {len(applied)} / {len(MIGRATIONS)} 个迁移")
+
+        Base.metadata.create_all(bind=new)
+        run_migrations(new)
+        upgraded, fresh = schema_signature(old), schema_signature(new)
+        for table in sorted(set(upgraded) | set(fresh)):
+            for kind, name in sorted(fresh.get(table, set()) - upgraded.get(table, set())):
+                problems.append(f"升级后缺少 {table} 的 {kind} {name}")
+            for kind, name in sorted(upgraded.get(table, set()) - fresh.get(table, set())):
+                problems.append(f"升级后多出 {table} 的 {kind} {name}")
+
+        problems += check_backfill(old)
+
+        for version, name, func in MIGRATIONS:
+            try:
+                with old.begin() as conn:
+                    func(conn)
+            except Exception as e:  # noqa: BLE001
+                problems.append(f"迁移 {version:04d}_{name} 重复执行失败：{str(e).splitlines()[0]}")
+    finally:
+        old.dispose()
+        new.dispose()
+    return problems
+
+
+if __name__ == "__main__":
+    tmp_dir = tempfile.mkdtemp(prefix="lifeflow-migration-check-")
+    try:
+        problems = check_upgrade(tmp_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    if problems:
+        for problem in problems:
+            print(f"[MIGRATE] {problem}")
+        sys.exit(1)
+    print(f"[MIGRATE] 初始版本的数据库可以升级到最新版本（{len(MIGRATIONS)} 个迁移，结构与新建库一致）")
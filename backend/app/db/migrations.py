@@ -0,0 +1,226 @@
+"""
+数据库迁移
+
+create_all 只会创建不存在的表，已有数据库上新增的索引、字段不会自动补上。
+这里按版本号顺序记录每一次结构变更，启动时执行尚未应用过的迁移，
+已应用的版本记录在 schema_migrations 表中。
+
+新增迁移：写一个接收 Connection 的函数，用 @migration(版本号, 名称) 注册即可。
+每个迁移都应当是幂等的（重复执行不报错）。
+"""
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+MigrationFunc = Callable[[Connection], None]
+
+# (版本号, 名称, 执行函数)
+MIGRATIONS: List[Tuple[int, str, MigrationFunc]] = []
+
+
+def migration(version: int, name: str):
+    """注册一个迁移"""
+    def decorator(func: MigrationFunc) -> MigrationFunc:
+        MIGRATIONS.append((version, name, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return decorator
+
+
+def _create_indexes(conn: Connection, table, *names: str) -> None:
+    """
+    为已存在的表补建模型中声明的指定索引
+
+    每个迁移只建自己引入的索引：模型里的索引可能用到后面的迁移才加上的字段，
+    旧库按顺序升级时不能提前创建
+    """
+    indexes = {index.name: index for index in table.indexes}
+    for name in names:
+        indexes[name].create(bind=conn, checkfirst=True)
+
+
+def _add_missing_columns(conn: Connection, table) -> List[str]:
+    """为已存在的表补上模型中新增的字段（ALTER TABLE ADD COLUMN），返回补上的字段名"""
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    added = []
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}"
+        if column.server_default is not None:
+            ddl += f" DEFAULT {column.server_default.arg}"
+            if not column.nullable:
+                ddl += " NOT NULL"
+        conn.execute(text(ddl))
+        added.append(column.name)
+    return added
+
+
+# ==================== 迁移列表 ====================
+@migration(1, "task_view_indexes")
+def _task_view_indexes(conn: Connection) -> None:
+    """任务视图 / 仪表盘计数使用的复合索引"""
+    from app import models
+
+    # ix_tasks_user_created / ix_tasks_user_status_created 已由迁移 4 替换，这里不再创建
+    _create_indexes(
+        conn, models.Task.__table__,
+        "ix_tasks_user_scheduled", "ix_tasks_user_due", "ix_tasks_user_type_created",
+        "ix_tasks_user_status_completed", "ix_tasks_project_status",
+    )
+    _create_indexes(conn, models.HabitLog.__table__, "ix_habit_logs_user_date")
+    _create_indexes(conn, models.Goal.__table__, "ix_goals_user_status")
+    _create_indexes(conn, models.Project.__table__, "ix_projects_user_status")
+
+
+@migration(2, "habit_daily_rollup")
+def _habit_daily_rollup(conn: Connection) -> None:
+    """习惯每日汇总表，并根据已有打卡记录回填"""
+    from app import models
+    from app.services.habit_rollup import rebuild_habit_rollup
+
+    models.HabitDailyRollup.__table__.create(bind=conn, checkfirst=True)
+    db = Session(bind=conn)
+    try:
+        rebuild_habit_rollup(db)
+    finally:
+        db.close()
+
+
+@migration(3, "project_task_counters")
+def _project_task_counters(conn: Connection) -> None:
+    """项目任务计数字段，并按现有任务回填"""
+    from app import models
+    from app.services.project_counters import reconcile_project_counters
+
+    _add_missing_columns(conn, models.Project.__table__)
+    db = Session(bind=conn)
+    try:
+        reconcile_project_counters(db)
+    finally:
+        db.close()
+
+
+@migration(4, "task_keyset_indexes")
+def _task_keyset_indexes(conn: Connection) -> None:
+    """任务列表键集分页：(created_at, id) 结尾的索引替换原索引，补齐空的 created_at"""
+    from app import models
+
+    # created_at 为空的行无法参与 (created_at, id) 比较，用更新时间或当前时间补上
+    conn.execute(text(
+        "UPDATE tasks SET created_at = COALESCE(updated_at, completed_at, CURRENT_TIMESTAMP) "
+        "WHERE created_at IS NULL"
+    ))
+    for name in ("ix_tasks_user_created", "ix_tasks_user_status_created"):
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    _create_indexes(conn, models.Task.__table__, "ix_tasks_user_status_created_id", "ix_tasks_user_created_id")
+
+
+@migration(5, "search_index")
+def _search_index(conn: Connection) -> None:
+    """全文搜索索引（FTS5 表和同步触发器，仅 SQLite），并根据已有数据回填"""
+    from app.db.search_index import rebuild_search_index
+
+    if conn.dialect.name == "sqlite":
+        rebuild_search_index(conn)
+
+
+@migration(6, "project_goal_counters")
+def _project_goal_counters(conn: Connection) -> None:
+    """项目里程碑计数字段，并按现有里程碑回填计数和进度"""
+    from app import models
+    from app.services.project_counters import reconcile_project_counters
+
+    _add_missing_columns(conn, models.Project.__table__)
+    db = Session(bind=conn)
+    try:
+        reconcile_project_counters(db)
+    finally:
+        db.close()
+
+
+@migration(7, "task_priority_rank")
+def _task_priority_rank(conn: Connection) -> None:
+    """任务优先级整数等级字段：按已有的 priority 回填，并建立排序索引"""
+    from app import models
+    from app.models.task import PRIORITY_RANKS
+
+    _add_missing_columns(conn, models.Task.__table__)
+    # 枚举按名称存储
+    whens = " ".join(f"WHEN '{priority.name}' THEN {rank}" for priority, rank in PRIORITY_RANKS.items())
+    conn.execute(text(f"UPDATE tasks SET priority_rank = CASE priority {whens} ELSE 2 END"))
+    _create_indexes(conn, models.Task.__table__, "ix_tasks_user_priority_due")
+
+
+@migration(8, "sync_journal")
+def _sync_journal(conn: Connection) -> None:
+    """增量同步的变更日志（日志表和触发器，仅 SQLite），并为已有记录写入日志"""
+    from app.db.sync_journal import rebuild_sync_journal
+
+    if conn.dialect.name == "sqlite":
+        rebuild_sync_journal(conn)
+
+
+@migration(9, "search_index_without_triggers")
+def _search_index_without_triggers(conn: Connection) -> None:
+    """搜索索引改由应用在提交前维护：删除依赖自定义函数的同步触发器（索引内容不变）"""
+    from app.db.search_index import create_search_index
+
+    create_search_index(conn)
+
+
+@migration(10, "habit_rollup_drop_target")
+def _habit_rollup_drop_target(conn: Connection) -> None:
+    """习惯每日汇总去掉没有读取方的 target 字段（按当时的活跃习惯回写，编辑习惯时要全量重算）"""
+    existing = {c["name"] for c in inspect(conn).get_columns("habit_daily_rollup")}
+    if "target" in existing:
+        conn.execute(text("ALTER TABLE habit_daily_rollup DROP COLUMN target"))
+
+
+# ==================== 执行 ====================
+def _ensure_version_table(conn: Connection) -> None:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "name VARCHAR(100) NOT NULL, "
+        "applied_at VARCHAR(40) NOT NULL)"
+    ))
+
+
+def applied_versions(conn: Connection) -> set:
+    """已应用的迁移版本号"""
+    if not inspect(conn).has_table("schema_migrations"):
+        return set()
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """执行所有未应用的迁移，返回本次应用的迁移名称"""
+    applied = []
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        done = applied_versions(conn)
+        for version, name, func in MIGRATIONS:
+            if version in done:
+                continue
+            func(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": version, "n": name, "t": datetime.utcnow().isoformat()},
+            )
+            applied.append(f"{version:04d}_{name}")
+    return applied
+
+
+if __name__ == "__main__":
+    from app.db.database import engine
+
+    names = run_migrations(engine)
+    if names:
+        for n in names:
+            print(f"[MIGRATE] 已应用 {n}")
+    else:
+        print("[MIGRATE] 数据库已是最新版本")
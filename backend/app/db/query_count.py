@@ -0,0 +1,220 @@
+"""
+查询条数检查
+
+统计每个读接口一次请求实际发出的 SQL 条数，并与固定的预算比较：
+聚合逻辑被改回"每个计数一条查询"、或者序列化时懒加载关联（N+1）时，
+条数会超出预算，或者随数据量增长。
+
+分别用 1 / 10 / 1000 行样本数据（每种记录各 N 行）各请求一次所有接口，
+每个规模的条数都必须等于预算。每个规模都会重建一份独立的临时测试库
+（通过依赖覆盖让接口连到测试库），不会碰正在使用的数据库。
+
+用法：
+    python -m app.db.query_count                 # 检查失败时退出码为 1
+    python -m app.db.query_count --rows 1 10 5000 -v
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db.search_index import rebuild_search_index
+from app.db.sync_journal import rebuild_sync_journal
+from app.services.dashboard import DASHBOARD_QUERY_BUDGET
+from app.services.task_queries import week_range
+
+_today = date.today()
+
+# 接口 -> 每次请求的查询条数
+ENDPOINT_BUDGETS: Dict[str, int] = {
+    "/api/dashboard/stats": DASHBOARD_QUERY_BUDGET,
+    "/api/tasks/": 1,
+    "/api/tasks/?limit=50": 1,
+    "/api/tasks/?fields=id,title": 1,
+    "/api/tasks/week-calendar": 1,
+    "/api/tasks/week-calendar?include_habits=true": 3,
+    "/api/tasks/month-calendar": 1,
+    "/api/tasks/agenda?include_completed=true": 1,
+    "/api/tasks/stats": 1,
+    "/api/projects/": 1,
+    "/api/projects/1": 3,
+    "/api/projects/1/goals": 1,
+    "/api/goals/": 2,
+    "/api/habits/": 1,
+    "/api/habits/week": 2,
+    "/api/habits/heatmap": 2,
+    "/api/search?q=任务": 2,
+    # 游标校验 + 变更日志 + 有变化的每种表各一条（第一条变化是任务，只涉及一种表）
+    "/api/sync?since=0&limit=1": 3,
+    f"/api/reviews/period/summary?period=monthly&year={_today.year}&month={_today.month}": 9,
+}
+
+
+@contextmanager
+def count_queries(engine: Engine) -> Iterator[List[str]]:
+    """with 块内该引擎发出的 SQL 语句（异步引擎传入 async_engine.sync_engine）"""
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def seed_rows(engine: Engine, rows: int) -> None:
+    """重建表结构，每种记录写入 rows 行（任务都属于项目、排在本周，目标和项目都带子记录）"""
+    from app.db.database import Base
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    week_start, _ = week_range(_today)
+    now = datetime.now()
+    ids = range(1, rows + 1)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [{"id": 1, "username": "qcount", "hashed_password": "-"}])
+        conn.execute(models.Project.__table__.insert(), [
+            {"id": i, "user_id": 1, "name": f"项目{i}", "status": models.ProjectStatus.ACTIVE.name}
+            for i in ids
+        ])
+        conn.execute(models.ProjectGoal.__table__.insert(), [
+            {"project_id": i, "user_id": 1, "title": f"里程碑{i}-{j}", "sort_order": j}
+            for i in ids for j in range(2)
+        ])
+        conn.execute(models.Task.__table__.insert(), [
+            {"id": i, "user_id": 1, "project_id": i, "title": f"任务{i}",
+             "task_type": models.TaskType.TODO.name, "status": models.TaskStatus.PENDING.name,
+             "priority": models.TaskPriority.MEDIUM.name, "is_inbox": 0,
+             "scheduled_date": week_start + timedelta(days=i % 7), "created_at": now - timedelta(minutes=i)}
+            for i in ids
+        ])
+        conn.execute(models.Goal.__table__.insert(), [
+            {"id": i, "user_id": 1, "title": f"目标{i}", "period": models.GoalPeriod.MONTH.name,
+             "year": _today.year, "month": _today.month, "status": models.GoalStatus.ACTIVE.name}
+            for i in ids
+        ])
+        conn.execute(models.KeyResult.__table__.insert(), [
+            {"goal_id": i, "title": f"关键结果{i}-{j}"} for i in ids for j in range(2)
+        ])
+        conn.execute(models.Habit.__table__.insert(), [
+            {"id": i, "user_id": 1, "name": f"习惯{i}", "frequency_type": models.HabitFrequency.DAILY.name,
+             "weekly_target": 7, "times_per_day": 1, "is_active": True, "is_archived": False}
+            for i in ids
+        ])
+        conn.execute(models.HabitLog.__table__.insert(), [
+            {"habit_id": i, "user_id": 1, "date": _today, "count": 1} for i in ids
+        ])
+        rebuild_search_index(conn)
+        rebuild_sync_journal(conn)
+
+
+def endpoint_queries(path: str) -> Dict[str, List[str]]:
+    """在 path 指向的测试库上请求每个接口一次，返回 接口 -> 发出的语句"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api import deps, reviews
+    from app.db.database import get_async_db, get_db
+    from app.main import app
+    from app.services.dashboard import dashboard_cache
+
+    engine = create_engine(f"sqlite:///{path}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    SessionLocal = sessionmaker(bind=engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    # 复盘路由没有挂在 main.py 上，单独挂到一个应用里检查
+    review_app = FastAPI()
+    review_app.include_router(reviews.router, prefix="/api")
+    overrides = {
+        get_db: override_get_db,
+        get_async_db: override_get_async_db,
+        deps.get_db: override_get_db,
+        deps.get_current_active_user: lambda: models.User(id=1, username="qcount", is_active=True),
+    }
+    app.dependency_overrides.update(overrides)
+    review_app.dependency_overrides.update(overrides)
+    results = {}
+    try:
+        # 不使用 with：不触发启动事件（建表、初始化数据都针对正式库）
+        clients = {"main": TestClient(app), "reviews": TestClient(review_app)}
+        for endpoint in ENDPOINT_BUDGETS:
+            client = clients["reviews" if endpoint.startswith("/api/reviews/") else "main"]
+            dashboard_cache.invalidate()
+            with count_queries(engine) as sync_statements, count_queries(async_engine.sync_engine) as async_statements:
+                response = client.get(endpoint)
+            response.raise_for_status()
+            results[endpoint] = sync_statements + async_statements
+    finally:
+        for key in overrides:
+            app.dependency_overrides.pop(key, None)
+        engine.dispose()
+        asyncio.run(async_engine.dispose())
+    return results
+
+
+def check(row_counts: List[int]) -> Dict[int, Dict[str, List[str]]]:
+    """在每个数据规模下请求一遍所有接口，返回 规模 -> 接口 -> 语句"""
+    tmp_dir = tempfile.mkdtemp(prefix="lifeflow-qcount-")
+    results = {}
+    try:
+        for rows in row_counts:
+            path = os.path.join(tmp_dir, f"{rows}.db")
+            engine = create_engine(f"sqlite:///{path}")
+            seed_rows(engine, rows)
+            engine.dispose()
+            results[rows] = endpoint_queries(path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="接口查询条数检查")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 10, 1000], help="每种记录的样本行数（可多个）")
+    parser.add_argument("-v", "--verbose", action="store_true", help="打印每条语句")
+    args = parser.parse_args()
+
+    results = check(args.rows)
+    failed = False
+    for endpoint, budget in ENDPOINT_BUDGETS.items():
+        counts = [len(results[rows][endpoint]) for rows in args.rows]
+        ok = all(count == budget for count in counts)
+        failed |= not ok
+        print(f"[QCOUNT] {endpoint:<44} {' / '.join(map(str, counts))} 条查询"
+              f"（预算 {budget}）{'' if ok else '  <-- 不符合预算'}")
+        if args.verbose or not ok:
+            for statement in results[args.rows[-1]][endpoint]:
+                print("    " + " ".join(statement.split())[:160])
+    if failed:
+        raise SystemExit(1)
+    print(f"[QCOUNT] {len(ENDPOINT_BUDGETS)} 个接口在 {' / '.join(map(str, args.rows))} 行时查询条数均符合预算")
+
+
+if __name__ == "__main__":
+    main()
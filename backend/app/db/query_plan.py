@@ -0,0 +1,178 @@
+"""
+查询计划检查
+
+对任务列表的每个视图、日历范围查询、仪表盘的每个计数执行 EXPLAIN QUERY PLAN（仅 SQLite），
+找出退化成全表扫描（SCAN 表名）的查询。索引被误删、或者过滤条件改得用不上索引时，
+这里会第一时间报出来。全部 / 已完成视图的分页查询、按优先级排序的列表还要求排序走索引
+（没有临时 B 树），否则每次请求都要把全部历史任务排一次序。
+
+SQLite 的查询规划依赖 ANALYZE 统计信息，数据量很小时得到的计划没有参考价值，
+所以默认在内存中生成一份样本数据库（数万条任务 + ANALYZE）再检查。
+
+用法：
+    python -m app.db.query_plan             # 样本数据库，有全表扫描时返回码为 1
+    python -m app.db.query_plan --current   # 检查当前配置的数据库
+"""
+import random
+import re
+import sys
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Query, Session, sessionmaker
+
+from app import models
+from app.services.list_fields import TASK_LIST_FIELDS
+from app.services.task_queries import (
+    DASHBOARD_TASK_COUNTS, DASHBOARD_TOP_TASKS, TASK_PAGE_DEFAULT, TASK_VIEWS, dashboard_task_counters,
+    encode_task_cursor, task_keyset_params, task_list_statement, task_query_params, week_range,
+)
+from app.services.calendar import calendar_tasks_statement, month_grid_range
+
+# "SCAN tasks" / "SCAN tasks USING INDEX ..." 都表示遍历整张表（或整个索引）
+_FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(\w+)")
+
+# 分页查询的排序必须由索引提供的视图（历史任务无上限）
+SORTED_PAGE_VIEWS = ("all", "completed")
+# 其他排序必须由索引提供的查询
+SORTED_QUERIES = ("tasks:by_priority",)
+_TEMP_SORT = re.compile(r"^USE TEMP B-TREE FOR (RIGHT PART OF )?ORDER BY")
+
+
+def explain_query_plan(db: Session, query) -> List[str]:
+    """返回查询（Query 或 select 语句）的执行计划（每个步骤一行）"""
+    statement = query.statement if isinstance(query, Query) else query
+    compiled = statement.compile(
+        dialect=db.get_bind().dialect,
+        compile_kwargs={"literal_binds": True},
+    )
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").fetchall()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    """执行计划中全表扫描的步骤"""
+    return [step for step in plan if _FULL_SCAN.match(step)]
+
+
+def temp_sorts(plan: List[str]) -> List[str]:
+    """执行计划中需要临时 B 树排序的步骤"""
+    return [step for step in plan if _TEMP_SORT.match(step)]
+
+
+def task_queries(db: Session, user_id: int = 1, today: Optional[date] = None) -> Dict[str, object]:
+    """需要检查的全部任务查询（名称 -> Query / select 语句），预构建的语句代入参数后检查"""
+    today = today or date.today()
+    Task = models.Task
+    queries = {}
+    params = task_query_params(user_id, today)
+    page_params = {
+        **params,
+        **task_keyset_params(encode_task_cursor(datetime.now(), 10 ** 9)),
+        "limit": TASK_PAGE_DEFAULT + 1,
+    }
+    names = TASK_LIST_FIELDS.parse(None)
+
+    for view in TASK_VIEWS:
+        queries[f"tasks:{view}"] = task_list_statement(view, names).params(params)
+        queries[f"tasks:{view}:page"] = task_list_statement(view, names, True, True).params(page_params)
+
+    for name, criteria in dashboard_task_counters().items():
+        queries[f"dashboard:{name}"] = db.query(func.count(Task.id)).filter(
+            Task.user_id == user_id,
+            *criteria
+        ).params(params)
+
+    week_start, week_end = week_range(today)
+    queries["calendar:range"] = calendar_tasks_statement(user_id, week_start, week_end)
+    queries["calendar:range_completed"] = calendar_tasks_statement(user_id, week_start, week_end, include_completed=True)
+    month_start, month_end = month_grid_range(today.year, today.month)
+    queries["calendar:month"] = calendar_tasks_statement(user_id, month_start, month_end)
+
+    queries["dashboard:task_counts"] = DASHBOARD_TASK_COUNTS.params(params)
+    queries["dashboard:top_tasks"] = DASHBOARD_TOP_TASKS.params(params)
+
+    # 按优先级从高到低、截止日期排序的任务列表（app/api/tasks.py）
+    queries["tasks:by_priority"] = db.query(Task).filter(
+        Task.user_id == user_id
+    ).order_by(Task.priority_rank.desc(), Task.due_date.asc())
+
+    return queries
+
+
+def check_task_query_plans(db: Session, user_id: int = 1, today: Optional[date] = None) -> Dict[str, List[str]]:
+    """
+    检查所有任务查询的执行计划
+
+    返回 {查询名称: 全表扫描 / 临时排序步骤}，只包含有问题的查询；空字典表示全部走索引
+    """
+    problems = {}
+    for name, query in task_queries(db, user_id, today).items():
+        plan = explain_query_plan(db, query)
+        scans = full_scans(plan)
+        if (name.endswith(":page") and name.split(":")[1] in SORTED_PAGE_VIEWS) or name in SORTED_QUERIES:
+            scans += temp_sorts(plan)
+        if scans:
+            problems[name] = scans
+    return problems
+
+
+def sample_task_rows(task_count: int = 20000, seed: int = 42, user_id: int = 1) -> List[dict]:
+    """生成样本任务数据（历史任务大部分已完成，分布接近真实使用）"""
+    rnd = random.Random(seed)
+    today = date.today()
+    now = datetime.now()
+    rows = []
+    for _ in range(task_count):
+        task_type = rnd.choice(list(models.TaskType))
+        # 历史任务大部分已完成
+        status = models.TaskStatus.COMPLETED if rnd.random() < 0.95 else rnd.choice(list(models.TaskStatus))
+        rows.append({
+            "user_id": user_id,
+            "project_id": rnd.randint(1, 50) if rnd.random() < 0.5 else None,
+            "title": "sample",
+            "task_type": task_type.name,
+            "status": status.name,
+            "priority": rnd.choice(list(models.TaskPriority)).name,
+            "due_date": today + timedelta(days=rnd.randint(-1000, 60)) if rnd.random() < 0.6 else None,
+            "scheduled_date": today + timedelta(days=rnd.randint(-1000, 60)) if rnd.random() < 0.5 else None,
+            "completed_at": now - timedelta(days=rnd.randint(0, 1000)) if status == models.TaskStatus.COMPLETED else None,
+            "is_inbox": 1 if task_type == models.TaskType.INBOX else 0,
+            "created_at": now - timedelta(days=rnd.randint(0, 1000)),
+        })
+    return rows
+
+
+def sample_session(task_count: int = 20000, seed: int = 42) -> Session:
+    """生成一份带统计信息的内存样本数据库，返回其会话"""
+    from app.db.database import Base
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        conn.execute(models.Task.__table__.insert(), sample_task_rows(task_count, seed))
+        conn.exec_driver_sql("ANALYZE")
+    return sessionmaker(bind=engine)()
+
+
+if __name__ == "__main__":
+    if "--current" in sys.argv:
+        from app.db.database import SessionLocal
+        db = SessionLocal()
+    else:
+        db = sample_session()
+    try:
+        if db.get_bind().dialect.name != "sqlite":
+            print("[PLAN] 仅支持 SQLite")
+            sys.exit(0)
+        problems = check_task_query_plans(db)
+    finally:
+        db.close()
+
+    if problems:
+        for name, scans in problems.items():
+            print(f"[PLAN] {name}: {'; '.join(scans)}")
+        sys.exit(1)
+    print("[PLAN] 所有任务查询均使用索引")
@@ -0,0 +1,436 @@
+"""
+增量复制与按时间点恢复（仅 SQLite）
+
+每隔 REPLICA_INTERVAL 秒把数据库中发生变化的页面复制到 REPLICA_DIR，
+恢复点从"每晚一次全量备份"缩短到一个复制周期，而且每次只写入变化的页面。
+
+复制目录中的文件：
+    00000001-20240220-030000.full.gz    全量快照（所有页面）
+    00000002-20240220-030100.delta.gz   增量快照（相对上一次快照变化的页面）
+    .page_hashes                        最近一次快照的页大小和每个页面的摘要，用于找出变化的页面
+    .snapshot.db                        回滚日志模式下读取页面用的临时副本（读完即删除）
+
+两种快照格式相同：头部（魔数、页大小、总页数、页面数）+ 若干个（页号, 页面内容）。
+恢复时取目标时间点之前最近的全量快照，依次叠加其后的增量快照。
+每 REPLICA_FULL_EVERY 个增量生成一次新的全量快照，只保留最近 REPLICA_KEEP_FULL 轮。
+
+一致性：WAL 模式下短暂持有写锁，把 WAL 全部合并回主文件后开始一个读事务再释放写锁，
+之后在读事务中逐页读取主文件、计算摘要（期间检查点不会改写主文件，写请求照常提交）。
+写请求只需等待合并本周期新增的 WAL 帧，与数据库大小无关。
+回滚日志模式（default 存储配置）下读事务会挡住所有提交，改为用备份 API 先复制一份再读取，
+写请求要等复制整个库的时间，数据库较大时请使用 production（WAL）配置。
+没有新提交时（PRAGMA data_version 未变化）直接跳过本周期。
+
+同一个复制目录只能有一个复制进程（应用内置线程或命令行 run 二选一）。
+
+用法：
+    python -m app.db.replication run                    # 持续复制
+    python -m app.db.replication snapshot [--full]      # 复制一次
+    python -m app.db.replication list                   # 列出快照
+    python -m app.db.replication restore /tmp/restored.db --at 2024-02-20T03:00:00
+"""
+import argparse
+import gzip
+import hashlib
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.db.backup import sqlite_database_path
+
+settings = get_settings()
+
+_MAGIC = b"LFPAGES1"
+_HEADER = struct.Struct("<8sIII")   # 魔数, 页大小, 总页数, 本文件中的页面数
+_PAGE_NO = struct.Struct("<I")
+_DIGEST_SIZE = 16
+_SNAPSHOT_FILE = re.compile(r"^(\d{8})-(\d{8}-\d{6})\.(full|delta)\.gz$")
+_HASHES_FILE = ".page_hashes"
+_COPY_FILE = ".snapshot.db"   # 回滚日志模式下读取页面用的临时副本
+
+# 复制状态与指标（管理接口读取）
+replication_status: Dict[str, object] = {
+    "running": False,
+    "last_seq": None,
+    "last_run_at": None,
+    "last_pages": 0,
+    "last_bytes": 0,
+    "last_duration_ms": None,
+    "lock_ms": None,
+    "snapshots": 0,
+    "skipped": 0,
+    "errors": 0,
+    "last_error": None,
+}
+
+
+def list_snapshots(replica_dir: Optional[str] = None) -> List[Dict[str, object]]:
+    """复制目录中的快照（按序号从旧到新）"""
+    replica_dir = replica_dir or settings.REPLICA_DIR
+    if not replica_dir or not os.path.isdir(replica_dir):
+        return []
+    snapshots = []
+    for name in os.listdir(replica_dir):
+        match = _SNAPSHOT_FILE.match(name)
+        if match:
+            snapshots.append({
+                "seq": int(match.group(1)),
+                "time": datetime.strptime(match.group(2), "%Y%m%d-%H%M%S"),
+                "kind": match.group(3),
+                "file": name,
+                "size": os.path.getsize(os.path.join(replica_dir, name)),
+            })
+    return sorted(snapshots, key=lambda s: s["seq"])
+
+
+def _write_pages(path: str, page_size: int, page_count: int, pages: List[Tuple[int, bytes]]) -> int:
+    """写入一个快照文件（先写 .part 再改名），返回压缩后的字节数"""
+    with gzip.open(path + ".part", "wb", compresslevel=6) as f:
+        f.write(_HEADER.pack(_MAGIC, page_size, page_count, len(pages)))
+        for page_no, data in pages:
+            f.write(_PAGE_NO.pack(page_no))
+            f.write(data)
+    os.replace(path + ".part", path)
+    return os.path.getsize(path)
+
+
+def _read_pages(path: str) -> Tuple[int, int, Iterator[Tuple[int, bytes]]]:
+    """读取快照文件，返回 (页大小, 总页数, 页面迭代器)"""
+    f = gzip.open(path, "rb")
+    magic, page_size, page_count, count = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != _MAGIC:
+        f.close()
+        raise ValueError(f"不是有效的快照文件: {path}")
+
+    def pages():
+        with f:
+            for _ in range(count):
+                (page_no,) = _PAGE_NO.unpack(f.read(_PAGE_NO.size))
+                yield page_no, f.read(page_size)
+
+    return page_size, page_count, pages()
+
+
+class Replicator:
+    """把数据库变化的页面增量复制到复制目录"""
+
+    def __init__(self, source: Optional[str] = None, replica_dir: Optional[str] = None):
+        self.source = source or sqlite_database_path()
+        self.replica_dir = replica_dir or settings.REPLICA_DIR
+        if not self.replica_dir:
+            raise ValueError("未配置复制目录 REPLICA_DIR")
+        os.makedirs(self.replica_dir, exist_ok=True)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._read_conn: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- 页面读取 ----------
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # isolation_level=None：事务由这里显式控制
+            self._conn = sqlite3.connect(self.source, timeout=30, isolation_level=None, check_same_thread=False)
+        return self._conn
+
+    def _reader(self) -> sqlite3.Connection:
+        if self._read_conn is None:
+            self._read_conn = sqlite3.connect(self.source, timeout=30, isolation_level=None, check_same_thread=False)
+        return self._read_conn
+
+    @contextmanager
+    def _consistent_file(self) -> Iterator[Tuple[str, float]]:
+        """
+        一致的数据库文件，返回 (文件路径, 阻塞写请求的毫秒数)
+
+        WAL 模式：持写锁把 WAL 全部合并回主文件，并在另一个连接上开始读事务后立即释放写锁。
+        WAL 已全部合并时开始的读事务直接读主文件（占用 0 号读锁），在它结束之前任何检查点
+        都不能再改写主文件，写请求照常提交（只追加到 WAL），逐页读取和计算摘要都在锁外完成。
+
+        回滚日志模式：读事务会挡住所有提交，改用备份 API 一次复制整个库（pages=-1，
+        只在原样复制页面的这段时间持有共享锁），再从副本读取
+        """
+        conn = self._connection()
+        if conn.execute("PRAGMA journal_mode").fetchone()[0].lower() != "wal":
+            copy_path = os.path.join(self.replica_dir, _COPY_FILE)
+            if os.path.exists(copy_path):
+                os.remove(copy_path)
+            locked_at = time.perf_counter()
+            target = sqlite3.connect(copy_path)
+            try:
+                # 临时副本不需要落盘保证，少写日志、不做 fsync
+                target.execute("PRAGMA journal_mode = OFF")
+                target.execute("PRAGMA synchronous = OFF")
+                conn.backup(target)
+            finally:
+                target.close()
+            lock_ms = (time.perf_counter() - locked_at) * 1000
+            try:
+                yield copy_path, lock_ms
+            finally:
+                os.remove(copy_path)
+            return
+
+        reader = self._reader()
+        for attempt in range(50):
+            conn.execute("BEGIN IMMEDIATE")
+            locked_at = time.perf_counter()
+            try:
+                # 仍有读请求停留在旧版本时合并不完整，释放锁稍后重试
+                merged = self._checkpoint()
+                if merged:
+                    reader.execute("BEGIN")
+                    reader.execute("SELECT count(*) FROM sqlite_master").fetchone()
+            finally:
+                conn.execute("ROLLBACK")
+            if merged:
+                lock_ms = (time.perf_counter() - locked_at) * 1000
+                try:
+                    yield self.source, lock_ms
+                finally:
+                    reader.execute("ROLLBACK")
+                return
+            time.sleep(0.01 * (attempt + 1))
+        raise RuntimeError("WAL 一直无法完整合并（有长时间运行的读请求），未能取得一致的快照")
+
+    def _scan(self, previous: List[bytes], page_size_before: int, full: bool) -> Tuple[int, List[bytes], List[Tuple[int, bytes]], float]:
+        """
+        从一致的快照中逐页读取数据库
+
+        返回 (页大小, 每页摘要, 需要写入快照的页面, 阻塞写请求的毫秒数)；
+        full 为 True 或页大小变化时返回全部页面，否则只返回摘要与 previous 不同的页面
+        """
+        with self._consistent_file() as (path, lock_ms):
+            with open(path, "rb") as f:
+                header = f.read(100)
+                page_size = struct.unpack(">H", header[16:18])[0]
+                page_size = 65536 if page_size == 1 else page_size
+                full = full or page_size != page_size_before
+                f.seek(0)
+                digests, pages = [], []
+                while True:
+                    data = f.read(page_size)
+                    if not data:
+                        break
+                    digest = hashlib.blake2b(data, digest_size=_DIGEST_SIZE).digest()
+                    index = len(digests)
+                    if full or index >= len(previous) or previous[index] != digest:
+                        pages.append((index + 1, data))
+                    digests.append(digest)
+        return page_size, digests, pages, lock_ms
+
+    def _checkpoint(self) -> bool:
+        """把 WAL 中的全部帧合并回主文件，成功时返回 True"""
+        checkpointer = sqlite3.connect(self.source, timeout=1)
+        try:
+            busy, log_frames, checkpointed = checkpointer.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        finally:
+            checkpointer.close()
+        return busy == 0 and log_frames == checkpointed
+
+    def _load_hashes(self) -> Tuple[int, List[bytes]]:
+        """上次快照的 (页大小, 每页摘要)"""
+        path = os.path.join(self.replica_dir, _HASHES_FILE)
+        if not os.path.exists(path):
+            return 0, []
+        with open(path, "rb") as f:
+            raw = f.read()
+        (page_size,) = _PAGE_NO.unpack(raw[:_PAGE_NO.size])
+        raw = raw[_PAGE_NO.size:]
+        return page_size, [raw[i:i + _DIGEST_SIZE] for i in range(0, len(raw), _DIGEST_SIZE)]
+
+    def _save_hashes(self, page_size: int, digests: List[bytes]) -> None:
+        path = os.path.join(self.replica_dir, _HASHES_FILE)
+        with open(path + ".part", "wb") as f:
+            f.write(_PAGE_NO.pack(page_size))
+            f.write(b"".join(digests))
+        os.replace(path + ".part", path)
+
+    def _changed(self) -> bool:
+        """自上次快照以来是否有新的提交"""
+        version = self._connection().execute("PRAGMA data_version").fetchone()[0]
+        changed = version != self._data_version
+        self._data_version = version
+        return changed
+
+    # ---------- 快照 ----------
+    def snapshot(self, full: bool = False) -> Optional[Dict[str, object]]:
+        """
+        复制一次，返回本次快照的信息；没有变化时返回 None
+
+        没有历史快照、页大小变化、或距离上次全量已有 REPLICA_FULL_EVERY 个增量时自动生成全量快照
+        """
+        with self._lock:
+            start = time.perf_counter()
+            history = list_snapshots(self.replica_dir)
+            if not self._changed() and history and not full:
+                replication_status["skipped"] += 1
+                return None
+
+            previous_page_size, previous = self._load_hashes() if history else (0, [])
+            last_full = max((s["seq"] for s in history if s["kind"] == "full"), default=None)
+            deltas_since_full = sum(1 for s in history if last_full is not None and s["seq"] > last_full)
+            full = (
+                full or last_full is None or not previous
+                or deltas_since_full >= settings.REPLICA_FULL_EVERY
+            )
+            page_size, digests, pages, lock_ms = self._scan(previous, previous_page_size, full)
+            full = full or page_size != previous_page_size
+            if not full and not pages and len(digests) == len(previous):
+                replication_status["skipped"] += 1
+                return None
+
+            kind = "full" if full else "delta"
+            seq = (history[-1]["seq"] + 1) if history else 1
+            name = f"{seq:08d}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{kind}.gz"
+            size = _write_pages(os.path.join(self.replica_dir, name), page_size, len(digests), pages)
+            self._save_hashes(page_size, digests)
+            if full:
+                self._prune()
+
+            info = {
+                "seq": seq,
+                "kind": kind,
+                "file": name,
+                "pages": len(pages),
+                "page_count": len(digests),
+                "bytes": size,
+                "lock_ms": round(lock_ms, 1),
+                "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+            }
+            replication_status.update(
+                last_seq=seq, last_run_at=datetime.now().isoformat(), last_pages=len(pages),
+                last_bytes=size, last_duration_ms=info["duration_ms"], lock_ms=info["lock_ms"],
+                snapshots=replication_status["snapshots"] + 1,
+            )
+            return info
+
+    def _prune(self) -> None:
+        """只保留最近 REPLICA_KEEP_FULL 轮（全量快照及其后的增量）"""
+        history = list_snapshots(self.replica_dir)
+        fulls = [s["seq"] for s in history if s["kind"] == "full"]
+        if len(fulls) <= settings.REPLICA_KEEP_FULL:
+            return
+        oldest_kept = fulls[-max(settings.REPLICA_KEEP_FULL, 1)]
+        for s in history:
+            if s["seq"] < oldest_kept:
+                os.remove(os.path.join(self.replica_dir, s["file"]))
+
+    # ---------- 后台线程 ----------
+    def run_forever(self, interval: Optional[float] = None) -> None:
+        """按固定间隔持续复制，直到 stop() 被调用"""
+        interval = interval or settings.REPLICA_INTERVAL
+        replication_status["running"] = True
+        try:
+            while not self._stop.is_set():
+                try:
+                    info = self.snapshot()
+                    if info:
+                        print(f"[REPLICA] {info['file']}：{info['pages']} 页，{info['bytes']} 字节，"
+                              f"阻塞写入 {info['lock_ms']}ms")
+                except Exception as e:
+                    replication_status.update(errors=replication_status["errors"] + 1, last_error=str(e))
+                    print(f"[REPLICA] 复制失败: {e}")
+                self._stop.wait(interval)
+        finally:
+            replication_status["running"] = False
+
+    def start(self) -> None:
+        """在后台线程中开始持续复制"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="lifeflow-replicator", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台复制（会等待当前这次复制完成）"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        for conn in (self._conn, self._read_conn):
+            if conn is not None:
+                conn.close()
+        self._conn = self._read_conn = None
+
+
+def restore(target: str, at: Optional[datetime] = None, replica_dir: Optional[str] = None) -> Dict[str, object]:
+    """
+    把数据库恢复到 at 时间点（默认最新）之前最近的一次快照，写入 target
+
+    target 不能是正在使用的数据库文件：先恢复到新文件，停服务后再替换
+    """
+    replica_dir = replica_dir or settings.REPLICA_DIR
+    history = [s for s in list_snapshots(replica_dir) if at is None or s["time"] <= at]
+    fulls = [i for i, s in enumerate(history) if s["kind"] == "full"]
+    if not fulls:
+        raise ValueError("指定时间点之前没有可用的全量快照")
+    chain = history[fulls[-1]:]
+
+    part_path = target + ".part"
+    page_size = page_count = 0
+    with open(part_path, "wb") as out:
+        for snapshot in chain:
+            page_size, page_count, pages = _read_pages(os.path.join(replica_dir, snapshot["file"]))
+            for page_no, data in pages:
+                out.seek((page_no - 1) * page_size)
+                out.write(data)
+        out.truncate(page_count * page_size)
+
+    conn = sqlite3.connect(part_path)
+    try:
+        check = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+    if check != "ok":
+        os.remove(part_path)
+        raise RuntimeError(f"恢复结果校验失败: {check}")
+    os.replace(part_path, target)
+    return {
+        "target": target,
+        "seq": chain[-1]["seq"],
+        "time": chain[-1]["time"].isoformat(),
+        "snapshots": len(chain),
+        "page_count": page_count,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite 增量复制与按时间点恢复")
+    parser.add_argument("--dir", default=None, help="复制目录（默认 REPLICA_DIR）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("run", help="持续复制")
+    snap = sub.add_parser("snapshot", help="复制一次")
+    snap.add_argument("--full", action="store_true", help="生成全量快照")
+    sub.add_parser("list", help="列出快照")
+    rest = sub.add_parser("restore", help="按时间点恢复到新文件")
+    rest.add_argument("target", help="恢复出的数据库文件路径")
+    rest.add_argument("--at", default=None, help="时间点（ISO 格式，如 2024-02-20T03:00:00），默认最新")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for s in list_snapshots(args.dir):
+            print(f"[REPLICA] {s['file']}  {s['size']} 字节")
+    elif args.command == "restore":
+        at = datetime.fromisoformat(args.at) if args.at else None
+        result = restore(args.target, at, args.dir)
+        print(f"[REPLICA] 已恢复到 {result['target']}（快照 #{result['seq']}，{result['time']}，"
+              f"叠加 {result['snapshots']} 个快照，{result['page_count']} 页）")
+    else:
+        replicator = Replicator(replica_dir=args.dir)
+        if args.command == "snapshot":
+            info = replicator.snapshot(full=args.full)
+            print(f"[REPLICA] {info['file']}：{info['pages']} 页，{info['bytes']} 字节" if info else "[REPLICA] 没有变化")
+        else:
+            print(f"[REPLICA] 开始复制 {replicator.source} -> {replicator.replica_dir}，间隔 {settings.REPLICA_INTERVAL}s")
+            try:
+                replicator.run_forever()
+            except KeyboardInterrupt:
+                pass
@@ -0,0 +1,147 @@
+"""
+全文搜索基准测试
+
+重建一份独立的测试库，写入 --docs 条样本记录（95% 任务、5% 项目，标题和正文从固定词表中
+按长尾分布抽取：少数词非常常见，大多数词很少出现），全量建立搜索索引后，
+测量常见词、少见词、多关键字、英文前缀、类型过滤等查询的耗时。
+
+不要指向正在使用的数据库。
+
+用法：
+    python -m app.db.search_benchmark                       # 默认 100 万条
+    python -m app.db.search_benchmark --docs 200000 --repeat 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import models
+from app.db.search_index import rebuild_search_index
+from app.services.search import search
+
+# 样本词表：两字中文词 + 英文单词，越靠前出现得越多
+CJK_WORDS = [a + b for a in "学习工作健身阅读写作项目会议计划复盘整理" for b in "报告笔记总结方案清单目标习惯记录安排日程"]
+LATIN_WORDS = [
+    "review", "meeting", "report", "reading", "running", "design", "release", "budget", "travel", "refactor",
+    "invoice", "backup", "deploy", "interview", "research", "workshop", "yoga", "swimming", "guitar", "kotlin",
+]
+BATCH = 20000
+
+# 名称 -> (关键字, 类型过滤)
+QUERIES: Dict[str, Tuple[str, List[str]]] = {
+    "常见词": (CJK_WORDS[0], []),
+    "中频词": (CJK_WORDS[40], []),
+    "少见词": (CJK_WORDS[-1], []),
+    "单字": (CJK_WORDS[-1][0], []),
+    "两个关键字": (f"{CJK_WORDS[3]} {CJK_WORDS[60]}", []),
+    "英文前缀": (LATIN_WORDS[-1][:3], []),
+    "只搜项目": (CJK_WORDS[40], ["project"]),
+    "无结果": ("不存在的词", []),
+}
+
+
+def _words(rnd: random.Random, count: int) -> str:
+    vocab = CJK_WORDS + LATIN_WORDS
+    weights = [1 / (rank + 1) for rank in range(len(vocab))]
+    return " ".join(rnd.choices(vocab, weights, k=count))
+
+
+def seed(engine: Engine, docs: int, seed_value: int = 42) -> None:
+    """重建表结构，分批写入样本记录（此时还没有索引表，触发器不生效）"""
+    from app.db.database import Base
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    rnd = random.Random(seed_value)
+    projects = docs // 20
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [{"id": 1, "username": "bench", "hashed_password": "-"}])
+        for start in range(1, projects + 1, BATCH):
+            conn.execute(models.Project.__table__.insert(), [
+                {"id": i, "user_id": 1, "name": _words(rnd, 2), "description": _words(rnd, 12),
+                 "status": models.ProjectStatus.ACTIVE.name}
+                for i in range(start, min(start + BATCH, projects + 1))
+            ])
+        for start in range(1, docs - projects + 1, BATCH):
+            conn.execute(models.Task.__table__.insert(), [
+                {"id": i, "user_id": 1, "title": _words(rnd, rnd.randint(2, 4)), "description": _words(rnd, rnd.randint(0, 20)),
+                 "task_type": models.TaskType.TODO.name, "status": models.TaskStatus.PENDING.name,
+                 "priority": models.TaskPriority.MEDIUM.name, "is_inbox": 0}
+                for i in range(start, min(start + BATCH, docs - projects + 1))
+            ])
+
+
+async def run(path: str, repeat: int) -> Dict[str, Tuple[List[float], int]]:
+    """每个查询先预热一次，再执行 repeat 次，返回 名称 -> (每次耗时毫秒, 结果数)"""
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(async_engine)
+    results = {}
+    try:
+        async with session_factory() as db:
+            for name, (q, types) in QUERIES.items():
+                rows = await search(db, 1, q, types)
+                samples = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    await search(db, 1, q, types)
+                    samples.append((time.perf_counter() - start) * 1000)
+                results[name] = (samples, len(rows))
+    finally:
+        await async_engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="全文搜索基准测试")
+    parser.add_argument("--docs", type=int, default=1000000, help="样本记录数")
+    parser.add_argument("--repeat", type=int, default=20, help="每个查询的执行次数")
+    parser.add_argument("--sqlite", default="", help="测试库路径（默认临时文件）")
+    args = parser.parse_args()
+
+    from app.core.config import get_settings
+    from app.db.database import apply_sqlite_profile, get_sqlite_profile
+
+    tmp_dir = None
+    if args.sqlite:
+        path = args.sqlite
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix="lifeflow-search-bench-")
+        path = os.path.join(tmp_dir, "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    apply_sqlite_profile(engine, get_sqlite_profile(get_settings().SQLITE_PROFILE))
+
+    try:
+        start = time.perf_counter()
+        seed(engine, args.docs)
+        print(f"[BENCH] 写入 {args.docs} 条记录用时 {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            rebuild_search_index(conn)
+        engine.dispose()
+        print(f"[BENCH] 建立搜索索引用时 {time.perf_counter() - start:.1f}s，"
+              f"数据库 {os.path.getsize(path) / 1024 / 1024:.0f}MB")
+
+        results = asyncio.run(run(path, args.repeat))
+        print(f"[BENCH] 每个查询执行 {args.repeat} 次（毫秒，中位数 / 最大值，返回前 20 条）")
+        for name, (samples, count) in results.items():
+            q, types = QUERIES[name]
+            label = f"{q}{' [' + ','.join(types) + ']' if types else ''}"
+            print(f"  {name:<8} {label:<28} {statistics.median(samples):8.2f} / {max(samples):8.2f}  ({count} 条)")
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
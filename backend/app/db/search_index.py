@@ -0,0 +1,256 @@
+"""
+全文搜索索引（仅 SQLite，FTS5）
+
+任务、项目（含大纲）、目标、复盘写入同一张 FTS5 虚拟表 search_index，
+rowid = 记录 id * 4 + 类型编号。kind 列（task / project / goal / review）也建了索引，
+按类型过滤直接在倒排表上完成。
+
+分词：unicode61 会把连续的汉字当成一个词，搜不到词中间的部分；
+trigram 分词又要求关键字至少 3 个字符，常见的两字词（"健身"、"读书"）搜不到。
+这里在写入索引前用 search_tokens() 把每个汉字拆成单独的词，
+查询时汉字按短语（相邻）匹配，任意长度都能搜到；英文、数字仍按单词索引，支持前缀匹配。
+
+同步：分词在 Python 中完成，索引由应用维护（不用触发器，数据库里没有依赖自定义函数的对象，
+sqlite3 命令行、备份恢复工具都可以正常读写这几张表）。读写会话提交前（track_search_index），
+按本次提交写过的记录（data_version 记下的变化，包括 ORM 和逐行记录的批量语句）
+重新读取这些记录并更新索引行，与数据在同一个事务中提交。
+
+不经过应用的写入（sqlite3 命令行、其他脚本）不会更新索引，之后全量重建即可；
+恢复了没有索引的旧备份、或怀疑索引与数据不一致时也一样：
+    python -m app.db.search_index
+"""
+import re
+from typing import Dict, Iterable, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, event, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import sessionmaker
+
+from app.services.data_version import session_changes
+
+SEARCH_TABLE = "search_index"
+
+# 排序（FTS5 的 rank 列）：bm25，标题命中的权重是正文的 10 倍，kind 列只用于类型过滤，不参与打分
+SEARCH_RANK = "bm25(10.0, 1.0, 0.0)"
+
+# 汉字（含扩展 A 区、兼容汉字）、日文假名、韩文音节：逐字拆开索引
+CJK_CHARS = "぀-ヿ㐀-䶿一-鿿가-힯豈-﫿"
+_CJK = re.compile(f"([{CJK_CHARS}])")
+_SPACES = re.compile(r"\s+")
+
+# 重建索引时每批读取的记录数
+REBUILD_BATCH = 5000
+
+
+class SearchSource(NamedTuple):
+    """一种被索引的记录：{r} 替换为表名"""
+    code: int        # rowid 中的类型编号
+    table: str
+    title: str       # 标题表达式
+    body: str        # 正文表达式
+
+
+def _concat(*columns: str) -> str:
+    return " || ' ' || ".join(f"coalesce({{r}}.{c}, '')" for c in columns)
+
+
+_REVIEW_TITLE = (
+    "CASE {r}.period "
+    "WHEN 'DAILY' THEN coalesce({r}.date, '') || ' 日复盘' "
+    "WHEN 'WEEKLY' THEN {r}.year || '年第' || coalesce({r}.week, '') || '周复盘' "
+    "WHEN 'MONTHLY' THEN {r}.year || '年' || coalesce({r}.month, '') || '月复盘' "
+    "WHEN 'QUARTERLY' THEN {r}.year || '年第' || coalesce({r}.quarter, '') || '季度复盘' "
+    "ELSE {r}.year || '年度复盘' END"
+)
+
+_REVIEW_TEXT = (
+    "highlights", "challenges", "learnings", "next_steps", "gratitude", "keep", "problem", '"try"',
+    "objective_summary", "reflective_summary", "interpretive_summary", "decisional_summary",
+)
+
+# 类型名 -> 索引来源（类型编号一旦使用不能修改，否则 rowid 会对不上）
+SEARCH_SOURCES: Dict[str, SearchSource] = {
+    "task": SearchSource(0, "tasks", "{r}.title", _concat("description")),
+    "project": SearchSource(1, "projects", "{r}.name", _concat("description", "outline")),
+    "goal": SearchSource(2, "goals", "{r}.title", _concat("description")),
+    "review": SearchSource(3, "reviews", _REVIEW_TITLE, _concat(*_REVIEW_TEXT)),
+}
+SEARCH_TYPE_COUNT = 4
+
+# 表名 -> (类型名, 索引来源)
+SOURCES_BY_TABLE: Dict[str, Tuple[str, SearchSource]] = {
+    source.table: (kind, source) for kind, source in SEARCH_SOURCES.items()
+}
+
+# 旧版本用触发器同步索引（触发器调用注册在应用连接上的函数），升级时删除
+LEGACY_TRIGGERS = [
+    f"{SEARCH_TABLE}_{source.table}_{suffix}" for source in SEARCH_SOURCES.values() for suffix in ("ai", "ad", "au")
+]
+
+
+def search_tokens(value: Optional[str]) -> str:
+    """写入索引 / 构造查询前的预处理：每个汉字前后加空格，合并连续空白"""
+    if not value:
+        return ""
+    return _SPACES.sub(" ", _CJK.sub(r" \1 ", value)).strip()
+
+
+def _source_select(source: SearchSource, where: str) -> str:
+    r = source.table
+    return (
+        f"SELECT {r}.id AS id, {r}.user_id AS user_id, {source.title.format(r=r)} AS title, "
+        f"{source.body.format(r=r)} AS body FROM {r} WHERE {where}"
+    )
+
+
+# 预先构建的语句：按 id 读取记录、按 id 分批读取整张表、按 rowid 读取索引行、写入 / 删除索引行
+_ROWS_BY_ID = {
+    table: text(_source_select(source, f"{table}.id IN :ids")).bindparams(bindparam("ids", expanding=True))
+    for table, (_, source) in SOURCES_BY_TABLE.items()
+}
+_ROWS_AFTER = {
+    table: text(_source_select(source, f"{table}.id > :after") + f" ORDER BY {table}.id LIMIT :limit")
+    for table, (_, source) in SOURCES_BY_TABLE.items()
+}
+_INDEXED_ROWS = text(
+    f"SELECT rowid, title, body, user_id FROM {SEARCH_TABLE} WHERE rowid IN :rowids"
+).bindparams(bindparam("rowids", expanding=True))
+_INSERT = text(
+    f"INSERT INTO {SEARCH_TABLE} (rowid, title, body, kind, user_id) VALUES (:rowid, :title, :body, :kind, :user_id)"
+)
+_DELETE = text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :rowid")
+
+
+def _index_row(kind: str, source: SearchSource, row) -> dict:
+    return {
+        "rowid": row.id * SEARCH_TYPE_COUNT + source.code,
+        "title": search_tokens(row.title),
+        "body": search_tokens(row.body),
+        "kind": kind,
+        "user_id": row.user_id,
+    }
+
+
+def search_index_ddl() -> list:
+    """建表与排序配置语句（均可重复执行）"""
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "title, body, kind, user_id UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+        f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rank) VALUES ('rank', '{SEARCH_RANK}')",
+    ]
+
+
+def create_search_index(conn: Connection) -> None:
+    """创建索引表，删除旧版本的同步触发器（非 SQLite 直接跳过）"""
+    if conn.dialect.name != "sqlite":
+        return
+    for statement in search_index_ddl():
+        conn.execute(text(statement))
+    for name in LEGACY_TRIGGERS:
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+
+def refresh_search_rows(db, table: str, ids: Iterable[int]) -> int:
+    """
+    按记录的当前内容更新索引行（db 为 Session 或 Connection），返回改写的索引行数
+
+    记录已删除时删除索引行；分词结果与索引中相同的不改写（只改了状态、计数等字段时不写索引）。
+    两条查询：读取记录 + 读取已有的索引行
+    """
+    kind, source = SOURCES_BY_TABLE[table]
+    ids = sorted(set(ids))
+    if not ids:
+        return 0
+    wanted = {}
+    for row in db.execute(_ROWS_BY_ID[table], {"ids": ids}):
+        item = _index_row(kind, source, row)
+        wanted[item["rowid"]] = item
+    rowids = [i * SEARCH_TYPE_COUNT + source.code for i in ids]
+    indexed = {row.rowid: row for row in db.execute(_INDEXED_ROWS, {"rowids": rowids})}
+
+    deletes, inserts = [], []
+    for rowid in rowids:
+        item, current = wanted.get(rowid), indexed.get(rowid)
+        if item is not None and current is not None and \
+                (current.title, current.body, current.user_id) == (item["title"], item["body"], item["user_id"]):
+            continue
+        if current is not None:
+            deletes.append({"rowid": rowid})
+        if item is not None:
+            inserts.append(item)
+    if deletes:
+        db.execute(_DELETE, deletes)
+    if inserts:
+        db.execute(_INSERT, inserts)
+    return len(deletes) + len(inserts)
+
+
+def _index_table(db, table: str) -> int:
+    """按 id 分批读取整张表写入索引，返回行数"""
+    kind, source = SOURCES_BY_TABLE[table]
+    count, after = 0, 0
+    while True:
+        rows = db.execute(_ROWS_AFTER[table], {"after": after, "limit": REBUILD_BATCH}).all()
+        if not rows:
+            return count
+        db.execute(_INSERT, [_index_row(kind, source, row) for row in rows])
+        count += len(rows)
+        after = rows[-1].id
+
+
+def refresh_search_table(db, table: str) -> int:
+    """重建一种记录的全部索引行（不知道改了哪些记录时使用），返回行数"""
+    code = SOURCES_BY_TABLE[table][1].code
+    db.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid % {SEARCH_TYPE_COUNT} = {code}"))
+    return _index_table(db, table)
+
+
+def rebuild_search_index(conn: Connection) -> Dict[str, int]:
+    """
+    清空并根据各表数据重建索引，返回 类型 -> 行数
+
+    不提交事务，由调用方提交；重建后合并 FTS5 的 b-tree 段（optimize），查询更快
+    """
+    create_search_index(conn)
+    conn.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    counts = {kind: _index_table(conn, source.table) for kind, source in SEARCH_SOURCES.items()}
+    conn.execute(text(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')"))
+    return counts
+
+
+def track_search_index(session_factory: sessionmaker) -> None:
+    """
+    在读写会话上注册事件：提交前按本次写过的记录更新索引（与数据在同一事务中提交）
+
+    需要先注册 data_version.track_writes。没有记录 id 的变化（未逐行记录的批量语句）重建该类型的全部索引行
+    """
+
+    @event.listens_for(session_factory, "before_commit")
+    def before_commit(session):
+        if session.get_bind().dialect.name != "sqlite":
+            return
+        session.flush()
+        pending: Dict[str, Set[Optional[int]]] = {}
+        for change in session_changes(session):
+            if change["type"] in SOURCES_BY_TABLE:
+                pending.setdefault(change["type"], set()).add(change["id"])
+        for table, ids in pending.items():
+            if None in ids:
+                refresh_search_table(session, table)
+            else:
+                refresh_search_rows(session, table, ids)
+
+
+if __name__ == "__main__":
+    import time
+
+    from app.db.database import engine
+
+    if engine.dialect.name != "sqlite":
+        raise SystemExit("[SEARCH] 全文搜索索引仅支持 SQLite")
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        counts = rebuild_search_index(conn)
+    summary = "，".join(f"{kind} {count}" for kind, count in counts.items())
+    print(f"[SEARCH] 已重建搜索索引：{summary}（用时 {(time.perf_counter() - start) * 1000:.0f}ms）")
@@ -0,0 +1,112 @@
+"""
+变更日志（增量同步用，仅 SQLite）
+
+任务、项目、里程碑、目标、关键结果、习惯、打卡、复盘每次插入 / 修改 / 删除，
+触发器都会在 sync_journal 中写入一行：(seq, 表名, 记录 id, 所属用户, 是否已删除)。
+seq 是 AUTOINCREMENT 主键，只增不减（删除最大的行也不会复用），可以直接当同步游标。
+
+每条记录在日志中只保留最新的一行（(entity, row_id) 唯一，INSERT OR REPLACE 会删掉旧行、
+分配新的 seq），日志的大小等于曾经存在过的记录数，而不是写入次数；删除的记录留下 deleted = 1 的墓碑。
+
+用触发器实现（只用 SQLite 内置的 SQL，不依赖应用注册的自定义函数），ORM、批量 Core 语句、
+级联删除、迁移脚本的写入都会记录，用 sqlite3 命令行直接改库也会记录。
+
+日志与数据不一致时（例如恢复了没有日志的旧备份）可以重建，重建前的墓碑会丢失，
+重建时写入一行重置标记（RESET_ENTITY），游标早于标记的客户端会被要求全量同步：
+    python -m app.db.sync_journal
+"""
+from typing import Dict
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+SYNC_TABLE = "sync_journal"
+
+# 重置标记的 entity（user_id 为空，不会出现在任何用户的变化中）
+RESET_ENTITY = "_reset"
+
+# 表名 -> 记录所属用户的表达式（{r} 在触发器中替换为 new / old，在重建时替换为表名）
+SYNC_SOURCES: Dict[str, str] = {
+    "tasks": "{r}.user_id",
+    "projects": "{r}.user_id",
+    "project_goals": "{r}.user_id",
+    "goals": "{r}.user_id",
+    # 关键结果没有 user_id，取所属目标的用户；目标先被删除时沿用日志中已记录的用户
+    "key_results": "coalesce((SELECT user_id FROM goals WHERE goals.id = {r}.goal_id), "
+                   "(SELECT user_id FROM sync_journal WHERE entity = 'key_results' AND row_id = {r}.id))",
+    "habits": "{r}.user_id",
+    "habit_logs": "{r}.user_id",
+    "reviews": "{r}.user_id",
+}
+
+
+def _journal_sql(table: str, row: str, deleted: int) -> str:
+    return (
+        f"INSERT OR REPLACE INTO {SYNC_TABLE} (entity, row_id, user_id, deleted) VALUES ("
+        f"'{table}', {row}.id, {SYNC_SOURCES[table].format(r=row)}, {deleted})"
+    )
+
+
+def sync_journal_ddl() -> list:
+    """建表与触发器语句（均可重复执行）"""
+    statements = [
+        f"CREATE TABLE IF NOT EXISTS {SYNC_TABLE} ("
+        "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "entity VARCHAR(32) NOT NULL, "
+        "row_id INTEGER NOT NULL, "
+        "user_id INTEGER, "
+        "deleted INTEGER NOT NULL DEFAULT 0, "
+        "UNIQUE (entity, row_id))",
+        # 同步查询：某个用户 seq 之后的变化
+        f"CREATE INDEX IF NOT EXISTS ix_{SYNC_TABLE}_user_seq ON {SYNC_TABLE} (user_id, seq)",
+    ]
+    for table in SYNC_SOURCES:
+        name = f"{SYNC_TABLE}_{table}"
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON {table} BEGIN "
+            f"{_journal_sql(table, 'new', 0)}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE ON {table} BEGIN "
+            f"{_journal_sql(table, 'new', 0)}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON {table} BEGIN "
+            f"{_journal_sql(table, 'old', 1)}; END",
+        ]
+    return statements
+
+
+def create_sync_journal(conn: Connection) -> None:
+    """创建日志表和触发器（非 SQLite 直接跳过）"""
+    if conn.dialect.name != "sqlite":
+        return
+    for statement in sync_journal_ddl():
+        conn.execute(text(statement))
+
+
+def rebuild_sync_journal(conn: Connection) -> Dict[str, int]:
+    """
+    清空并按各表现有记录重建日志，返回 表名 -> 行数；不提交事务，由调用方提交
+
+    先写入重置标记，再按记录写入（seq 从之前的最大值之后继续分配）：
+    墓碑已经丢失，游标早于标记的客户端收不到重建前的删除，同步接口会让它们全量同步
+    """
+    create_sync_journal(conn)
+    conn.execute(text(f"DELETE FROM {SYNC_TABLE}"))
+    conn.execute(text(f"INSERT INTO {SYNC_TABLE} (entity, row_id, user_id, deleted) VALUES ('{RESET_ENTITY}', 0, NULL, 0)"))
+    counts = {}
+    for table, user_expr in SYNC_SOURCES.items():
+        result = conn.execute(text(
+            f"INSERT INTO {SYNC_TABLE} (entity, row_id, user_id, deleted) "
+            f"SELECT '{table}', {table}.id, {user_expr.format(r=table)}, 0 FROM {table} ORDER BY {table}.id"
+        ))
+        counts[table] = result.rowcount
+    return counts
+
+
+if __name__ == "__main__":
+    from app.db.database import engine
+
+    if engine.dialect.name != "sqlite":
+        raise SystemExit("[SYNC] 变更日志仅支持 SQLite")
+    with engine.begin() as conn:
+        counts = rebuild_sync_journal(conn)
+    summary = "，".join(f"{table} {count}" for table, count in counts.items())
+    print(f"[SYNC] 已重建变更日志：{summary}（已同步的客户端需要全量同步）")
@@ -1,22 +1,50 @@
 """
 LifeFlow - 完整版本（含项目和增强任务管理）
 """
-from fastapi import FastAPI, Form, Depends, HTTPException, Query
+from fastapi import FastAPI, Form, Depends, HTTPException, Query, BackgroundTasks, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, insert, update, delete
+from pydantic import BaseModel, ValidationError
 from typing import Optional, List
+import asyncio
 import hashlib
 import json
 from datetime import date, datetime, timedelta
 
-from app.db.database import SessionLocal, engine, Base
+from app.db.database import (
+    SessionLocal, engine, read_engine, async_engine, Base, get_db, get_async_db, sqlite_pragma_report, compiled_cache_stats,
+)
+from app.core.config import get_settings
+from app.db.migrations import run_migrations
+from app.db.backup import BackupInProgress, backup_status, list_backups, reserve_backup, run_backup, sqlite_database_path
+from app.db.replication import Replicator, replication_status, list_snapshots
+from app.db.search_index import track_search_index
 from app import models
 from app.models.habit import HabitFrequency
-from app.models.task import TaskType, TaskStatus, TaskPriority
+from app.models.task import TaskType, TaskStatus, TaskPriority, PRIORITIES_BY_RANK, PRIORITY_RANKS
 from app.models.project import ProjectStatus
 from app.models.goal import GoalStatus
+from app.services.habit_heatmap import HEATMAP_DEFAULT_DAYS, HEATMAP_MAX_DAYS, habit_heatmap
+from app.services.habit_rollup import record_checkin, remove_habit_checkins
+from app.services.list_fields import GOAL_LIST_FIELDS, PROJECT_LIST_FIELDS, TASK_LIST_FIELDS
+from app.services.project_counters import (
+    NO_PROJECT, task_counter_state, task_counter_deltas, apply_task_counter_change, apply_project_task_deltas,
+    goal_counter_state, apply_goal_counter_change,
+)
+from app.services.calendar import AGENDA_MAX_DAYS, calendar_days, month_grid_range
+from app.services.dashboard import dashboard_cache, dashboard_counters
+from app.services.data_version import CHANGES_RECORDED, data_versions, record_change, track_writes
+from app.services.events import event_broker, format_sse, load_counters
+from app.services.export import EXPORT_FORMATS, EXPORT_SOURCES, export_chunks, export_headers
+from app.services.search import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, SEARCH_MAX_QUERY_LENGTH, SEARCH_TYPES, search
+from app.services.sync import SYNC_DEFAULT_LIMIT, SYNC_MAX_LIMIT, changes_since, sync_unsupported
+from app.services.task_queries import (
+    DASHBOARD_TOP_TASKS, TASK_PAGE_DEFAULT, TASK_PAGE_MAX, encode_task_cursor, task_keyset_params, task_list_statement,
+    task_query_params, task_statement_cache_stats, week_range,
+)
 
 # HabitFrequency 值映射
 HABIT_CUSTOM = HabitFrequency.CUSTOM  # 固定日期（自定义）
@@ -24,22 +52,53 @@ HABIT_FLEXIBLE = HabitFrequency.FLEXIBLE  # 灵活模式
 
 app = FastAPI(title="LifeFlow")
 
-# CORS
+# 读写会话提交后推进数据版本（ETag）并使仪表盘缓存失效；提交前按写过的记录更新搜索索引
+track_writes(SessionLocal)
+track_search_index(SessionLocal)
+
+# 不带 ETag 的只读接口：管理接口返回的是实时状态，事件流是长连接，都与数据版本无关
+ETAG_EXCLUDED_PREFIXES = ("/api/admin/", "/api/events")
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 是否命中（弱比较，支持多个值和 *）"""
+    weak = etag[2:] if etag.startswith("W/") else etag
+    for value in if_none_match.split(","):
+        value = value.strip()
+        if value == "*" or (value[2:] if value.startswith("W/") else value) == weak:
+            return True
+    return False
+
+@app.middleware("http")
+async def etag_middleware(request: Request, call_next):
+    """
+    GET 接口按数据版本生成 ETag，If-None-Match 命中时在执行接口（查库）之前返回 304
+    
+    版本号在执行接口前读取：执行期间有写入提交时，返回的 ETag 偏旧，下次请求只会多查一次，不会误判
+    """
+    path = request.url.path
+    if request.method not in ("GET", "HEAD") or not path.startswith("/api/") or path.startswith(ETAG_EXCLUDED_PREFIXES):
+        return await call_next(request)
+    
+    etag = data_versions.etag(1, date.today())
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
+
+# CORS（最后注册，位于最外层，304 响应也带 CORS 头）
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 def simple_hash(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
@@ -82,79 +141,23 @@ def login(username: str = Form(...), password: str = Form(...), db: Session = De
 
 # ==================== 仪表盘 ====================
 @app.get("/api/dashboard/stats")
-def dashboard(db: Session = Depends(get_db)):
+async def dashboard(db: AsyncSession = Depends(get_async_db)):
     today = date.today()
-    week_start = today - timedelta(days=today.weekday())
     
-    # 1. 今日待办任务（计划今天做 或 截止今天 或 已逾期）
-    today_pending = db.query(models.Task).filter(
-        models.Task.user_id == 1,
-        models.Task.status != TaskStatus.COMPLETED,
-        models.Task.is_inbox == 0,
-        ((models.Task.scheduled_date == today) | 
-         (models.Task.due_date == today) |
-         ((models.Task.due_date < today) & (models.Task.due_date != None)))
-    ).count()
-    
-    # 2. 今日已完成任务
-    today_completed = db.query(models.Task).filter(
-        models.Task.user_id == 1,
-        models.Task.status == TaskStatus.COMPLETED,
-        models.Task.completed_at >= today
-    ).count()
-    
-    # 3. 逾期任务总数
-    overdue_count = db.query(models.Task).filter(
-        models.Task.user_id == 1,
-        models.Task.status != TaskStatus.COMPLETED,
-        models.Task.due_date < today,
-        models.Task.due_date != None
-    ).count()
-    
-    # 4. 收集箱未整理任务
-    inbox_count = db.query(models.Task).filter(
-        models.Task.user_id == 1,
-        models.Task.task_type == TaskType.INBOX,
-        models.Task.status != TaskStatus.COMPLETED
-    ).count()
-    
-    # 5. 本周数据
-    week_tasks_completed = db.query(models.Task).filter(
-        models.Task.user_id == 1,
-        models.Task.status == TaskStatus.COMPLETED,
-        models.Task.completed_at >= week_start
-    ).count()
-    
-    week_tasks_total = db.query(models.Task).filter(
-        models.Task.user_id == 1,
-        ((models.Task.scheduled_date >= week_start) & (models.Task.scheduled_date <= today)) |
-        ((models.Task.due_date >= week_start) & (models.Task.due_date <= today))
-    ).count()
-    
-    # 6. 活跃目标数
-    active_goals = db.query(models.Goal).filter(
-        models.Goal.user_id == 1,
-        models.Goal.status == GoalStatus.ACTIVE
-    ).count()
-    
-    # 7. 习惯统计
-    total_habits = db.query(models.Habit).filter(
-        models.Habit.is_active == True,
-        models.Habit.is_archived == False
-    ).count()
+    # 缓存命中直接返回；未命中时记下缓存版本，计算期间有写入提交则不写回缓存
+    cached = dashboard_cache.get(1, today)
+    if cached is not None:
+        return cached
+    generation = dashboard_cache.generation(1)
     
-    # 8. 今日习惯打卡情况
-    today_habit_logs = db.query(models.HabitLog).filter(
-        models.HabitLog.user_id == 1,
-        models.HabitLog.date == today
-    ).all()
-    completed_habits = len([log for log in today_habit_logs if log.count > 0])
+    # 1-2. 全部计数：任务计数一条条件聚合语句，目标/习惯计数一条语句
+    counts = await dashboard_counters(db, 1, today)
     
-    # 9. 项目列表（带进度）
-    projects = db.query(models.Project).filter(
+    # 3. 项目列表（带进度）
+    projects = (await db.execute(select(models.Project).where(
         models.Project.user_id == 1,
         models.Project.status.in_([ProjectStatus.ACTIVE, ProjectStatus.PLANNING])
-    ).order_by(models.Project.progress.desc()).limit(5).all()
+    ).order_by(models.Project.progress.desc()).limit(5))).scalars().all()
     
     project_list = [{
         "id": p.id,
@@ -163,16 +166,8 @@ def dashboard(db: Session = Depends(get_db)):
         "status": p.status.value
     } for p in projects]
     
-    # 10. 今日 Top 任务
-    top_tasks = db.query(models.Task).filter(
-        models.Task.user_id == 1,
-        models.Task.status != TaskStatus.COMPLETED,
-        models.Task.is_inbox == 0,
-        ((models.Task.scheduled_date == today) | (models.Task.due_date == today))
-    ).order_by(
-        models.Task.priority.desc(),
-        models.Task.created_at.desc()
-    ).limit(3).all()
+    # 4. 今日 Top 任务
+    top_tasks = (await db.execute(DASHBOARD_TOP_TASKS, task_query_params(1, today))).scalars().all()
     
     top_task_list = [{
         "id": t.id,
@@ -181,29 +176,58 @@ def dashboard(db: Session = Depends(get_db)):
         "due_date": t.due_date.isoformat() if t.due_date else None
     } for t in top_tasks]
     
-    return {
+    payload = {
         "today": {
-            "pending": today_pending,
-            "completed": today_completed,
-            "overdue": overdue_count,
-            "inbox": inbox_count
+            "pending": counts["today_pending"],
+            "completed": counts["today_completed"],
+            "overdue": counts["overdue"],
+            "inbox": counts["inbox"]
         },
         "week": {
-            "total": week_tasks_total,
-            "completed": week_tasks_completed,
-            "progress": round((week_tasks_completed / week_tasks_total * 100), 1) if week_tasks_total > 0 else 0
+            "total": counts["week_total"],
+            "completed": counts["week_completed"],
+            "progress": round((counts["week_completed"] / counts["week_total"] * 100), 1) if counts["week_total"] > 0 else 0
         },
         "goals": {
-            "active": active_goals
+            "active": counts["active_goals"]
         },
         "habits": {
-            "total": total_habits,
-            "completed": completed_habits
+            "total": counts["total_habits"],
+            "completed": counts["completed_habits"]
         },
         "projects": project_list,
         "top_tasks": top_task_list,
         "heatmap": []
     }
+    dashboard_cache.put(1, today, payload, generation)
+    return payload
+
+# ==================== 实时事件 ====================
+@app.get("/api/events")
+async def stream_events(request: Request):
+    """
+    SSE 事件流：连接后先推送一次当前计数，之后每次提交推送 change 事件和更新后的计数
+    
+    客户端用 EventSource 订阅，收到 resync 事件（或断线重连）后全量刷新
+    """
+    queue = event_broker.subscribe(1)
+    
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            yield format_sse("counters", await load_counters(1))
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=get_settings().SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+        finally:
+            event_broker.unsubscribe(1, queue)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # nginx 不缓冲事件流
+    })
 
 # ==================== 项目管理 ====================
 class ProjectCreate(BaseModel):
@@ -212,34 +236,19 @@ class ProjectCreate(BaseModel):
     target_date: Optional[str] = None
 
 @app.get("/api/projects/")
-def list_projects(db: Session = Depends(get_db)):
-    """获取所有项目"""
-    projects = db.query(models.Project).filter(
-        models.Project.user_id == 1
-    ).order_by(models.Project.created_at.desc()).all()
+async def list_projects(fields: Optional[str] = Query(None), db: AsyncSession = Depends(get_async_db)):
+    """获取所有项目（fields 指定输出字段时只查询用到的列）"""
+    try:
+        names = PROJECT_LIST_FIELDS.parse(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    result = []
-    for p in projects:
-        # 计算项目下的任务统计
-        total_tasks = db.query(models.Task).filter(models.Task.project_id == p.id).count()
-        completed_tasks = db.query(models.Task).filter(
-            models.Task.project_id == p.id,
-            models.Task.status == TaskStatus.COMPLETED
-        ).count()
-        
-        result.append({
-            "id": p.id,
-            "name": p.name,
-            "description": p.description,
-            "status": p.status.value,
-            "progress": p.progress,
-            "target_date": p.target_date.isoformat() if p.target_date else None,
-            "created_at": p.created_at.isoformat() if p.created_at else None,
-            "total_tasks": total_tasks,
-            "completed_tasks": completed_tasks
-        })
+    # 任务统计直接读取项目上的计数字段（一次查询）
+    projects = (await db.execute(select(models.Project).options(*PROJECT_LIST_FIELDS.options(names)).where(
+        models.Project.user_id == 1
+    ).order_by(models.Project.created_at.desc()))).scalars().all()
     
-    return result
+    return [PROJECT_LIST_FIELDS.render(p, names) for p in projects]
 
 @app.get("/api/projects/{project_id}")
 def get_project(project_id: int, db: Session = Depends(get_db)):
@@ -334,8 +343,7 @@ def update_project(
     if data.outline is not None:
         p.outline = data.outline
     
-    # 进度基于目标完成情况（不是任务）
-    # 由 _update_project_progress 在目标变更时自动更新
+    # 进度由任务 / 目标计数算出，在任务或目标变更时增量更新（见 app/services/project_counters.py）
     
     db.commit()
     db.refresh(p)
@@ -356,8 +364,14 @@ def delete_project(project_id: int, db: Session = Depends(get_db)):
     if not p:
         raise HTTPException(status_code=404, detail="项目不存在")
     
-    # 将项目下的任务设为无项目
-    db.query(models.Task).filter(models.Task.project_id == project_id).update({"project_id": None})
+    # 将项目下的任务设为无项目（逐条记下变化，推送的事件带任务 id）
+    moved = db.scalars(
+        update(models.Task).where(models.Task.project_id == project_id).values(project_id=None)
+        .returning(models.Task.id),
+        execution_options={"synchronize_session": False, CHANGES_RECORDED: True},
+    ).all()
+    for task_id in moved:
+        record_change(db, "tasks", "update", task_id, p.user_id)
     
     db.delete(p)
     db.commit()
@@ -368,10 +382,16 @@ def delete_project(project_id: int, db: Session = Depends(get_db)):
 def list_goals(
     period: Optional[str] = Query(None),
     year: Optional[int] = Query(None),
+    fields: Optional[str] = Query(None),  # 逗号分隔的输出字段
     db: Session = Depends(get_db)
 ):
-    """获取目标列表"""
-    query = db.query(models.Goal).filter(models.Goal.user_id == 1)
+    """获取目标列表（fields 指定输出字段时只查询用到的列，不需要 key_results 时不加载）"""
+    try:
+        names = GOAL_LIST_FIELDS.parse(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    query = db.query(models.Goal).options(*GOAL_LIST_FIELDS.options(names)).filter(models.Goal.user_id == 1)
     
     if period:
         query = query.filter(models.Goal.period == period)
@@ -380,27 +400,7 @@ def list_goals(
     
     goals = query.order_by(models.Goal.created_at.desc()).all()
     
-    return [{
-        "id": g.id,
-        "title": g.title,
-        "description": g.description,
-        "period": g.period.value,
-        "year": g.year,
-        "quarter": g.quarter,
-        "month": g.month,
-        "area": g.area,
-        "status": g.status.value,
-        "progress": g.progress,
-        "created_at": g.created_at.isoformat() if g.created_at else None,
-        "key_results": [{
-            "id": kr.id,
-            "title": kr.title,
-            "target_value": kr.target_value,
-            "current_value": kr.current_value,
-            "unit": kr.unit,
-            "is_completed": kr.is_completed
-        } for kr in g.key_results]
-    } for g in goals]
+    return [GOAL_LIST_FIELDS.render(g, names) for g in goals]
 
 @app.post("/api/goals/")
 def create_goal(
@@ -489,162 +489,151 @@ class TaskCreate(BaseModel):
     is_inbox: int = 0
 
 @app.get("/api/tasks/")
-def list_tasks(
+async def list_tasks(
     view: str = Query("all"),  # all/today/week/overdue/inbox/todo/completed
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(None, ge=1, le=TASK_PAGE_MAX),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None),  # 逗号分隔的输出字段，例如 id,title,priority
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取任务列表（支持多视图）"""
-    today = date.today()
-    query = db.query(models.Task).filter(models.Task.user_id == 1)
-    
-    if view == "inbox":
-        # 收件箱：未分类的任务（task_type=inbox 且未完成的）
-        query = query.filter(models.Task.task_type == TaskType.INBOX, models.Task.status != TaskStatus.COMPLETED)
-    elif view == "today":
-        # 今天：计划今天做 或 截止今天 或 已逾期（包含已完成）
-        query = query.filter(
-            models.Task.is_inbox == 0,
-            ((models.Task.scheduled_date == today) | 
-             (models.Task.due_date == today) |
-             ((models.Task.due_date < today) & (models.Task.due_date != None)))
-        )
-    elif view == "week":
-        # 本周：截止日期或计划日期在本周（包含已完成）
-        week_start = today - timedelta(days=today.weekday())  # 周一
-        week_end = week_start + timedelta(days=6)  # 周日
-        query = query.filter(
-            models.Task.is_inbox == 0,
-            ((models.Task.due_date >= week_start) & (models.Task.due_date <= week_end)) |
-            ((models.Task.scheduled_date >= week_start) & (models.Task.scheduled_date <= week_end))
-        )
-    elif view == "overdue":
-        # 已逾期：截止日期已过且未完成
-        query = query.filter(
-            models.Task.status != TaskStatus.COMPLETED,
-            models.Task.due_date < today,
-            models.Task.due_date != None
-        )
-    elif view == "todo":
-        # 待办清单：已整理且未完成的任务
-        query = query.filter(
-            models.Task.status != TaskStatus.COMPLETED,
-            models.Task.is_inbox == 0
-        )
-    elif view == "someday":
-        # 将来也许：task_type=someday 且未完成的
-        query = query.filter(
-            models.Task.task_type == TaskType.SOMEDAY,
-            models.Task.status != TaskStatus.COMPLETED
-        )
-    elif view == "trash":
-        # 垃圾箱：task_type=trash
-        query = query.filter(models.Task.task_type == TaskType.TRASH)
-    elif view == "completed":
-        # 已完成
-        query = query.filter(models.Task.status == TaskStatus.COMPLETED)
-    
-    tasks = query.order_by(models.Task.created_at.desc()).all()
+    """
+    获取任务列表（支持多视图）
     
-    # 优先级映射：字符串 -> 数字
-    priority_map = {"low": 1, "medium": 2, "high": 3, "urgent": 4}
+    不传 limit / cursor 时返回完整数组（兼容旧客户端）；传入任一参数时按 (created_at, id) 键集分页，
+    返回 {"items": [...], "next_cursor": "..."}，next_cursor 为 null 表示没有下一页
     
-    return [{
-        "id": t.id,
-        "title": t.title,
-        "description": t.description,
-        "task_type": t.task_type.value,
-        "status": t.status.value,
-        "priority": priority_map.get(t.priority.value, 2),
-        "due_date": t.due_date.isoformat() if t.due_date else None,
-        "scheduled_date": t.scheduled_date.isoformat() if t.scheduled_date else None,
-        "scheduled_type": t.scheduled_type,
-        "estimated_pomodoros": t.estimated_pomodoros,
-        "actual_pomodoros": t.actual_pomodoros,
-        "project_id": t.project_id,
-        "project_name": t.project.name if t.project else None,
-        "is_inbox": t.is_inbox,
-        "completed_at": t.completed_at.isoformat() if t.completed_at else None,
-        "created_at": t.created_at.isoformat() if t.created_at else None
-    } for t in tasks]
+    fields 指定输出字段时只查询用到的列（见 app/services/list_fields.py）
+    """
+    try:
+        names = TASK_LIST_FIELDS.parse(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # 语句按 (视图, 字段, 分页方式) 预先构建并缓存，这里只准备参数
+    params = task_query_params(1, date.today())
+    paginate = limit is not None or cursor is not None
+    if paginate:
+        limit = limit or TASK_PAGE_DEFAULT
+        if cursor:
+            try:
+                params.update(task_keyset_params(cursor))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        # 多取一行判断是否还有下一页
+        params["limit"] = limit + 1
+    
+    statement = task_list_statement(view, names, paginate, after_cursor=bool(cursor))
+    rows = (await db.execute(statement, params)).all()
+    items = [TASK_LIST_FIELDS.render(t, names) for t, _ in rows[:limit]]
+    
+    if not paginate:
+        return items
+    next_cursor = None
+    if len(rows) > limit:
+        last_task, last_created_at = rows[limit - 1]
+        next_cursor = encode_task_cursor(last_created_at, last_task.id)
+    return {"items": items, "next_cursor": next_cursor}
 
 @app.get("/api/tasks/week-calendar")
-def get_week_calendar(
+async def get_week_calendar(
     year: int = Query(None),
     week: int = Query(None),
-    db: Session = Depends(get_db)
+    include_due: bool = Query(False),        # 截止日期在本周的任务也显示在截止那天
+    include_completed: bool = Query(False),
+    include_habits: bool = Query(False),     # 每天的习惯计划数 / 已打卡数
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取本周日历视图数据"""
+    """获取本周日历视图数据（一次查询，见 app/services/calendar.py）"""
     if year is None or week is None:
         today = date.today()
         year, week, _ = today.isocalendar()
     
     from datetime import datetime as dt
     week_start = dt.strptime(f'{year}-W{week}-1', '%G-W%V-%u').date()
-    week_dates = [week_start + timedelta(days=i) for i in range(7)]
     
-    # 获取本周内的任务（按日期分组）
-    priority_map = {"low": 1, "medium": 2, "high": 3, "urgent": 4}
-    result = []
-    for d in week_dates:
-        tasks = db.query(models.Task).filter(
-            models.Task.user_id == 1,
-            models.Task.status != TaskStatus.COMPLETED,
-            models.Task.is_inbox == 0,
-            models.Task.scheduled_date == d
-        ).all()
-        
-        result.append({
-            "date": d.isoformat(),
-            "weekday": d.weekday(),
-            "tasks": [{
-                "id": t.id,
-                "title": t.title,
-                "priority": priority_map.get(t.priority.value, 2),
-                "project_name": t.project.name if t.project else None
-            } for t in tasks]
-        })
+    days = await calendar_days(db, 1, week_start, week_start + timedelta(days=6),
+                               include_due, include_completed, include_habits)
     
     return {
         "year": year,
         "week": week,
-        "days": result
+        "days": days
+    }
+
+@app.get("/api/tasks/month-calendar")
+async def get_month_calendar(
+    year: int = Query(None),
+    month: int = Query(None, ge=1, le=12),
+    include_due: bool = Query(True),
+    include_completed: bool = Query(False),
+    include_habits: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """月视图：从当月 1 日所在周的周一开始共 42 格，in_month 标记是否属于当月"""
+    if year is None or month is None:
+        today = date.today()
+        year, month = today.year, today.month
+    
+    start, end = month_grid_range(year, month)
+    days = await calendar_days(db, 1, start, end, include_due, include_completed, include_habits)
+    for day in days:
+        day["in_month"] = day["date"][:7] == f"{year:04d}-{month:02d}"
+    
+    return {
+        "year": year,
+        "month": month,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "days": days
+    }
+
+@app.get("/api/tasks/agenda")
+async def get_agenda(
+    start: Optional[date] = Query(None),
+    days: int = Query(14, ge=1, le=AGENDA_MAX_DAYS),
+    include_completed: bool = Query(False),
+    include_habits: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """滚动日程：从 start（默认今天）起 days 天内有任务的日期，按日期排列"""
+    start = start or date.today()
+    end = start + timedelta(days=days - 1)
+    calendar = await calendar_days(db, 1, start, end, True, include_completed, include_habits)
+    
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "days": [day for day in calendar if day["tasks"]]
     }
 
 @app.get("/api/tasks/stats")
 def get_task_stats(db: Session = Depends(get_db)):
     """获取任务统计（用于已完成视图）"""
-    today = date.today()
-    week_start = today - timedelta(days=today.weekday())
-    
-    # 本周完成任务数
-    week_completed = db.query(models.Task).filter(
-        models.Task.user_id == 1,
-        models.Task.status == TaskStatus.COMPLETED,
-        models.Task.completed_at >= week_start
-    ).count()
+    week_start, _ = week_range(date.today())
     
-    # 按项目统计
-    project_stats = db.query(
+    # 一次分组聚合：按（项目, 优先级）统计已完成数，本周完成数用 FILTER 子句在同一次扫描中计算
+    rows = db.query(
         models.Task.project_id,
-        func.count(models.Task.id).label("count")
-    ).filter(
-        models.Task.user_id == 1,
-        models.Task.status == TaskStatus.COMPLETED
-    ).group_by(models.Task.project_id).all()
-    
-    # 按优先级统计
-    priority_stats = db.query(
         models.Task.priority,
-        func.count(models.Task.id).label("count")
+        func.count(models.Task.id).label("count"),
+        func.count(models.Task.id).filter(models.Task.completed_at >= week_start).label("week_count")
     ).filter(
         models.Task.user_id == 1,
         models.Task.status == TaskStatus.COMPLETED
-    ).group_by(models.Task.priority).all()
+    ).group_by(models.Task.project_id, models.Task.priority).all()
+    
+    week_completed = 0
+    project_counts = {}
+    priority_counts = {}
+    for project_id, priority, count, week_count in rows:
+        week_completed += week_count
+        project_counts[project_id] = project_counts.get(project_id, 0) + count
+        priority_counts[priority] = priority_counts.get(priority, 0) + count
     
     return {
         "week_completed": week_completed,
-        "project_stats": [{"project_id": p[0], "count": p[1]} for p in project_stats],
-        "priority_stats": [{"priority": p[0].value, "count": p[1]} for p in priority_stats]
+        "project_stats": [{"project_id": k, "count": v} for k, v in project_counts.items()],
+        "priority_stats": [{"priority": k.value, "count": v} for k, v in priority_counts.items()]
     }
 
 def parse_date(date_str: Optional[str]) -> Optional[date]:
@@ -656,12 +645,8 @@ def parse_date(date_str: Optional[str]) -> Optional[date]:
     except ValueError:
         return None
 
-@app.post("/api/tasks/")
-def create_task(task: TaskCreate, db: Session = Depends(get_db)):
-    """创建任务"""
-    priority_map = {1: TaskPriority.LOW, 2: TaskPriority.MEDIUM, 3: TaskPriority.HIGH, 4: TaskPriority.URGENT}
-    task_priority = priority_map.get(task.priority, TaskPriority.MEDIUM)
-    
+def task_create_values(task: TaskCreate) -> dict:
+    """新建任务的字段值（单个创建和批量创建共用）"""
     # 处理 scheduled_type 到具体日期
     scheduled_date = parse_date(task.scheduled_date)
     if task.scheduled_type:
@@ -677,21 +662,67 @@ def create_task(task: TaskCreate, db: Session = Depends(get_db)):
         elif task.scheduled_type == "year":
             scheduled_date = today + timedelta(days=365)
     
-    db_task = models.Task(
-        user_id=1,
-        title=task.title,
-        description=task.description,
-        task_type=TaskType(task.task_type) if task.task_type else TaskType.INBOX,
-        status=TaskStatus.PENDING,
-        priority=task_priority,
-        due_date=parse_date(task.due_date),
-        scheduled_date=scheduled_date,
-        scheduled_type=task.scheduled_type,
-        estimated_pomodoros=task.estimated_pomodoros,
-        project_id=task.project_id,
-        is_inbox=task.is_inbox
-    )
+    priority = PRIORITIES_BY_RANK.get(task.priority, TaskPriority.MEDIUM)
+    return {
+        "user_id": 1,
+        "title": task.title,
+        "description": task.description,
+        "task_type": TaskType(task.task_type) if task.task_type else TaskType.INBOX,
+        "status": TaskStatus.PENDING,
+        "priority": priority,
+        "priority_rank": PRIORITY_RANKS[priority],
+        "due_date": parse_date(task.due_date),
+        "scheduled_date": scheduled_date,
+        "scheduled_type": task.scheduled_type,
+        "estimated_pomodoros": task.estimated_pomodoros,
+        "project_id": task.project_id,
+        "is_inbox": task.is_inbox,
+    }
+
+def task_update_values(data: dict, completed_at: Optional[datetime] = None) -> dict:
+    """
+    根据更新请求计算要修改的字段（单个更新和批量更新共用）
+    
+    completed_at 为任务当前的完成时间；状态值不合法时抛出 ValueError
+    """
+    values = {}
+    if 'title' in data and data['title'] is not None:
+        values["title"] = data['title']
+    if 'description' in data:
+        values["description"] = data['description'] or None
+    if 'status' in data and data['status']:
+        new_status = data['status']
+        values["status"] = TaskStatus(new_status)
+        # 状态变更时更新完成时间
+        if new_status == "completed" and not completed_at:
+            values["completed_at"] = datetime.utcnow()
+        elif new_status != "completed":
+            values["completed_at"] = None
+    if 'priority' in data and data['priority'] is not None:
+        values["priority"] = PRIORITIES_BY_RANK.get(data['priority'], TaskPriority.MEDIUM)
+        values["priority_rank"] = PRIORITY_RANKS[values["priority"]]
+    if 'due_date' in data:
+        values["due_date"] = parse_date(data['due_date'])
+    if 'scheduled_date' in data:
+        values["scheduled_date"] = parse_date(data['scheduled_date'])
+    if 'estimated_pomodoros' in data:
+        values["estimated_pomodoros"] = data['estimated_pomodoros']
+    if 'actual_pomodoros' in data:
+        values["actual_pomodoros"] = data['actual_pomodoros']
+    if 'project_id' in data:
+        values["project_id"] = data['project_id']
+    if 'task_type' in data and data['task_type']:
+        values["task_type"] = TaskType(data['task_type'])
+        # 同步更新 is_inbox 字段
+        values["is_inbox"] = 1 if data['task_type'] == 'inbox' else 0
+    return values
+
+@app.post("/api/tasks/")
+def create_task(task: TaskCreate, db: Session = Depends(get_db)):
+    """创建任务"""
+    db_task = models.Task(**task_create_values(task))
     db.add(db_task)
+    apply_task_counter_change(db, NO_PROJECT, task_counter_state(db_task))
     db.commit()
     db.refresh(db_task)
     
@@ -712,38 +743,14 @@ def update_task(
     if not t:
         raise HTTPException(status_code=404, detail="任务不存在")
     
-    priority_map = {1: TaskPriority.LOW, 2: TaskPriority.MEDIUM, 3: TaskPriority.HIGH, 4: TaskPriority.URGENT}
+    counter_before = task_counter_state(t)
     
     # 更新字段
-    if 'title' in data and data['title'] is not None:
-        t.title = data['title']
-    if 'description' in data:
-        t.description = data['description'] or None
-    if 'status' in data and data['status']:
-        new_status = data['status']
-        t.status = TaskStatus(new_status)
-        # 状态变更时更新完成时间
-        if new_status == "completed" and not t.completed_at:
-            t.completed_at = datetime.utcnow()
-        elif new_status != "completed":
-            t.completed_at = None
-    if 'priority' in data and data['priority'] is not None:
-        t.priority = priority_map.get(data['priority'], TaskPriority.MEDIUM)
-    if 'due_date' in data:
-        t.due_date = parse_date(data['due_date'])
-    if 'scheduled_date' in data:
-        t.scheduled_date = parse_date(data['scheduled_date'])
-    if 'estimated_pomodoros' in data:
-        t.estimated_pomodoros = data['estimated_pomodoros']
-    if 'actual_pomodoros' in data:
-        t.actual_pomodoros = data['actual_pomodoros']
-    if 'project_id' in data:
-        t.project_id = data['project_id']
-    if 'task_type' in data and data['task_type']:
-        t.task_type = TaskType(data['task_type'])
-        # 同步更新 is_inbox 字段
-        t.is_inbox = 1 if data['task_type'] == 'inbox' else 0
+    for field, value in task_update_values(data, t.completed_at).items():
+        setattr(t, field, value)
     
+    # 状态或所属项目变化时更新项目任务计数
+    apply_task_counter_change(db, counter_before, task_counter_state(t))
     db.commit()
     db.refresh(t)
     return {"id": t.id, "title": t.title, "status": t.status.value}
@@ -762,6 +769,7 @@ def complete_task(
     if not t:
         return {"error": "任务不存在"}
     
+    counter_before = task_counter_state(t)
     if t.status == TaskStatus.COMPLETED:
         # 已完成的任务取消完成
         t.status = TaskStatus.PENDING
@@ -774,20 +782,10 @@ def complete_task(
         if data and data.actual_pomodoros is not None:
             t.actual_pomodoros = data.actual_pomodoros
     
+    # 更新项目任务计数和进度（同一条 UPDATE，与任务修改一起提交）
+    apply_task_counter_change(db, counter_before, task_counter_state(t))
     db.commit()
     
-    # 更新项目进度
-    if t.project_id:
-        project = db.query(models.Project).filter(models.Project.id == t.project_id).first()
-        if project:
-            total = db.query(models.Task).filter(models.Task.project_id == project.id).count()
-            completed = db.query(models.Task).filter(
-                models.Task.project_id == project.id,
-                models.Task.status == TaskStatus.COMPLETED
-            ).count()
-            project.progress = round(completed / total * 100, 1)
-            db.commit()
-    
     return {"id": t.id, "status": t.status.value, "actual_pomodoros": t.actual_pomodoros}
 
 @app.delete("/api/tasks/{task_id}")
@@ -797,10 +795,147 @@ def delete_task(task_id: int, db: Session = Depends(get_db)):
     if not t:
         raise HTTPException(status_code=404, detail="任务不存在")
     
+    apply_task_counter_change(db, task_counter_state(t), NO_PROJECT)
     db.delete(t)
     db.commit()
     return {"message": "任务已删除"}
 
+class TaskBatchOperation(BaseModel):
+    op: str                                 # create / update / complete / reopen / delete
+    id: Optional[int] = None                # create 以外的操作必填
+    data: Optional[dict] = None             # create: 同 POST /api/tasks/；update: 同 PUT /api/tasks/{id}
+    actual_pomodoros: Optional[int] = None  # complete 时可选
+
+class TaskBatchRequest(BaseModel):
+    operations: List[TaskBatchOperation]
+
+TASK_BATCH_OPS = ("create", "update", "complete", "reopen", "delete")
+TASK_BATCH_LIMIT = 500
+
+@app.post("/api/tasks/batch")
+def batch_tasks(req: TaskBatchRequest, db: Session = Depends(get_db)):
+    """
+    批量创建/更新/完成/取消完成/删除任务（收集箱整理、周计划）
+    
+    先整体校验，任一操作不合法则整批不执行；同一任务的多个操作按顺序合并成最终状态，
+    再按操作类型各用一条 executemany 语句写入。项目计数和进度按受影响的项目各更新一次，整批只提交一次。
+    """
+    ops = req.operations
+    if len(ops) > TASK_BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"单次最多 {TASK_BATCH_LIMIT} 个操作")
+    
+    errors = []
+    ids = {op.id for op in ops if op.op != "create" and op.id is not None}
+    tasks = {t.id: t for t in db.query(models.Task).filter(models.Task.id.in_(ids))} if ids else {}
+    
+    # 1. 校验并在内存中合并出每个任务的最终字段
+    create_rows = []
+    changes = {}      # 任务 id -> 要修改的字段
+    deleted = set()
+    for i, op in enumerate(ops):
+        if op.op not in TASK_BATCH_OPS:
+            errors.append({"index": i, "detail": f"不支持的操作: {op.op}"})
+            continue
+        if op.op == "create":
+            try:
+                create_rows.append(task_create_values(TaskCreate(**(op.data or {}))))
+            except (ValidationError, ValueError) as e:
+                errors.append({"index": i, "detail": str(e)})
+            continue
+        if op.id is None or op.id not in tasks:
+            errors.append({"index": i, "detail": f"任务不存在: {op.id}"})
+            continue
+        if op.id in deleted:
+            errors.append({"index": i, "detail": f"任务已在本批次中删除: {op.id}"})
+            continue
+        
+        t = tasks[op.id]
+        values = changes.setdefault(op.id, {})
+        completed_at = values.get("completed_at", t.completed_at)
+        if op.op == "update":
+            try:
+                values.update(task_update_values(op.data or {}, completed_at))
+            except ValueError as e:
+                errors.append({"index": i, "detail": str(e)})
+        elif op.op == "complete":
+            values["status"] = TaskStatus.COMPLETED
+            values["completed_at"] = completed_at or datetime.utcnow()
+            if op.actual_pomodoros is not None:
+                values["actual_pomodoros"] = op.actual_pomodoros
+        elif op.op == "reopen":
+            values.update(status=TaskStatus.PENDING, completed_at=None, actual_pomodoros=None)
+        else:
+            deleted.add(op.id)
+            changes.pop(op.id, None)
+    
+    # 引用的项目必须存在（一次查询）
+    project_ids = {r["project_id"] for r in create_rows} | {v["project_id"] for v in changes.values() if "project_id" in v}
+    project_ids.discard(None)
+    if project_ids:
+        existing = {pid for (pid,) in db.query(models.Project.id).filter(models.Project.id.in_(project_ids))}
+        for pid in sorted(project_ids - existing):
+            errors.append({"index": None, "detail": f"项目不存在: {pid}"})
+    
+    if errors:
+        raise HTTPException(status_code=400, detail={"message": "批量操作校验失败", "errors": errors})
+    
+    # 2. 项目计数变化（按项目汇总）
+    deltas = {}
+    def add_deltas(before, after):
+        for pid, (total, completed) in task_counter_deltas(before, after).items():
+            d = deltas.setdefault(pid, [0, 0])
+            d[0] += total
+            d[1] += completed
+    
+    for row in create_rows:
+        add_deltas(NO_PROJECT, (row["project_id"], False))
+    for task_id, values in changes.items():
+        t = tasks[task_id]
+        after = (values.get("project_id", t.project_id), values.get("status", t.status) == TaskStatus.COMPLETED)
+        add_deltas(task_counter_state(t), after)
+    for task_id in deleted:
+        add_deltas(task_counter_state(tasks[task_id]), NO_PROJECT)
+    
+    # 3. 写入：每类操作一条语句
+    created_ids = []
+    if create_rows:
+        # 多行 INSERT ... VALUES ... RETURNING 一条语句写入；主键按 VALUES 顺序递增分配，
+        # 但 RETURNING 的行序不保证，排序后即与 create_rows 一一对应
+        # （sort_by_parameter_order 在 SQLite 上会退化为逐行插入）
+        created_ids = sorted(db.scalars(
+            insert(models.Task).returning(models.Task.id), create_rows,
+            execution_options={CHANGES_RECORDED: True},
+        ))
+    update_rows = [{"id": task_id, **values} for task_id, values in changes.items() if values]
+    if update_rows:
+        db.execute(update(models.Task), update_rows, execution_options={CHANGES_RECORDED: True})
+    if deleted:
+        db.execute(
+            delete(models.Task).where(models.Task.id.in_(deleted)),
+            execution_options={"synchronize_session": False, CHANGES_RECORDED: True}
+        )
+    # 逐条记下变化：只推进当前用户的数据版本，推送的事件带任务 id
+    for task_id in created_ids:
+        record_change(db, "tasks", "insert", task_id, 1)
+    for row in update_rows:
+        status = row.get("status")
+        record_change(db, "tasks", "update", row["id"], 1, **({"status": status.value} if status else {}))
+    for task_id in sorted(deleted):
+        record_change(db, "tasks", "delete", task_id, 1)
+    # 项目计数和进度：受影响的项目共用一条 UPDATE
+    apply_project_task_deltas(db, deltas)
+    db.commit()
+    
+    affected = sorted(pid for pid, d in deltas.items() if any(d))
+    created = iter(created_ids)
+    return {
+        "results": [
+            {"index": i, "op": op.op, "id": next(created) if op.op == "create" else op.id}
+            for i, op in enumerate(ops)
+        ],
+        "affected_projects": affected,
+    }
+
 # ==================== 习惯管理 ====================
 @app.get("/api/habits/")
 def list_habits(db: Session = Depends(get_db)):
@@ -823,8 +958,23 @@ def list_habits(db: Session = Depends(get_db)):
         "is_active": h.is_active,
     } for h in habits]
 
+@app.get("/api/habits/heatmap")
+async def get_habits_heatmap(
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """打卡热力图：默认截止今天、往前一年，最长 5 年"""
+    end = end or date.today()
+    start = start or end - timedelta(days=HEATMAP_DEFAULT_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="起始日期不能晚于截止日期")
+    if (end - start).days + 1 > HEATMAP_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"日期范围最长 {HEATMAP_MAX_DAYS} 天")
+    return await habit_heatmap(db, 1, start, end)
+
 @app.get("/api/habits/week")
-def get_habits_week(year: int = Query(None), week: int = Query(None), db: Session = Depends(get_db)):
+async def get_habits_week(year: int = Query(None), week: int = Query(None), db: AsyncSession = Depends(get_async_db)):
     if year is None or week is None:
         today = date.today()
         year, week, _ = today.isocalendar()
@@ -833,25 +983,27 @@ def get_habits_week(year: int = Query(None), week: int = Query(None), db: Sessio
     week_start = dt.strptime(f'{year}-W{week}-1', '%G-W%V-%u').date()
     week_dates = [week_start + timedelta(days=i) for i in range(7)]
     
-    habits = db.query(models.Habit).filter(
+    habits = (await db.execute(select(models.Habit).where(
         models.Habit.is_active == True,
         models.Habit.is_archived == False
-    ).order_by(models.Habit.sort_order).all()
+    ).order_by(models.Habit.sort_order))).scalars().all()
+    
+    # 一次查出所有习惯本周的打卡记录：(习惯, 日期) -> 次数
+    log_counts = {(habit_id, d): count for habit_id, d, count in (await db.execute(select(
+        models.HabitLog.habit_id, models.HabitLog.date, models.HabitLog.count
+    ).where(
+        models.HabitLog.habit_id.in_([h.id for h in habits]),
+        models.HabitLog.date >= week_dates[0],
+        models.HabitLog.date <= week_dates[6]
+    ))).all()} if habits else {}
     
     result = []
     for habit in habits:
-        logs = db.query(models.HabitLog).filter(
-            models.HabitLog.habit_id == habit.id,
-            models.HabitLog.date >= week_dates[0],
-            models.HabitLog.date <= week_dates[6]
-        ).all()
-        
         week_status = []
         total_actual = 0
         for d in week_dates:
             target = habit.get_target_for_date(d)
-            log = next((l for l in logs if l.date == d), None)
-            actual = log.count if log else 0
+            actual = log_counts.get((habit.id, d)) or 0
             total_actual += actual
             
             week_status.append({
@@ -937,6 +1089,7 @@ def toggle_habit(data: HabitToggleRequest, db: Session = Depends(get_db)):
         # 未打卡则打卡一次
         new_count = 1
     
+    old_count = log.count if log else 0
     if log:
         log.count = new_count
     else:
@@ -948,6 +1101,8 @@ def toggle_habit(data: HabitToggleRequest, db: Session = Depends(get_db)):
         )
         db.add(log)
     
+    # 每日汇总与打卡记录在同一事务中提交
+    record_checkin(db, habit.user_id, toggle_date, new_count - old_count)
     db.commit()
     return {"success": True, "count": new_count}
 
@@ -1030,6 +1185,8 @@ def delete_habit_api(habit_id: int, db: Session = Depends(get_db)):
     if not h:
         raise HTTPException(status_code=404, detail="习惯不存在")
     
+    # 打卡记录随习惯一起删除，先从每日汇总中扣减
+    remove_habit_checkins(db, h)
     db.delete(h)
     db.commit()
     return {"message": "习惯已删除"}
@@ -1049,24 +1206,6 @@ class ProjectGoalUpdateRequest(BaseModel):
     sort_order: Optional[int] = None
 
 
-def _update_project_progress(db: Session, project_id: int):
-    """根据目标完成情况更新项目进度"""
-    goals = db.query(models.ProjectGoal).filter(
-        models.ProjectGoal.project_id == project_id
-    ).all()
-    
-    if not goals:
-        progress = 0.0
-    else:
-        completed = sum(1 for g in goals if g.is_completed)
-        progress = (completed / len(goals)) * 100
-    
-    project = db.query(models.Project).filter(models.Project.id == project_id).first()
-    if project:
-        project.progress = progress
-        db.commit()
-
-
 @app.get("/api/projects/{project_id}/goals")
 def list_project_goals(project_id: int, db: Session = Depends(get_db)):
     """获取项目的目标列表"""
@@ -1106,12 +1245,11 @@ def create_project_goal(
         is_completed=False
     )
     db.add(goal)
+    # 更新项目目标计数和进度，与新目标一起提交
+    apply_goal_counter_change(db, NO_PROJECT, goal_counter_state(goal))
     db.commit()
     db.refresh(goal)
     
-    # 更新项目进度
-    _update_project_progress(db, project_id)
-    
     return {
         "id": goal.id,
         "project_id": goal.project_id,
@@ -1146,15 +1284,14 @@ def update_project_goal(
     if req.sort_order is not None:
         goal.sort_order = req.sort_order
     if req.is_completed is not None:
+        counter_before = goal_counter_state(goal)
         goal.is_completed = req.is_completed
         goal.completed_at = datetime.now() if req.is_completed else None
+        apply_goal_counter_change(db, counter_before, goal_counter_state(goal))
     
     db.commit()
     db.refresh(goal)
     
-    # 更新项目进度
-    _update_project_progress(db, project_id)
-    
     return {
         "id": goal.id,
         "project_id": goal.project_id,
@@ -1181,12 +1318,10 @@ def delete_project_goal(
     if not goal:
         raise HTTPException(status_code=404, detail="目标不存在")
     
+    apply_goal_counter_change(db, goal_counter_state(goal), NO_PROJECT)
     db.delete(goal)
     db.commit()
     
-    # 更新项目进度
-    _update_project_progress(db, project_id)
-    
     return {"message": "目标已删除"}
 
 
@@ -1205,15 +1340,14 @@ def toggle_project_goal(
     if not goal:
         raise HTTPException(status_code=404, detail="目标不存在")
     
+    counter_before = goal_counter_state(goal)
     goal.is_completed = not goal.is_completed
     goal.completed_at = datetime.now() if goal.is_completed else None
+    apply_goal_counter_change(db, counter_before, goal_counter_state(goal))
     
     db.commit()
     db.refresh(goal)
     
-    # 更新项目进度
-    _update_project_progress(db, project_id)
-    
     return {
         "id": goal.id,
         "is_completed": goal.is_completed,
@@ -1250,6 +1384,102 @@ def reorder_project_goals(
     return {"message": "排序已更新"}
 
 
+# ==================== 搜索 ====================
+@app.get("/api/search")
+async def search_all(
+    q: str = Query(..., min_length=1, max_length=SEARCH_MAX_QUERY_LENGTH),
+    types: Optional[str] = Query(None, description="逗号分隔：task,project,goal,review，默认全部"),
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """全文搜索：按相关度排序，返回高亮后的标题和正文片段"""
+    if async_engine.dialect.name != "sqlite":
+        raise HTTPException(status_code=501, detail="全文搜索仅支持 SQLite")
+    kinds = [t.strip() for t in types.split(",") if t.strip()] if types else []
+    unknown = [t for t in kinds if t not in SEARCH_TYPES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"未知的类型：{', '.join(unknown)}（可选：{', '.join(SEARCH_TYPES)}）")
+    return await search(db, 1, q, kinds, limit, offset)
+
+# ==================== 增量同步 ====================
+@app.get("/api/sync")
+async def sync_changes(
+    since: int = Query(0, ge=0, description="上次同步返回的 cursor，0 表示全量同步"),
+    limit: int = Query(SYNC_DEFAULT_LIMIT, ge=1, le=SYNC_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    since 之后新增、修改、删除的任务、项目、里程碑、目标、关键结果、习惯、打卡和复盘
+    
+    has_more 为 true 时用返回的 cursor 继续请求；reset 为 true 时先清空本地数据（见 app/services/sync.py）。
+    仅 SQLite 支持，其他数据库返回 supported: false，客户端改为重新加载完整列表
+    """
+    if async_engine.dialect.name != "sqlite":
+        return sync_unsupported(since)
+    return await changes_since(db, 1, since, limit)
+
+# ==================== 数据导出 ====================
+@app.get("/api/export/{kind}")
+def export_data(kind: str, fmt: str = Query("csv", alias="format", description="csv 或 ndjson")):
+    """
+    流式导出全部任务 / 打卡记录 / 复盘（CSV 或 NDJSON 附件），边查边发送，内存占用与行数无关
+    
+    按主键每批读取 EXPORT_BATCH_SIZE 行，每批一个短事务（下载慢的客户端不会长时间挡住写入），见 app/services/export.py
+    """
+    if kind not in EXPORT_SOURCES:
+        raise HTTPException(status_code=404, detail=f"不支持导出 {kind}，可选：{', '.join(EXPORT_SOURCES)}")
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format 只能是 {' / '.join(EXPORT_FORMATS)}")
+    chunks = export_chunks(read_engine, kind, fmt, 1, get_settings().EXPORT_BATCH_SIZE)
+    return StreamingResponse(
+        chunks, media_type=EXPORT_FORMATS[fmt][0], headers=export_headers(kind, fmt, date.today()),
+    )
+
+# ==================== 管理 ====================
+@app.post("/api/admin/backup", status_code=202)
+def start_backup(background_tasks: BackgroundTasks, compress: Optional[bool] = None):
+    """在后台执行一次在线备份（进度和结果通过 GET /api/admin/backup 查看）"""
+    try:
+        sqlite_database_path()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # 先占用再安排后台任务：并发的请求只有一个返回 202，其余返回 409
+    try:
+        reserve_backup()
+    except BackupInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    background_tasks.add_task(run_backup, compress=compress, reserved=True)
+    return {"message": "备份已开始"}
+
+@app.get("/api/admin/backup")
+def get_backup_status():
+    """备份进度、最近一次结果、累计次数和已有备份文件"""
+    return {"status": backup_status, "backups": list_backups()}
+
+@app.get("/api/admin/cache")
+def get_cache_stats():
+    """进程内缓存的命中率、容量和淘汰次数：仪表盘结果、任务列表语句、SQL 编译缓存"""
+    return {
+        "dashboard": dashboard_cache.stats(),
+        "task_statements": task_statement_cache_stats(),
+        "compiled_sql": compiled_cache_stats.stats(),
+    }
+
+@app.get("/api/admin/events")
+def get_event_stats():
+    """SSE 订阅者数、已推送和因消费太慢丢弃的事件数"""
+    return event_broker.stats()
+
+@app.get("/api/admin/replication")
+def get_replication_status():
+    """增量复制状态和复制目录中的快照"""
+    return {
+        "status": replication_status,
+        "snapshots": [{**s, "time": s["time"].isoformat()} for s in list_snapshots()],
+    }
+
+
 # ==================== 初始化 ====================
 def init_default_data():
     """初始化默认数据"""
@@ -1401,10 +1631,35 @@ def init_default_data():
     finally:
         db.close()
 
+replicator: Optional[Replicator] = None
+
+def start_replicator():
+    """配置了 REPLICA_DIR 时在后台线程中持续增量复制"""
+    global replicator
+    settings = get_settings()
+    if not settings.REPLICA_DIR or engine.dialect.name != "sqlite":
+        return
+    replicator = Replicator()
+    replicator.start()
+    print(f"[REPLICA] 增量复制到 {settings.REPLICA_DIR}，间隔 {settings.REPLICA_INTERVAL}s")
+
 @app.on_event("startup")
 def startup():
+    if engine.dialect.name == "sqlite":
+        pragmas = ", ".join(f"{k}={v}" for k, v in sqlite_pragma_report(engine).items())
+        print(f"[DB] SQLite 存储配置 {get_settings().SQLITE_PROFILE}: {pragmas}")
     Base.metadata.create_all(bind=engine)
+    for name in run_migrations(engine):
+        print(f"[MIGRATE] 已应用 {name}")
     init_default_data()
+    start_replicator()
     print("[START] LifeFlow 启动成功！")
     print("[URL] 前端: http://localhost:3000")
     print("[URL] 后端: http://127.0.0.1:8000")
+
+@app.on_event("shutdown")
+async def shutdown():
+    if replicator:
+        replicator.stop()
+    await async_engine.dispose()
+    read_engine.dispose()
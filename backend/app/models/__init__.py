@@ -6,7 +6,7 @@ from app.models.goal import Goal, KeyResult, GoalPeriod, GoalStatus
 from app.models.project import Project, ProjectStatus
 from app.models.project_goal import ProjectGoal
 from app.models.task import Task, TaskType, TaskStatus, TaskPriority
-from app.models.habit import Habit, HabitLog, HabitFrequency
+from app.models.habit import Habit, HabitLog, HabitFrequency, HabitDailyRollup
 from app.models.review import Review, ReviewPeriod
 
 __all__ = [
@@ -25,6 +25,7 @@ __all__ = [
     "Habit",
     "HabitLog",
     "HabitFrequency",
+    "HabitDailyRollup",
     "Review",
     "ReviewPeriod",
 ]
@@ -4,7 +4,7 @@
 Goal: 目标（Objectives）- 你想要达成什么
 KeyResult: 关键结果 - 如何衡量目标达成
 """
-from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Text, Float, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Text, Float, Enum, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -61,6 +61,10 @@ class Goal(Base):
     user = relationship("User", back_populates="goals")
     project = relationship("Project", back_populates="goals")
     key_results = relationship("KeyResult", back_populates="goal", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index("ix_goals_user_status", "user_id", "status"),
+    )
 
 
 class KeyResult(Base):
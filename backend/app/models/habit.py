@@ -3,7 +3,7 @@
 """
 from datetime import date
 import sqlalchemy
-from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Text, Enum, Boolean, JSON, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Text, Enum, Boolean, JSON, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -130,4 +130,23 @@ class HabitLog(Base):
     # 唯一约束
     __table_args__ = (
         UniqueConstraint('habit_id', 'date', name='unique_habit_date'),
+        Index('ix_habit_logs_user_date', 'user_id', 'date'),
     )
+
+
+class HabitDailyRollup(Base):
+    """
+    习惯每日汇总表（按用户 + 日期）
+
+    打卡时在同一事务中更新，热力图、复盘汇总直接读取，不再逐条聚合打卡记录。
+    维护逻辑见 app/services/habit_rollup.py
+    """
+    __tablename__ = "habit_daily_rollup"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    
+    # 当天所有习惯的打卡次数之和
+    checkins = Column(Integer, nullable=False, default=0)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
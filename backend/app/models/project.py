@@ -3,7 +3,7 @@
 
 项目是大型目标，可以拆解为多个任务
 """
-from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Text, Float, Enum
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Text, Float, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -41,6 +41,12 @@ class Project(Base):
     # 进度（0-100）
     progress = Column(Float, default=0.0)
     
+    # 任务 / 里程碑计数（增删、完成/取消完成、移动项目时增量维护，进度随之更新，见 app/services/project_counters.py）
+    total_tasks = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_tasks = Column(Integer, nullable=False, default=0, server_default="0")
+    total_goals = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_goals = Column(Integer, nullable=False, default=0, server_default="0")
+    
     # 项目大纲/笔记
     outline = Column(Text, nullable=True)
     
@@ -53,3 +59,7 @@ class Project(Base):
     tasks = relationship("Task", back_populates="project")
     project_goals = relationship("ProjectGoal", back_populates="project", cascade="all, delete-orphan")
     goals = relationship("Goal", back_populates="project")
+    
+    __table_args__ = (
+        Index("ix_projects_user_status", "user_id", "status"),
+    )
@@ -3,8 +3,8 @@
 
 任务是具体的行动项
 """
-from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Text, Enum, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, SmallInteger, String, Date, DateTime, ForeignKey, Text, Enum, Float, Index
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 import enum
 from app.db.database import Base
@@ -35,6 +35,23 @@ class TaskPriority(str, enum.Enum):
     URGENT = "urgent"     # 紧急 (4)
 
 
+# 优先级 <-> 整数等级（越大越优先），与接口中的数字优先级一致
+PRIORITY_RANKS = {TaskPriority.LOW: 1, TaskPriority.MEDIUM: 2, TaskPriority.HIGH: 3, TaskPriority.URGENT: 4}
+PRIORITIES_BY_RANK = {rank: priority for priority, rank in PRIORITY_RANKS.items()}
+
+
+def priority_rank(priority) -> int:
+    """优先级（枚举、取值 "high" 或库中存储的名称 "HIGH"）-> 整数等级，为空或无法识别时按中优先级"""
+    if isinstance(priority, str) and not isinstance(priority, TaskPriority):
+        priority = TaskPriority.__members__.get(priority) or TaskPriority._value2member_map_.get(priority)
+    return PRIORITY_RANKS.get(priority, PRIORITY_RANKS[TaskPriority.MEDIUM])
+
+
+def _default_priority_rank(context) -> int:
+    """插入时没有给出 priority_rank（例如 Core 批量插入）则由同一行的 priority 算出"""
+    return priority_rank(context.get_current_parameters().get("priority"))
+
+
 class Task(Base):
     """任务表"""
     __tablename__ = "tasks"
@@ -51,6 +68,9 @@ class Task(Base):
     task_type = Column(Enum(TaskType), default=TaskType.INBOX)
     status = Column(Enum(TaskStatus), default=TaskStatus.PENDING)
     priority = Column(Enum(TaskPriority), default=TaskPriority.MEDIUM)
+    # 优先级的整数等级（PRIORITY_RANKS），随 priority 一起写入，用于排序：
+    # 枚举按名称存储，按 priority 排序是字母序（URGENT > MEDIUM > LOW > HIGH）
+    priority_rank = Column(SmallInteger, nullable=False, default=_default_priority_rank, server_default="2")
     
     # 时间安排
     due_date = Column(Date, nullable=True)              # 截止日期
@@ -72,3 +92,25 @@ class Task(Base):
     # 关联关系
     user = relationship("User", back_populates="tasks")
     project = relationship("Project", back_populates="tasks")
+    
+    # 复合索引（所有视图都先按 user_id 过滤）
+    # - 日期索引带上 status / is_inbox，计数查询只走索引不回表
+    # - 按类型/状态筛选的视图以 created_at 结尾，列表排序不需要临时 B 树
+    # - 全部 / 已完成视图以 (created_at, id) 结尾，键集分页直接从游标位置开始读
+    # - 按优先级（从高到低）、截止日期排序的列表直接按索引顺序读取
+    __table_args__ = (
+        Index("ix_tasks_user_scheduled", "user_id", "scheduled_date", "status", "is_inbox"),
+        Index("ix_tasks_user_due", "user_id", "due_date", "status", "is_inbox"),
+        Index("ix_tasks_user_type_created", "user_id", "task_type", "created_at", "status"),
+        Index("ix_tasks_user_status_created_id", "user_id", "status", "created_at", "id"),
+        Index("ix_tasks_user_status_completed", "user_id", "status", "completed_at"),
+        Index("ix_tasks_user_created_id", "user_id", "created_at", "id"),
+        Index("ix_tasks_project_status", "project_id", "status"),
+        Index("ix_tasks_user_priority_due", "user_id", priority_rank.desc(), "due_date"),
+    )
+    
+    @validates("priority")
+    def _sync_priority_rank(self, key, value):
+        """通过 ORM 修改优先级时同步整数等级"""
+        self.priority_rank = priority_rank(value)
+        return value
@@ -0,0 +1 @@
+"""业务逻辑层（供 API 路由复用的查询与计算）"""
@@ -0,0 +1,81 @@
+"""
+日历引擎
+
+任意日期范围内的任务一次查出（计划日期或截止日期落在范围内，走 ix_tasks_user_scheduled /
+ix_tasks_user_due 两个索引的 MULTI-INDEX OR），再在内存中按日期分桶：
+- 任务出现在计划日期那一天；截止日期在范围内且不同于计划日期时，截止那天再出现一次（is_due 为 true）
+- 可选包含已完成任务、每天的习惯计划数 / 已打卡数（见 habit_heatmap，两条查询）
+
+周视图、月视图（6 周 42 格）和滚动日程（agenda）都基于 calendar_days。
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.models.task import TaskStatus
+from app.services.habit_heatmap import habit_heatmap
+from app.services.list_fields import TASK_LIST_FIELDS
+
+Task = models.Task
+
+# 日历中每个任务输出的字段
+CALENDAR_FIELDS = ["id", "title", "priority", "status", "scheduled_date", "due_date", "project_name"]
+_CALENDAR_OPTIONS = TASK_LIST_FIELDS.options(CALENDAR_FIELDS)
+
+# 月视图固定 6 周
+MONTH_GRID_DAYS = 42
+
+# 滚动日程最多向后看多少天
+AGENDA_MAX_DAYS = 90
+
+
+def calendar_tasks_statement(user_id: int, start: date, end: date,
+                             include_due: bool = True, include_completed: bool = False):
+    """[start, end] 内计划（或截止）的任务"""
+    in_range = and_(Task.scheduled_date >= start, Task.scheduled_date <= end)
+    if include_due:
+        in_range = or_(in_range, and_(Task.due_date >= start, Task.due_date <= end))
+    criteria = [Task.user_id == user_id, Task.is_inbox == 0, in_range]
+    if not include_completed:
+        criteria.append(Task.status != TaskStatus.COMPLETED)
+    return select(Task).where(*criteria).order_by(Task.id)
+
+
+async def calendar_days(
+    db: AsyncSession,
+    user_id: int,
+    start: date,
+    end: date,
+    include_due: bool = True,
+    include_completed: bool = False,
+    include_habits: bool = False,
+) -> List[Dict[str, Any]]:
+    """[start, end] 每天一项：{"date", "weekday", "tasks", "habits"（可选）}"""
+    days: Dict[date, List[Dict[str, Any]]] = {
+        start + timedelta(days=i): [] for i in range((end - start).days + 1)
+    }
+    statement = calendar_tasks_statement(user_id, start, end, include_due, include_completed)
+    tasks = (await db.execute(statement.options(*_CALENDAR_OPTIONS))).scalars().all()
+    for t in tasks:
+        item = TASK_LIST_FIELDS.render(t, CALENDAR_FIELDS)
+        if t.scheduled_date in days:
+            days[t.scheduled_date].append({**item, "is_due": t.due_date == t.scheduled_date})
+        if include_due and t.due_date in days and t.due_date != t.scheduled_date:
+            days[t.due_date].append({**item, "is_due": True})
+
+    result = [{"date": d.isoformat(), "weekday": d.weekday(), "tasks": items} for d, items in days.items()]
+    if include_habits:
+        heatmap = await habit_heatmap(db, user_id, start, end)
+        for day, target, done in zip(result, heatmap["targets"], heatmap["checkins"]):
+            day["habits"] = {"target": target, "done": done}
+    return result
+
+
+def month_grid_range(year: int, month: int):
+    """月视图 42 格的起止日期：从当月 1 日所在周的周一开始"""
+    first = date(year, month, 1)
+    start = first - timedelta(days=first.weekday())
+    return start, start + timedelta(days=MONTH_GRID_DAYS - 1)
@@ -0,0 +1,137 @@
+"""
+仪表盘聚合
+
+仪表盘的全部计数由两条语句算出，与数据量和计数项的多少无关：
+- 任务计数：一条 count(*) FILTER (WHERE ...) 条件聚合（见 task_queries.DASHBOARD_TASK_COUNTS）
+- 目标 / 习惯计数：一条语句中的多个标量子查询
+两条语句都在导入时构建好，用户和日期以绑定参数传入（task_query_params），每次只执行、不再编译。
+
+整个仪表盘接口（计数 + 项目列表 + Top 任务）的查询条数固定为 DASHBOARD_QUERY_BUDGET，
+由 python -m app.db.query_count 检查。
+
+仪表盘结果缓存在进程内（DashboardCache），键为 (用户, 本地日期)：计数依赖 date.today()，
+跨天自然换键。读写会话提交时如果写过数据，对应用户的缓存失效（见 app/services/data_version.py）。
+缓存只在当前进程内有效，多进程部署（uvicorn --workers）时其他进程的写入不会使其失效。
+"""
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.core.config import get_settings
+from app.models.goal import GoalStatus
+from app.services.data_version import on_data_change
+from app.services.task_queries import DASHBOARD_TASK_COUNTS, TODAY, USER_ID, task_query_params
+
+# 仪表盘接口的查询条数：任务计数、目标/习惯计数、项目列表、Top 任务
+DASHBOARD_QUERY_BUDGET = 4
+
+
+Goal, Habit, HabitLog = models.Goal, models.Habit, models.HabitLog
+
+# 活跃目标数、习惯总数、今日已打卡习惯数（一条语句）
+DASHBOARD_HABIT_GOAL_COUNTS = select(
+    select(func.count()).select_from(Goal).where(
+        Goal.user_id == USER_ID,
+        Goal.status == GoalStatus.ACTIVE
+    ).scalar_subquery().label("active_goals"),
+    select(func.count()).select_from(Habit).where(
+        Habit.user_id == USER_ID,
+        Habit.is_active == True,
+        Habit.is_archived == False
+    ).scalar_subquery().label("total_habits"),
+    select(func.count()).select_from(HabitLog).where(
+        HabitLog.user_id == USER_ID,
+        HabitLog.date == TODAY,
+        HabitLog.count > 0
+    ).scalar_subquery().label("completed_habits"),
+)
+
+
+async def dashboard_counters(db: AsyncSession, user_id: int, today: date) -> Dict[str, int]:
+    """仪表盘的全部计数（两条语句）"""
+    params = task_query_params(user_id, today)
+    counts = (await db.execute(DASHBOARD_TASK_COUNTS, params)).one()._asdict()
+    counts.update((await db.execute(DASHBOARD_HABIT_GOAL_COUNTS, params)).one()._asdict())
+    return counts
+
+
+class DashboardCache:
+    """
+    仪表盘结果缓存（LRU，最多 max_size 项，0 表示不缓存）
+
+    计算开始前取 generation()，put 时如果期间该用户的缓存已被失效则丢弃结果，
+    避免把提交前读到的旧数据写回缓存
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[Tuple[int, date], Dict[str, Any]]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self._global_generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def generation(self, user_id: int) -> Tuple[int, int]:
+        with self._lock:
+            return self._global_generation, self._generations.get(user_id, 0)
+
+    def get(self, user_id: int, day: date) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            payload = self._items.get((user_id, day))
+            if payload is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end((user_id, day))
+            self.hits += 1
+            return payload
+
+    def put(self, user_id: int, day: date, payload: Dict[str, Any], generation: Tuple[int, int]) -> None:
+        with self._lock:
+            if self.max_size <= 0:
+                return
+            if generation != (self._global_generation, self._generations.get(user_id, 0)):
+                return
+            self._items[(user_id, day)] = payload
+            self._items.move_to_end((user_id, day))
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """使某个用户（user_id 为空时所有用户）的缓存失效"""
+        with self._lock:
+            self.invalidations += 1
+            if user_id is None:
+                self._global_generation += 1
+                self._items.clear()
+                return
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for key in [k for k in self._items if k[0] == user_id]:
+                del self._items[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+dashboard_cache = DashboardCache(get_settings().DASHBOARD_CACHE_SIZE)
+
+# 提交写入后使对应用户的缓存失效
+on_data_change(dashboard_cache.invalidate)
@@ -0,0 +1,175 @@
+"""
+数据版本
+
+每个用户一个递增的版本号，读写会话提交时如果写过数据就加一（track_writes）。
+GET 接口的 ETag 由版本号生成（见 main.py 的 etag_middleware）：客户端带着匹配的
+If-None-Match 重新请求时直接返回 304，不查库也不传输响应体。
+
+- 版本号只在当前进程内有效，ETag 中带上进程启动标识，重启后旧 ETag 全部失效
+- 其他进程（命令行工具、uvicorn --workers）的写入不会推进本进程的版本号
+- 写入后需要额外处理的模块通过 on_data_change 注册回调（例如仪表盘缓存失效）；
+  需要知道具体改了哪些记录的（例如 SSE 事件推送）通过 on_changes 注册
+"""
+import threading
+import uuid
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+
+# 数据变化回调：参数为用户 id，None 表示无法确定用户（所有用户）
+DataChangeCallback = Callable[[Optional[int]], None]
+
+# 一次提交中的记录变化：{"type": 表名, "id": 主键或 None（批量语句）, "op": insert/update/delete, "user_id": ...}
+Change = Dict[str, Any]
+ChangesCallback = Callable[[List[Change]], None]
+
+# 对外推送变化的表（汇总表、迁移记录等内部表不推送）
+CHANGE_TABLES = {
+    "tasks", "projects", "project_goals", "goals", "key_results",
+    "habits", "habit_logs", "reviews",
+}
+
+
+class DataVersions:
+    """进程内的数据版本号：全局版本（无法确定用户的写入）+ 每个用户的版本"""
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._global = 0
+        self._users: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._global += 1
+            else:
+                self._users[user_id] = self._users.get(user_id, 0) + 1
+
+    def current(self, user_id: int) -> Tuple[int, int]:
+        with self._lock:
+            return self._global, self._users.get(user_id, 0)
+
+    def etag(self, user_id: int, day: date) -> str:
+        """
+        弱 ETag；带上本地日期，"今日"类数据跨天后不会误判为未变化
+        """
+        global_version, user_version = self.current(user_id)
+        return f'W/"{self.epoch}-{day:%Y%m%d}-{global_version}-{user_version}"'
+
+
+data_versions = DataVersions()
+
+_listeners: List[DataChangeCallback] = []
+_change_listeners: List[ChangesCallback] = []
+
+
+def on_data_change(callback: DataChangeCallback) -> DataChangeCallback:
+    """注册数据变化回调（在提交后调用）"""
+    _listeners.append(callback)
+    return callback
+
+
+def on_changes(callback: ChangesCallback) -> ChangesCallback:
+    """注册记录变化回调（在提交后调用，参数为本次提交的变化列表）"""
+    _change_listeners.append(callback)
+    return callback
+
+
+def notify_data_change(user_id: Optional[int] = None) -> None:
+    """推进版本号并通知回调；track_writes 之外的写入（例如批量导入）可以手动调用"""
+    data_versions.bump(user_id)
+    for callback in _listeners:
+        callback(user_id)
+
+
+# 项目变化中带上的新值（进度变化是客户端最关心的）
+PROJECT_CHANGE_FIELDS = ("progress", "total_tasks", "completed_tasks", "total_goals", "completed_goals")
+
+# 语句的执行选项：调用方已经用 record_change 逐行记下了变化，do_orm_execute 不再记录匿名的批量变化
+CHANGES_RECORDED = "changes_recorded"
+
+# 会话中写过数据的用户；ALL_USERS 表示无法确定用户（Core 语句、没有 user_id 的模型）
+_DIRTY_USERS = "dirty_users"
+_CHANGES = "changes"
+ALL_USERS = 0
+
+
+def _mark_dirty(session: Session, user_id: Optional[int]) -> None:
+    session.info.setdefault(_DIRTY_USERS, set()).add(user_id or ALL_USERS)
+
+
+def _record_change(session: Session, table: str, op: str, obj: Any = None) -> None:
+    if table not in CHANGE_TABLES:
+        return
+    change = {"type": table, "id": None, "op": op, "user_id": None}
+    if obj is not None:
+        change.update(id=getattr(obj, "id", None), user_id=getattr(obj, "user_id", None))
+        if table == "projects":
+            change.update((field, getattr(obj, field)) for field in PROJECT_CHANGE_FIELDS)
+        elif table == "tasks" and obj.status is not None:
+            change["status"] = obj.status.value
+    session.info.setdefault(_CHANGES, []).append(change)
+
+
+def session_changes(session: Session) -> List[Change]:
+    """会话中尚未提交的记录变化（提交前需要按变化做额外写入的模块使用，例如搜索索引）"""
+    return session.info.get(_CHANGES, [])
+
+
+def record_change(session: Session, table: str, op: str, row_id: Optional[int], user_id: Optional[int], **values: Any) -> None:
+    """
+    记下一条已知主键和用户的记录变化（Core 语句写入时由调用方提供，语句需带上 CHANGES_RECORDED 执行选项）
+
+    只推进该用户的版本号，推送的事件带上 id 和 values 中的新值
+    """
+    _mark_dirty(session, user_id)
+    if table in CHANGE_TABLES:
+        session.info.setdefault(_CHANGES, []).append(
+            {"type": table, "id": row_id, "op": op, "user_id": user_id, **values}
+        )
+
+
+def track_writes(session_factory: sessionmaker) -> None:
+    """
+    在读写会话上注册事件：flush 或执行 INSERT / UPDATE / DELETE 语句时记下涉及的用户和记录，
+    提交后推进版本号并通知回调，回滚则丢弃记录
+    """
+
+    @event.listens_for(session_factory, "after_flush")
+    def after_flush(session, flush_context):
+        for op, objs in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+            for obj in objs:
+                if op == "update" and not session.is_modified(obj):
+                    continue
+                _mark_dirty(session, getattr(obj, "user_id", None))
+                _record_change(session, obj.__table__.name, op, obj)
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def do_orm_execute(state):
+        if (state.is_insert or state.is_update or state.is_delete) and not state.execution_options.get(CHANGES_RECORDED):
+            _mark_dirty(state.session, None)
+            table = getattr(state.statement, "table", None)
+            if table is not None:
+                op = "insert" if state.is_insert else "update" if state.is_update else "delete"
+                _record_change(state.session, table.name, op)
+
+    @event.listens_for(session_factory, "after_commit")
+    def after_commit(session):
+        users: Set[int] = session.info.pop(_DIRTY_USERS, set())
+        changes: List[Change] = session.info.pop(_CHANGES, [])
+        if ALL_USERS in users:
+            notify_data_change(None)
+        else:
+            for user_id in users:
+                notify_data_change(user_id)
+        if changes:
+            for callback in _change_listeners:
+                callback(changes)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def after_rollback(session):
+        session.info.pop(_DIRTY_USERS, None)
+        session.info.pop(_CHANGES, None)
@@ -0,0 +1,136 @@
+"""
+实时事件推送（Server-Sent Events）
+
+读写会话提交后，track_writes 把本次提交的记录变化交给 EventBroker（on_changes），
+EventBroker 按用户扇出到每个订阅者的 asyncio.Queue：
+- change 事件：{"changes": [{"type": "tasks", "id": 5, "op": "update", "status": "completed"}, ...]}
+  批量语句（Core insert / update / delete）的 id 为 null，客户端按 type 重新拉取对应列表即可
+- counters 事件：仪表盘计数（dashboard_counters），每个用户每批提交只计算一次，所有订阅者共享；
+  计算期间又有提交时，发送后再计算一次，最后一条总是提交后的数据
+- resync 事件：订阅者消费太慢、队列已满时丢弃积压并发送，客户端应全量刷新
+
+提交发生在线程池中（同步接口），扇出通过 loop.call_soon_threadsafe 回到事件循环执行。
+"""
+import asyncio
+import json
+from datetime import date
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.config import get_settings
+from app.services.data_version import Change, on_changes
+
+settings = get_settings()
+
+
+def format_sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """一条 SSE 消息"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class EventBroker:
+    """按用户扇出事件；每个订阅者一个有界队列"""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._counter_tasks: Dict[int, asyncio.Task] = {}
+        # 计数任务运行期间又有提交的用户
+        self._counters_dirty: Set[int] = set()
+        self._next_id = 0
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        """在事件循环中调用"""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def publish_changes(self, changes: List[Change]) -> None:
+        """提交后调用（可能在线程池中）；没有订阅者时直接返回"""
+        loop = self._loop
+        if loop is None or not self._subscribers or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._dispatch_changes, changes)
+
+    def _dispatch_changes(self, changes: List[Change]) -> None:
+        by_user: Dict[Optional[int], List[Change]] = {}
+        for change in changes:
+            change = dict(change)
+            by_user.setdefault(change.pop("user_id"), []).append(change)
+        # 无法确定用户的变化（批量语句）发给所有订阅者
+        shared = by_user.pop(None, [])
+        for user_id in list(self._subscribers):
+            user_changes = by_user.get(user_id, []) + shared
+            if not user_changes:
+                continue
+            self._fanout(user_id, "change", {"changes": user_changes})
+            self._schedule_counters(user_id)
+
+    def _fanout(self, user_id: int, event: str, data: Any) -> None:
+        self._next_id += 1
+        message = format_sse(event, data, self._next_id)
+        for queue in list(self._subscribers.get(user_id, ())):
+            if queue.full():
+                # 消费太慢：丢弃积压，让客户端全量刷新
+                self.dropped += queue.qsize()
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(format_sse("resync", {}, self._next_id))
+                continue
+            queue.put_nowait(message)
+        self.published += 1
+
+    def _schedule_counters(self, user_id: int) -> None:
+        """合并同一用户连续的提交：计算中的任务还没结束就只做标记，由该任务发送后再计算一次"""
+        task = self._counter_tasks.get(user_id)
+        if task and not task.done():
+            self._counters_dirty.add(user_id)
+            return
+        self._counter_tasks[user_id] = asyncio.ensure_future(self._publish_counters(user_id))
+
+    async def _publish_counters(self, user_id: int) -> None:
+        # 让同一批提交的变化先全部到达
+        await asyncio.sleep(0.05)
+        while user_id in self._subscribers:
+            # 查询开始后到达的提交会重新标记：这次查询可能读到的是提交前的数据，需要再算一次
+            self._counters_dirty.discard(user_id)
+            counters = await load_counters(user_id)
+            self._fanout(user_id, "counters", counters)
+            if user_id not in self._counters_dirty:
+                return
+        self._counters_dirty.discard(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": sum(len(q) for q in self._subscribers.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+async def load_counters(user_id: int) -> Dict[str, int]:
+    """仪表盘计数（两条语句）"""
+    from app.db.database import AsyncSessionLocal
+    from app.services.dashboard import dashboard_counters
+
+    async with AsyncSessionLocal() as db:
+        return await dashboard_counters(db, user_id, date.today())
+
+
+event_broker = EventBroker(settings.SSE_QUEUE_SIZE)
+on_changes(event_broker.publish_changes)
@@ -0,0 +1,122 @@
+"""
+数据导出
+
+GET /api/export/{tasks|habit_logs|reviews}?format=csv|ndjson 导出当前用户的全部记录，
+边查边写，不把结果整体读进内存：
+- 按主键分批读取（WHERE id > 上一批最后的 id ORDER BY id LIMIT EXPORT_BATCH_SIZE），
+  每批在自己的短事务里读完就归还连接。不能一个事务读到底：响应要等最慢的客户端下载完，
+  默认配置（回滚日志模式）下读事务持有的 SHARED 锁会让所有写请求一直等下去
+- 每批行编码成一块字节直接交给 StreamingResponse 发送，内存占用与总行数无关，
+  导出十年的打卡记录和导出一周的一样
+- 用 Core 查询整行，不构造 ORM 对象
+
+字段名与数据库列名一致，枚举为取值、日期为 ISO 字符串；CSV 的空值为空字符串，NDJSON 为 null。
+CSV 开头带 UTF-8 BOM，Excel 直接打开中文不乱码。
+
+各批不在同一个快照中：导出期间新增的记录（id 更大）会出现在结果末尾，修改过的记录为读到那一批时的内容，
+每条记录只出现一次。
+吞吐和内存见 python -m app.db.export_benchmark
+"""
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterator
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.engine import Engine
+
+from app import models
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),  # StreamingResponse 会补上 charset=utf-8
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+# 导出类型 -> 表（按主键顺序读取，不需要额外排序）
+_TABLES = {
+    "tasks": models.Task.__table__,
+    "habit_logs": models.HabitLog.__table__,
+    "reviews": models.Review.__table__,
+}
+EXPORT_SOURCES = tuple(_TABLES)
+
+# 预先构建的查询语句：按主键分批读取
+_ROWS_AFTER = {
+    name: select(table)
+    .where(table.c.user_id == bindparam("user_id"), table.c.id > bindparam("after"))
+    .order_by(table.c.id)
+    .limit(bindparam("limit"))
+    for name, table in _TABLES.items()
+}
+
+
+def export_columns(kind: str) -> list:
+    """导出的字段名（CSV 表头）"""
+    return [column.name for column in _TABLES[kind].columns]
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(columns: list, partitions) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+    for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(["" if v is None else _value(v) for v in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_chunks(columns: list, partitions) -> Iterator[bytes]:
+    for rows in partitions:
+        yield "".join(
+            json.dumps(dict(zip(columns, map(_value, row))), ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+def _batches(engine: Engine, kind: str, user_id: int, batch_size: int) -> Iterator[list]:
+    """按主键分批读取，每批一个连接（一个短事务），发送这一批时不持有连接和锁"""
+    after = 0
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                _ROWS_AFTER[kind], {"user_id": user_id, "after": after, "limit": batch_size}
+            ).all()
+        if not rows:
+            return
+        yield rows
+        after = rows[-1].id
+
+
+def export_chunks(engine: Engine, kind: str, fmt: str, user_id: int, batch_size: int) -> Iterator[bytes]:
+    """
+    逐批生成导出内容（每批 batch_size 行编码成一块）
+
+    连接在生成器内部按批打开、读完即归还，不依赖请求的数据库会话：响应开始发送后会话就可能已经关闭
+    """
+    columns = export_columns(kind)
+    encode = _csv_chunks if fmt == "csv" else _ndjson_chunks
+    yield from encode(columns, _batches(engine, kind, user_id, batch_size))
+
+
+def export_filename(kind: str, fmt: str, today: date) -> str:
+    return f"lifeflow-{kind}-{today.isoformat()}.{EXPORT_FORMATS[fmt][1]}"
+
+
+def export_headers(kind: str, fmt: str, today: date) -> Dict[str, str]:
+    """下载响应头：附件文件名；关闭代理缓冲，边生成边发送"""
+    return {
+        "Content-Disposition": f'attachment; filename="{export_filename(kind, fmt, today)}"',
+        "X-Accel-Buffering": "no",
+    }
@@ -0,0 +1,71 @@
+"""
+习惯热力图
+
+任意日期范围（最长 HEATMAP_MAX_DAYS 天）只查两次库：
+- 一条 GROUP BY date 语句统计每天打卡的习惯数（走 ix_habit_logs_user_date）
+- 读取当前启用的习惯，计划数只和星期几有关（Habit.get_target_for_date），
+  先算出一周七天的计划数，再按日期展开
+
+返回紧凑的稠密数组（从 start 开始每天一个值），而不是每天一个对象：
+    {"start": "2025-10-18", "end": "2026-10-17", "days": 365,
+     "checkins": [...], "targets": [...], "values": [...]}
+values 为当天完成率（0-100，超额按 100 计；当天没有计划但有打卡也记 100）。
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+
+# 最长范围：5 年
+HEATMAP_MAX_DAYS = 366 * 5
+
+# 未指定起始日期时的默认范围：截止日期往前一年
+HEATMAP_DEFAULT_DAYS = 365
+
+
+def completion_value(checkins: int, target: int) -> int:
+    """当天完成率（0-100）"""
+    if target <= 0:
+        return 100 if checkins > 0 else 0
+    return min(round(checkins * 100 / target), 100)
+
+
+async def habit_heatmap(db: AsyncSession, user_id: int, start: date, end: date) -> Dict[str, Any]:
+    """[start, end] 每天的打卡习惯数、计划习惯数和完成率"""
+    HabitLog = models.HabitLog
+    days = (end - start).days + 1
+
+    rows = await db.execute(select(
+        HabitLog.date,
+        func.count()
+    ).where(
+        HabitLog.user_id == user_id,
+        HabitLog.date >= start,
+        HabitLog.date <= end,
+        HabitLog.count > 0
+    ).group_by(HabitLog.date))
+
+    checkins: List[int] = [0] * days
+    for day, count in rows:
+        checkins[(day - start).days] = count
+
+    habits = (await db.execute(select(models.Habit).where(
+        models.Habit.user_id == user_id,
+        models.Habit.is_active == True,
+        models.Habit.is_archived == False
+    ))).scalars().all()
+    # start 起连续 7 天恰好覆盖周一到周日
+    weekly = [sum(h.get_target_for_date(start + timedelta(days=i)) for h in habits) for i in range(7)]
+    targets = [weekly[i % 7] for i in range(days)]
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "days": days,
+        "checkins": checkins,
+        "targets": targets,
+        "values": [completion_value(c, t) for c, t in zip(checkins, targets)],
+    }
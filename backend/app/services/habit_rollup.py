@@ -0,0 +1,130 @@
+"""
+习惯每日汇总（habit_daily_rollup）
+
+打卡记录变化时在同一事务中更新对应日期的汇总行，读取方（热力图、复盘汇总）
+只需按日期范围读取预先聚合好的行。
+
+- 打卡 / 取消打卡：record_checkin(db, user_id, 日期, 次数变化量)
+- 删除习惯：打卡记录随习惯一起删除，remove_habit_checkins 只扣减该习惯有打卡的那些日期；
+  新增、修改习惯不影响已有的打卡次数，不需要更新汇总
+- 汇总与打卡记录不一致时（例如直接改库）可以全量重建：
+    python -m app.services.habit_rollup
+
+汇总表的写入用 Core 语句，带 CHANGES_RECORDED 执行选项并用 record_change 记下用户，
+只推进该用户的数据版本（不会让所有用户的 ETag、仪表盘缓存失效）
+"""
+from datetime import date
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.data_version import CHANGES_RECORDED, record_change
+
+HabitDailyRollup = models.HabitDailyRollup
+
+_RECORDED = {CHANGES_RECORDED: True}
+
+# 按日期扣减打卡次数（executemany）
+_SUBTRACT = (
+    HabitDailyRollup.__table__.update()
+    .where(HabitDailyRollup.user_id == bindparam("uid"), HabitDailyRollup.date == bindparam("day"))
+    .values(checkins=HabitDailyRollup.checkins - bindparam("delta"), updated_at=func.now())
+)
+
+
+def _record_rollup_change(db: Session, user_id: Optional[int]) -> None:
+    record_change(db, HabitDailyRollup.__tablename__, "update", None, user_id)
+
+
+def record_checkin(db: Session, user_id: int, day: date, delta: int) -> None:
+    """
+    打卡次数变化 delta 次（取消打卡为负数），更新当天的汇总行
+
+    不提交事务，由调用方和打卡记录一起提交；SQLite / PostgreSQL 使用 upsert 原子累加，
+    并发打卡同一天不会丢失更新
+    """
+    table = HabitDailyRollup.__table__
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert(table).values(user_id=user_id, date=day, checkins=delta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.date],
+            set_={"checkins": table.c.checkins + delta, "updated_at": func.now()},
+        )
+        db.execute(stmt, execution_options=_RECORDED)
+        _record_rollup_change(db, user_id)
+        return
+
+    row = db.get(HabitDailyRollup, (user_id, day))
+    if row:
+        row.checkins += delta
+    else:
+        db.add(HabitDailyRollup(user_id=user_id, date=day, checkins=delta))
+
+
+def remove_habit_checkins(db: Session, habit: models.Habit) -> int:
+    """
+    删除习惯前调用：从汇总中扣减该习惯各日期的打卡次数，返回涉及的日期数
+
+    一条分组查询 + 一条批量 UPDATE，只改这个习惯有打卡的日期；不提交事务，由调用方和删除一起提交
+    """
+    per_day = db.query(models.HabitLog.date, func.sum(models.HabitLog.count)).filter(
+        models.HabitLog.habit_id == habit.id
+    ).group_by(models.HabitLog.date).all()
+    rows = [{"uid": habit.user_id, "day": day, "delta": int(count or 0)} for day, count in per_day if count]
+    if rows:
+        db.execute(_SUBTRACT, rows, execution_options=_RECORDED)
+        _record_rollup_change(db, habit.user_id)
+    return len(rows)
+
+
+def rebuild_habit_rollup(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    根据打卡记录重建汇总（user_id 为空时重建所有用户），返回写入的行数
+
+    读取全部打卡记录，只用于迁移回填和命令行修复，不在请求中调用；不提交事务，由调用方提交
+    """
+    logs = db.query(
+        models.HabitLog.user_id,
+        models.HabitLog.date,
+        func.sum(models.HabitLog.count)
+    )
+    rollups = db.query(HabitDailyRollup)
+    if user_id is not None:
+        logs = logs.filter(models.HabitLog.user_id == user_id)
+        rollups = rollups.filter(HabitDailyRollup.user_id == user_id)
+    logs = logs.group_by(models.HabitLog.user_id, models.HabitLog.date).all()
+    rollups.execution_options(**_RECORDED).delete(synchronize_session=False)
+    _record_rollup_change(db, user_id)
+
+    rows = [{"user_id": uid, "date": day, "checkins": int(checkins or 0)} for uid, day, checkins in logs]
+    if rows:
+        db.execute(HabitDailyRollup.__table__.insert(), rows, execution_options=_RECORDED)
+    return len(rows)
+
+
+def daily_rollup(db: Session, user_id: int, start: date, end: date) -> Dict[date, HabitDailyRollup]:
+    """[start, end] 内有打卡的日期 -> 汇总行"""
+    rows = db.query(HabitDailyRollup).filter(
+        HabitDailyRollup.user_id == user_id,
+        HabitDailyRollup.date >= start,
+        HabitDailyRollup.date <= end
+    ).all()
+    return {r.date: r for r in rows}
+
+
+if __name__ == "__main__":
+    from app.db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        count = rebuild_habit_rollup(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"[ROLLUP] 已重建习惯每日汇总，共 {count} 行")
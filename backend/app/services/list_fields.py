@@ -0,0 +1,115 @@
+"""
+列表接口的字段选择（?fields=id,title,priority）
+
+每个列表接口在这里声明可选的输出字段：字段名 -> (需要加载的列, 取值函数, 需要的关联加载)。
+客户端传入 fields 时，SQL 只查询这些字段用到的列（load_only），关联只在需要时加载
+（加载方式见 app/services/loaders.py），
+JSON 也只输出这些字段；不传 fields 时输出全部字段，与原来的响应一致。
+id 总是输出；未声明的字段名直接报错（400），而不是静默忽略。
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import load_only
+
+from app import models
+from app.services.loaders import GOAL_KEY_RESULTS, TASK_PROJECT
+
+Task, Project, Goal, KeyResult = models.Task, models.Project, models.Goal, models.KeyResult
+
+# (需要加载的列, 取值函数, 关联加载选项)
+FieldSpec = Tuple[Sequence[Any], Callable[[Any], Any], Optional[Any]]
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class FieldSet:
+    """一个列表接口可选的输出字段"""
+
+    def __init__(self, fields: Dict[str, FieldSpec]):
+        self.fields = fields
+
+    def parse(self, fields: Optional[str]) -> List[str]:
+        """解析 fields 参数（逗号分隔），返回按声明顺序排列的字段名；有未知字段时抛出 ValueError"""
+        if not fields:
+            return list(self.fields)
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = sorted(requested - set(self.fields))
+        if unknown:
+            raise ValueError(f"不支持的字段: {', '.join(unknown)}（可选: {', '.join(self.fields)}）")
+        requested.add("id")
+        return [name for name in self.fields if name in requested]
+
+    def options(self, names: List[str]) -> List[Any]:
+        """查询选项：只加载用到的列和关联"""
+        columns = []
+        loaders = []
+        for name in names:
+            spec_columns, _, loader = self.fields[name]
+            columns.extend(c for c in spec_columns if c not in columns)
+            if loader is not None and loader not in loaders:
+                loaders.append(loader)
+        return [load_only(*columns), *loaders]
+
+    def render(self, obj: Any, names: List[str]) -> Dict[str, Any]:
+        return {name: self.fields[name][1](obj) for name in names}
+
+
+TASK_LIST_FIELDS = FieldSet({
+    "id": ((Task.id,), lambda t: t.id, None),
+    "title": ((Task.title,), lambda t: t.title, None),
+    "description": ((Task.description,), lambda t: t.description, None),
+    "task_type": ((Task.task_type,), lambda t: t.task_type.value, None),
+    "status": ((Task.status,), lambda t: t.status.value, None),
+    "priority": ((Task.priority_rank,), lambda t: t.priority_rank, None),
+    "due_date": ((Task.due_date,), lambda t: _iso(t.due_date), None),
+    "scheduled_date": ((Task.scheduled_date,), lambda t: _iso(t.scheduled_date), None),
+    "scheduled_type": ((Task.scheduled_type,), lambda t: t.scheduled_type, None),
+    "estimated_pomodoros": ((Task.estimated_pomodoros,), lambda t: t.estimated_pomodoros, None),
+    "actual_pomodoros": ((Task.actual_pomodoros,), lambda t: t.actual_pomodoros, None),
+    "project_id": ((Task.project_id,), lambda t: t.project_id, None),
+    "project_name": ((Task.project_id,), lambda t: t.project.name if t.project else None, TASK_PROJECT),
+    "is_inbox": ((Task.is_inbox,), lambda t: t.is_inbox, None),
+    "completed_at": ((Task.completed_at,), lambda t: _iso(t.completed_at), None),
+    "created_at": ((Task.created_at,), lambda t: _iso(t.created_at), None),
+})
+
+PROJECT_LIST_FIELDS = FieldSet({
+    "id": ((Project.id,), lambda p: p.id, None),
+    "name": ((Project.name,), lambda p: p.name, None),
+    "description": ((Project.description,), lambda p: p.description, None),
+    "status": ((Project.status,), lambda p: p.status.value, None),
+    "progress": ((Project.progress,), lambda p: p.progress, None),
+    "target_date": ((Project.target_date,), lambda p: _iso(p.target_date), None),
+    "created_at": ((Project.created_at,), lambda p: _iso(p.created_at), None),
+    "total_tasks": ((Project.total_tasks,), lambda p: p.total_tasks, None),
+    "completed_tasks": ((Project.completed_tasks,), lambda p: p.completed_tasks, None),
+})
+
+
+def _key_result(kr: KeyResult) -> Dict[str, Any]:
+    return {
+        "id": kr.id,
+        "title": kr.title,
+        "target_value": kr.target_value,
+        "current_value": kr.current_value,
+        "unit": kr.unit,
+        "is_completed": kr.is_completed
+    }
+
+
+GOAL_LIST_FIELDS = FieldSet({
+    "id": ((Goal.id,), lambda g: g.id, None),
+    "title": ((Goal.title,), lambda g: g.title, None),
+    "description": ((Goal.description,), lambda g: g.description, None),
+    "period": ((Goal.period,), lambda g: g.period.value, None),
+    "year": ((Goal.year,), lambda g: g.year, None),
+    "quarter": ((Goal.quarter,), lambda g: g.quarter, None),
+    "month": ((Goal.month,), lambda g: g.month, None),
+    "area": ((Goal.area,), lambda g: g.area, None),
+    "status": ((Goal.status,), lambda g: g.status.value, None),
+    "progress": ((Goal.progress,), lambda g: g.progress, None),
+    "created_at": ((Goal.created_at,), lambda g: _iso(g.created_at), None),
+    "key_results": ((), lambda g: [_key_result(kr) for kr in g.key_results], GOAL_KEY_RESULTS),
+})
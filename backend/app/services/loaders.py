@@ -0,0 +1,29 @@
+"""
+关联加载策略
+
+序列化时访问的关联（task.project、goal.key_results、project.project_goals）如果不预先加载，
+每一行都会触发一次懒加载查询（N+1）。各接口用到的关联在这里集中声明加载方式，
+查询时带上对应的选项：
+
+- 多对一（task.project）：joinedload，LEFT OUTER JOIN 不会放大主查询的行数，
+  和 LIMIT / 键集分页兼容，少一次往返；只加载序列化用到的列
+- 一对多（goal.key_results、project.project_goals）：subqueryload，把主查询作为子查询 JOIN 子表，
+  无论多少行都只多一条查询；不用 joinedload（主查询行数会乘上子行数），
+  也不用 selectinload（每 500 个主键一批，行数多时查询条数随之增长）
+
+每个接口的查询条数由 python -m app.db.query_count 检查：1 / 10 / 1000 行时条数必须相同且等于预算。
+"""
+from sqlalchemy.orm import joinedload, subqueryload
+
+from app import models
+
+Task, Project, Goal = models.Task, models.Project, models.Goal
+
+# 任务所属项目（只需要项目名）
+TASK_PROJECT = joinedload(Task.project).load_only(Project.id, Project.name)
+
+# 目标的关键结果
+GOAL_KEY_RESULTS = subqueryload(Goal.key_results)
+
+# 项目的里程碑
+PROJECT_MILESTONES = subqueryload(Project.project_goals)
@@ -0,0 +1,188 @@
+"""
+项目计数与进度（Project.total_tasks / completed_tasks / total_goals / completed_goals / progress）
+
+任务、里程碑（ProjectGoal）新增、删除、完成、取消完成、移动到其他项目时，在同一事务中对相关项目做增量更新
+（UPDATE ... SET total_tasks = total_tasks + n，并发写入不会互相覆盖），进度在同一条 UPDATE 中
+由更新后的计数算出，不需要再统计任务表或读出所有里程碑，5000 个任务的项目和 5 个任务的项目开销相同。
+
+进度：项目有里程碑时按里程碑完成比例，没有里程碑时按任务完成比例（0-100，保留一位小数）。
+
+调用方式：修改任务前记下 task_counter_state(task)，修改后调用
+apply_task_counter_change(db, 修改前状态, task_counter_state(task))，再提交事务；
+里程碑同理（goal_counter_state / apply_goal_counter_change）。
+
+计数出现偏差（例如直接改库）时用 reconcile_project_counters 按任务表、里程碑表重新核对：
+    python -m app.services.project_counters
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, case, func, literal, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.models.task import TaskStatus
+from app.services.data_version import CHANGES_RECORDED, PROJECT_CHANGE_FIELDS, record_change
+
+Project = models.Project
+ProjectGoal = models.ProjectGoal
+Task = models.Task
+
+# (所属项目 id, 是否已完成)
+TaskCounterState = Tuple[Optional[int], bool]
+
+# 不属于任何项目 / 已删除的任务或里程碑
+NO_PROJECT: TaskCounterState = (None, False)
+
+
+def project_progress_expression(total_tasks, completed_tasks, total_goals, completed_goals):
+    """由计数算进度的 SQL 表达式（参数可以是字段，也可以是"字段 + 变化量"）"""
+    return case(
+        (total_goals > 0, func.round(completed_goals * 100.0 / total_goals, 1)),
+        (total_tasks > 0, func.round(completed_tasks * 100.0 / total_tasks, 1)),
+        else_=0.0,
+    )
+
+
+def task_counter_state(task: models.Task) -> TaskCounterState:
+    """任务对项目计数的影响"""
+    return task.project_id, task.status == TaskStatus.COMPLETED
+
+
+def goal_counter_state(goal: models.ProjectGoal) -> TaskCounterState:
+    """里程碑对项目计数的影响"""
+    return goal.project_id, bool(goal.is_completed)
+
+
+def task_counter_deltas(before: TaskCounterState, after: TaskCounterState) -> Dict[int, List[int]]:
+    """任务（或里程碑）从 before 变为 after 时各项目的计数变化 {项目 id: [总数变化, 完成数变化]}"""
+    deltas: Dict[int, List[int]] = {}
+    for (project_id, completed), sign in ((before, -1), (after, 1)):
+        if project_id is None:
+            continue
+        delta = deltas.setdefault(project_id, [0, 0])
+        delta[0] += sign
+        delta[1] += sign if completed else 0
+    return deltas
+
+
+# 更新计数后读出的新值（记录到会话的变化中，提交后推送给客户端）
+_UPDATED_PROJECTS = select(
+    Project.__table__.c.id, Project.__table__.c.user_id,
+    *(Project.__table__.c[field] for field in PROJECT_CHANGE_FIELDS),
+).where(Project.__table__.c.id.in_(bindparam("ids", expanding=True)))
+
+
+def _apply_project_deltas(db: Session, deltas: Dict[int, Sequence[int]], goals: bool) -> None:
+    """
+    按 {项目 id: (总数变化, 完成数变化)} 更新任务或里程碑计数，同时重算进度（一条 UPDATE，executemany）
+
+    再用一条查询读出这些项目的新进度和计数，逐个记为项目变化（推送的事件带 id 和新进度，
+    只推进所属用户的数据版本）；executemany 的 UPDATE 不支持 RETURNING
+    """
+    params = [
+        {"project_id": project_id, "total_delta": total, "completed_delta": completed}
+        for project_id, (total, completed) in deltas.items()
+        if total or completed
+    ]
+    if not params:
+        return
+    table = Project.__table__
+    counts = {
+        "total_tasks": table.c.total_tasks,
+        "completed_tasks": table.c.completed_tasks,
+        "total_goals": table.c.total_goals,
+        "completed_goals": table.c.completed_goals,
+    }
+    total_key, completed_key = ("total_goals", "completed_goals") if goals else ("total_tasks", "completed_tasks")
+    counts[total_key] = counts[total_key] + bindparam("total_delta")
+    counts[completed_key] = counts[completed_key] + bindparam("completed_delta")
+    db.execute(
+        update(table)
+        .where(table.c.id == bindparam("project_id"))
+        .values(
+            **{total_key: counts[total_key], completed_key: counts[completed_key]},
+            progress=project_progress_expression(**counts),
+        )
+        .execution_options(**{CHANGES_RECORDED: True}),
+        params,
+    )
+    for row in db.execute(_UPDATED_PROJECTS, {"ids": [p["project_id"] for p in params]}).mappings():
+        record_change(db, "projects", "update", row["id"], row["user_id"],
+                      **{field: row[field] for field in PROJECT_CHANGE_FIELDS})
+
+
+def apply_project_task_deltas(db: Session, deltas: Dict[int, Sequence[int]]) -> None:
+    """
+    按 {项目 id: (总数变化, 完成数变化)} 更新项目任务计数和进度（不提交事务）
+
+    所有项目共用一条 UPDATE 语句以 executemany 方式执行
+    """
+    _apply_project_deltas(db, deltas, goals=False)
+
+
+def apply_task_counter_change(db: Session, before: TaskCounterState, after: TaskCounterState) -> None:
+    """单个任务变化后更新相关项目的计数和进度（不提交事务）"""
+    apply_project_task_deltas(db, task_counter_deltas(before, after))
+
+
+def apply_goal_counter_change(db: Session, before: TaskCounterState, after: TaskCounterState) -> None:
+    """单个里程碑变化后更新所属项目的里程碑计数和进度（不提交事务）"""
+    _apply_project_deltas(db, task_counter_deltas(before, after), goals=True)
+
+
+def reconcile_project_counters(db: Session, project_ids: Optional[Sequence[int]] = None) -> List[dict]:
+    """
+    按任务表、里程碑表重新统计并修正项目计数和进度（project_ids 为空时检查所有项目），返回被修正的项目
+
+    任务、里程碑各一次分组查询统计所有项目，只更新有偏差的行；不提交事务
+    """
+    task_counts = db.query(
+        Task.project_id,
+        func.count(Task.id),
+        func.count(Task.id).filter(Task.status == TaskStatus.COMPLETED)
+    ).filter(Task.project_id != None)
+    goal_counts = db.query(
+        ProjectGoal.project_id,
+        func.count(ProjectGoal.id),
+        func.count(ProjectGoal.id).filter(ProjectGoal.is_completed == True)
+    )
+    projects = db.query(
+        Project.id, Project.total_tasks, Project.completed_tasks, Project.total_goals, Project.completed_goals
+    )
+    if project_ids is not None:
+        task_counts = task_counts.filter(Task.project_id.in_(project_ids))
+        goal_counts = goal_counts.filter(ProjectGoal.project_id.in_(project_ids))
+        projects = projects.filter(Project.id.in_(project_ids))
+    tasks = {pid: (total, completed) for pid, total, completed in task_counts.group_by(Task.project_id)}
+    goals = {pid: (total, completed) for pid, total, completed in goal_counts.group_by(ProjectGoal.project_id)}
+
+    repaired = []
+    for project_id, *stored in projects.all():
+        expected = tasks.get(project_id, (0, 0)) + goals.get(project_id, (0, 0))
+        if tuple(stored) != expected:
+            db.execute(
+                update(Project)
+                .where(Project.id == project_id)
+                .values(
+                    total_tasks=expected[0], completed_tasks=expected[1],
+                    total_goals=expected[2], completed_goals=expected[3],
+                    progress=project_progress_expression(*map(literal, expected)),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            repaired.append({"project_id": project_id, "before": tuple(stored), "after": expected})
+    return repaired
+
+
+if __name__ == "__main__":
+    from app.db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        repaired = reconcile_project_counters(db)
+        db.commit()
+    finally:
+        db.close()
+    for item in repaired:
+        print(f"[COUNTER] 项目 {item['project_id']}: {item['before']} -> {item['after']}")
+    print(f"[COUNTER] 核对完成，修正 {len(repaired)} 个项目")
@@ -0,0 +1,155 @@
+"""
+全文搜索
+
+在 search_index（见 app/db/search_index.py）上按关键字搜索任务、项目、目标和复盘：
+- 多个关键字（空格分隔）必须同时出现；含汉字的关键字按相邻短语匹配，
+  以英文 / 数字结尾的关键字做前缀匹配（"read" 能搜到 "reading"）
+- 排序：bm25 要先统计每个关键字在全库的命中数（IDF），常见词命中几十万条时光统计就要上百毫秒。
+  所以先探测每个关键字的命中数（最多数到 SEARCH_BM25_MAX_MATCHES 条）：
+  - 都没超过：按 bm25 排序（标题命中的权重更高，见 SEARCH_RANK），score 为 bm25 分数，越小越相关
+  - 有关键字超过：常见词的 IDF 接近 0，bm25 分数已经区分不出相关度，改为标题命中的排在前面、
+    同一档内按记录 id 从新到旧，只需倒序顺序读倒排表，score 为 null
+- 返回高亮后的标题和正文片段：先做 HTML 转义，再用 <mark></mark> 包住命中的部分，前端可以直接渲染
+"""
+import html
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.search_index import CJK_CHARS, SEARCH_SOURCES, SEARCH_TABLE, SEARCH_TYPE_COUNT, search_tokens
+
+SEARCH_TYPES = tuple(SEARCH_SOURCES)
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_MAX_QUERY_LENGTH = 200
+SEARCH_MAX_TERMS = 8
+SEARCH_BM25_MAX_MATCHES = 5000
+
+# 正文片段最多包含多少个词（汉字按一个词计）
+SNIPPET_TOKENS = 24
+
+# 高亮标记：查询时先用控制字符占位，转义后再换成 HTML 标签
+_MARK_OPEN, _MARK_CLOSE = "\x01", "\x02"
+_CJK_GAP = re.compile(f"(?<=[{CJK_CHARS}])([{_MARK_OPEN}{_MARK_CLOSE}]?) ([{_MARK_OPEN}{_MARK_CLOSE}]?)(?=[{CJK_CHARS}])")
+_WORD = re.compile(r"\w")
+
+_COLUMNS = (
+    f"kind, rowid / {SEARCH_TYPE_COUNT} AS id, "
+    f"highlight({SEARCH_TABLE}, 0, :open, :close) AS title, "
+    f"snippet({SEARCH_TABLE}, 1, :open, :close, '…', {SNIPPET_TOKENS}) AS snippet"
+)
+_WHERE = f"{SEARCH_TABLE} MATCH :{{param}} AND user_id = :user_id"
+
+# 按 bm25 排序（类型过滤用 rowid 上的类型编号：放进 MATCH 的话 bm25 还要统计 kind 词的命中数）
+_RANKED = (
+    f"SELECT {_COLUMNS}, rank AS score FROM {SEARCH_TABLE} WHERE {_WHERE.format(param='match')} "
+    f"{{kind_filter}}ORDER BY rank LIMIT :limit OFFSET :offset"
+)
+
+# 标题命中在前，同一档按 rowid 倒序（每档最多取 limit + offset 条）
+_RECENT = text(
+    f"SELECT kind, id, title, snippet, NULL AS score FROM ("
+    f"SELECT * FROM (SELECT {_COLUMNS}, rowid AS pos, 0 AS tier FROM {SEARCH_TABLE} "
+    f"WHERE {_WHERE.format(param='title_match')} ORDER BY rowid DESC LIMIT :depth) "
+    f"UNION ALL "
+    f"SELECT * FROM (SELECT {_COLUMNS}, rowid AS pos, 1 AS tier FROM {SEARCH_TABLE} "
+    f"WHERE {_WHERE.format(param='body_match')} ORDER BY rowid DESC LIMIT :depth)"
+    f") ORDER BY tier, pos DESC LIMIT :limit OFFSET :offset"
+)
+
+
+def match_phrases(q: str) -> List[str]:
+    """用户输入 -> 每个关键字一个 FTS5 短语；没有文字的关键字（纯标点）忽略"""
+    phrases = []
+    for term in q[:SEARCH_MAX_QUERY_LENGTH].split():
+        if not _WORD.search(term):
+            continue
+        phrase = '"' + search_tokens(term).replace('"', '""') + '"'
+        if not re.search(f"[{CJK_CHARS}]$", term):
+            phrase += "*"
+        phrases.append(phrase)
+    return phrases[:SEARCH_MAX_TERMS]
+
+
+def _in_text(expression: str) -> str:
+    """只在标题和正文中匹配（kind 列也是索引列，不加限制时搜 "task" 会命中所有任务）"""
+    return f"{{title body}} : ({expression})"
+
+
+def build_match_queries(phrases: Sequence[str], types: Sequence[str]) -> Dict[str, str]:
+    """MATCH 表达式：match（bm25 排序用）/ title_match（标题命中）/ body_match（只有正文命中）"""
+    terms = " AND ".join(phrases)
+    kind_filter = ""
+    if len(types) < len(SEARCH_TYPES):
+        kind_filter = " AND kind : (" + " OR ".join(types) + ")"
+    return {
+        "match": _in_text(terms),
+        "title_match": _in_text(terms) + f" AND title : ({terms})" + kind_filter,
+        "body_match": _in_text(terms) + f" NOT title : ({terms})" + kind_filter,
+    }
+
+
+def ranked_statement(types: Sequence[str]):
+    """按 bm25 排序的搜索语句"""
+    kind_filter = ""
+    if len(types) < len(SEARCH_TYPES):
+        codes = ", ".join(str(SEARCH_SOURCES[t].code) for t in types)
+        kind_filter = f"AND rowid % {SEARCH_TYPE_COUNT} IN ({codes}) "
+    return text(_RANKED.format(kind_filter=kind_filter))
+
+
+async def use_bm25(db: AsyncSession, phrases: Sequence[str]) -> bool:
+    """每个关键字的命中数都不超过 SEARCH_BM25_MAX_MATCHES 时才按 bm25 排序（一条查询探测所有关键字）"""
+    probes = ", ".join(
+        f"(SELECT count(*) FROM (SELECT 1 FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :p{i} LIMIT :cap))"
+        for i in range(len(phrases))
+    )
+    params = {f"p{i}": _in_text(phrase) for i, phrase in enumerate(phrases)}
+    counts = (await db.execute(text(f"SELECT {probes}"), {**params, "cap": SEARCH_BM25_MAX_MATCHES + 1})).one()
+    return max(counts) <= SEARCH_BM25_MAX_MATCHES
+
+
+def render_highlight(value: Optional[str]) -> str:
+    """去掉索引时在汉字之间加的空格，转义 HTML，把高亮占位符换成 <mark>"""
+    if not value:
+        return ""
+    value = _CJK_GAP.sub(r"\1\2", value)
+    value = value.replace(f"{_MARK_CLOSE} {_MARK_OPEN}", " ").replace(f"{_MARK_CLOSE}{_MARK_OPEN}", "")
+    return html.escape(value).replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+async def search(
+    db: AsyncSession,
+    user_id: int,
+    q: str,
+    types: Optional[Sequence[str]] = None,
+    limit: int = SEARCH_DEFAULT_LIMIT,
+    offset: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    搜索 types 中的记录（为空表示全部类型），返回排好序的
+    {"type", "id", "title", "snippet", "score"}；两条查询（探测命中数 + 搜索）
+    """
+    phrases = match_phrases(q)
+    if not phrases:
+        return []
+    types = list(types or SEARCH_TYPES)
+    params = {
+        **build_match_queries(phrases, types),
+        "user_id": user_id, "limit": limit, "offset": offset, "depth": limit + offset,
+        "open": _MARK_OPEN, "close": _MARK_CLOSE,
+    }
+    statement = ranked_statement(types) if await use_bm25(db, phrases) else _RECENT
+    rows = (await db.execute(statement, params)).all()
+    return [
+        {
+            "type": row.kind,
+            "id": row.id,
+            "title": render_highlight(row.title),
+            "snippet": render_highlight(row.snippet),
+            "score": None if row.score is None else round(row.score, 4),
+        }
+        for row in rows
+    ]
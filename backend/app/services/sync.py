@@ -0,0 +1,103 @@
+"""
+增量同步
+
+客户端保存上次同步返回的 cursor，之后用 GET /api/sync?since=cursor 只取此后新增、修改、删除的记录，
+不需要在每次修改后重新加载整个列表（变更日志见 app/db/sync_journal.py）：
+- 新增和修改都在 upserts 中（完整的行，字段名与数据库列名一致，枚举为取值、日期为 ISO 字符串），
+  删除在 deletes 中（只有 id）；同一条记录在区间内改了多次也只返回一次最新状态
+- 一次最多 limit 条，has_more 为 true 时用返回的 cursor 继续请求
+- since=0 即全量同步；reset 为 true 表示游标已失效（日志重建过，或者游标比服务端最新的还大，
+  例如数据库恢复成了旧备份），本次返回的是从头开始的第一页，客户端应先清空本地数据
+
+游标就是变更日志的 seq。SQLite 同一时间只有一个写事务，seq 的分配顺序就是提交顺序，
+不会出现"游标之前的 seq 晚提交"而被跳过的情况。
+
+仅 SQLite：PostgreSQL 上多个写事务并发，seq 的分配顺序不是提交顺序，直接拿 seq 当游标会漏掉晚提交的变化，
+因此没有变更日志。响应中的 supported 标明服务端是否支持增量同步，为 false 时（sync_unsupported）
+没有任何变化、游标不变，客户端应改为重新加载完整列表。
+
+查询条数：游标校验一条 + 变更日志一条 + 每种有新增 / 修改的表各一条
+"""
+import enum
+from datetime import date, datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models  # 导入模型，保证所有表都已注册到 Base.metadata
+from app.db.database import Base
+from app.db.sync_journal import RESET_ENTITY, SYNC_SOURCES, SYNC_TABLE
+
+SYNC_DEFAULT_LIMIT = 500
+SYNC_MAX_LIMIT = 2000
+
+# 最新的 seq、最近一次重建日志时的重置标记
+_BOUNDS = text(
+    f"SELECT (SELECT max(seq) FROM {SYNC_TABLE}) AS latest, "
+    f"(SELECT max(seq) FROM {SYNC_TABLE} WHERE entity = '{RESET_ENTITY}') AS reset_at"
+)
+
+# 某个用户 since 之后的变化（索引 (user_id, seq)）
+_JOURNAL = text(
+    f"SELECT seq, entity, row_id, deleted FROM {SYNC_TABLE} "
+    f"WHERE user_id = :user_id AND seq > :since ORDER BY seq LIMIT :limit"
+)
+
+# 每张表按 id 批量读取当前行的语句（预先构建）
+_ROWS = {
+    name: select(Base.metadata.tables[name]).where(
+        Base.metadata.tables[name].c.id.in_(bindparam("ids", expanding=True))
+    )
+    for name in SYNC_SOURCES
+}
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+async def changes_since(db: AsyncSession, user_id: int, since: int, limit: int = SYNC_DEFAULT_LIMIT) -> Dict[str, Any]:
+    """
+    since 之后的变化：{"supported", "cursor", "has_more", "reset", "changes": {表名: {"upserts": [...], "deletes": [...]}}}
+
+    changes 中只包含有变化的表
+    """
+    bounds = (await db.execute(_BOUNDS)).one()
+    latest = bounds.latest or 0
+    reset = since > 0 and (since > latest or since < (bounds.reset_at or 0))
+    if reset:
+        since = 0
+
+    journal = (await db.execute(_JOURNAL, {"user_id": user_id, "since": since, "limit": limit + 1})).all()
+    has_more = len(journal) > limit
+    journal = journal[:limit]
+
+    upsert_ids: Dict[str, List[int]] = {}
+    changes: Dict[str, Dict[str, list]] = {}
+    for _, entity, row_id, deleted in journal:
+        entry = changes.setdefault(entity, {"upserts": [], "deletes": []})
+        if deleted:
+            entry["deletes"].append(row_id)
+        else:
+            upsert_ids.setdefault(entity, []).append(row_id)
+
+    for entity, ids in upsert_ids.items():
+        rows = (await db.execute(_ROWS[entity], {"ids": ids})).mappings().all()
+        changes[entity]["upserts"] = [{key: _json_value(value) for key, value in row.items()} for row in rows]
+
+    # 没有更多变化时游标直接推进到最新：区间内其他用户的变化不用再扫一遍
+    if journal:
+        cursor = journal[-1][0] if has_more else max(journal[-1][0], latest)
+    else:
+        cursor = max(since, latest)
+    return {"supported": True, "cursor": cursor, "has_more": has_more, "reset": reset, "changes": changes}
+
+
+def sync_unsupported(since: int) -> Dict[str, Any]:
+    """不支持增量同步的数据库（非 SQLite）的响应：supported 为 false，没有变化，游标原样返回"""
+    return {"supported": False, "cursor": since, "has_more": False, "reset": False, "changes": {}}
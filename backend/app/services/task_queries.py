@@ -0,0 +1,322 @@
+"""
+任务查询条件
+
+任务列表的各个视图和仪表盘的计数都在这里定义过滤条件，
+接口和查询计划检查（app.db.query_plan）共用同一份定义，
+保证被检查的 SQL 就是线上实际执行的 SQL。
+
+条件中的用户、日期、游标、分页行数都是具名绑定参数，固定的语句只构建一次（见"预构建语句"），
+执行时传入 task_query_params() 等函数算出的参数。
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple
+
+from sqlalchemy import Date, DateTime, Integer, String, and_, bindparam, func, or_, select, tuple_, type_coerce
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.sql.visitors import InternalTraversal
+
+from app import models
+from app.models.task import TaskType, TaskStatus
+from app.services.list_fields import TASK_LIST_FIELDS
+
+Task = models.Task
+
+
+class rarely(ColumnElement):
+    """
+    选择性提示：告诉查询规划器该条件只命中少量行
+
+    SQLite 的统计信息只有平均值，不知道"未完成任务"只占历史任务的一小部分，
+    遇到 OR 条件时会放弃多索引合并而全表扫描。在 SQLite 上渲染为 likelihood(条件, 0.01)，
+    其他数据库（PostgreSQL 有列值分布统计）原样输出条件。
+    """
+    inherit_cache = True
+    _traverse_internals = [("clause", InternalTraversal.dp_clauseelement)]
+
+    def __init__(self, clause):
+        self.clause = clause
+
+
+@compiles(rarely)
+def _compile_rarely(element, compiler, **kw):
+    return compiler.process(element.clause, **kw)
+
+
+@compiles(rarely, "sqlite")
+def _compile_rarely_sqlite(element, compiler, **kw):
+    return f"likelihood({compiler.process(element.clause, **kw)}, 0.01)"
+
+# 任务列表支持的视图
+TASK_VIEWS = ("all", "today", "week", "overdue", "inbox", "todo", "someday", "trash", "completed")
+
+
+def week_range(today: date):
+    """本周的周一和周日"""
+    week_start = today - timedelta(days=today.weekday())
+    return week_start, week_start + timedelta(days=6)
+
+
+# ==================== 绑定参数 ====================
+USER_ID = bindparam("user_id", type_=Integer)
+TODAY = bindparam("today", type_=Date)
+WEEK_START = bindparam("week_start", type_=Date)
+WEEK_END = bindparam("week_end", type_=Date)
+# completed_at 是时间字段，与日期字段分开绑定（同名参数只能有一种类型）
+TODAY_START = bindparam("today_start", type_=DateTime)
+WEEK_START_AT = bindparam("week_start_at", type_=DateTime)
+
+
+def task_query_params(user_id: int, today: date) -> Dict[str, Any]:
+    """视图 / 仪表盘语句的参数：用户和由今天推出的各个日期"""
+    week_start, week_end = week_range(today)
+    return {
+        "user_id": user_id,
+        "today": today,
+        "week_start": week_start,
+        "week_end": week_end,
+        "today_start": datetime.combine(today, time.min),
+        "week_start_at": datetime.combine(week_start, time.min),
+    }
+
+
+def task_view_filters(view: str) -> List:
+    """任务列表某个视图的过滤条件（不含 user_id，日期为绑定参数）"""
+    if view == "inbox":
+        # 收件箱：未分类的任务（task_type=inbox 且未完成的）
+        return [Task.task_type == TaskType.INBOX, Task.status != TaskStatus.COMPLETED]
+    if view == "today":
+        # 今天：计划今天做 或 截止今天 或 已逾期（包含已完成）
+        return [
+            Task.is_inbox == 0,
+            ((Task.scheduled_date == TODAY) |
+             (Task.due_date == TODAY) |
+             ((Task.due_date < TODAY) & (Task.due_date != None))),
+        ]
+    if view == "week":
+        # 本周：截止日期或计划日期在本周（包含已完成）
+        return [
+            Task.is_inbox == 0,
+            ((Task.due_date >= WEEK_START) & (Task.due_date <= WEEK_END)) |
+            ((Task.scheduled_date >= WEEK_START) & (Task.scheduled_date <= WEEK_END)),
+        ]
+    if view == "overdue":
+        # 已逾期：截止日期已过且未完成
+        return [
+            Task.status != TaskStatus.COMPLETED,
+            Task.due_date < TODAY,
+            Task.due_date != None,
+        ]
+    if view == "todo":
+        # 待办清单：已整理且未完成的任务
+        return [Task.status != TaskStatus.COMPLETED, Task.is_inbox == 0]
+    if view == "someday":
+        # 将来也许：task_type=someday 且未完成的
+        return [Task.task_type == TaskType.SOMEDAY, Task.status != TaskStatus.COMPLETED]
+    if view == "trash":
+        # 垃圾箱：task_type=trash
+        return [Task.task_type == TaskType.TRASH]
+    if view == "completed":
+        # 已完成
+        return [Task.status == TaskStatus.COMPLETED]
+    return []
+
+
+def dashboard_task_counters() -> Dict[str, List]:
+    """仪表盘上各个任务计数的过滤条件（不含 user_id，日期为绑定参数）"""
+    return {
+        # 今日待办任务（计划今天做 或 截止今天 或 已逾期）
+        "today_pending": [
+            Task.status != TaskStatus.COMPLETED,
+            Task.is_inbox == 0,
+            ((Task.scheduled_date == TODAY) |
+             (Task.due_date == TODAY) |
+             ((Task.due_date < TODAY) & (Task.due_date != None))),
+        ],
+        # 今日已完成任务
+        "today_completed": [
+            Task.status == TaskStatus.COMPLETED,
+            Task.completed_at >= TODAY_START,
+        ],
+        # 逾期任务总数
+        "overdue": [
+            Task.status != TaskStatus.COMPLETED,
+            Task.due_date < TODAY,
+            Task.due_date != None,
+        ],
+        # 收集箱未整理任务
+        "inbox": [
+            Task.task_type == TaskType.INBOX,
+            Task.status != TaskStatus.COMPLETED,
+        ],
+        # 本周已完成
+        "week_completed": [
+            Task.status == TaskStatus.COMPLETED,
+            Task.completed_at >= WEEK_START_AT,
+        ],
+        # 本周计划/截止的任务总数
+        "week_total": [
+            ((Task.scheduled_date >= WEEK_START) & (Task.scheduled_date <= TODAY)) |
+            ((Task.due_date >= WEEK_START) & (Task.due_date <= TODAY)),
+        ],
+    }
+
+
+def dashboard_task_scope():
+    """
+    仪表盘各计数条件的并集
+
+    单次聚合时放在 WHERE 中，只读取可能被计入的任务（未完成的、本周完成的、本周计划/截止的），
+    每个分支都能走索引，历史已完成任务不会被扫描
+    """
+    # 未完成状态逐个写成等值条件（IN 列表包在 likelihood 中时 SQLite 无法使用索引）
+    open_statuses = [rarely(Task.status == s) for s in TaskStatus if s != TaskStatus.COMPLETED]
+    return or_(
+        *open_statuses,
+        rarely(and_(Task.status == TaskStatus.COMPLETED, Task.completed_at >= WEEK_START_AT)),
+        rarely(and_(Task.scheduled_date >= WEEK_START, Task.scheduled_date <= TODAY)),
+        rarely(and_(Task.due_date >= WEEK_START, Task.due_date <= TODAY)),
+    )
+
+
+def top_task_filters() -> List:
+    """仪表盘今日 Top 任务的过滤条件（不含 user_id，日期为绑定参数）"""
+    return [
+        Task.status != TaskStatus.COMPLETED,
+        Task.is_inbox == 0,
+        ((Task.scheduled_date == TODAY) | (Task.due_date == TODAY)),
+    ]
+
+
+# ==================== 键集分页 ====================
+# 任务列表按 (created_at, id) 倒序分页：下一页的条件是 (created_at, id) < 上一页最后一行，
+# 沿索引 (user_id, created_at, id) / (user_id, status, created_at, id) 直接定位，
+# 翻到第几页、历史任务有多少都只读取 limit 行，不需要 OFFSET
+TASK_PAGE_DEFAULT = 50
+TASK_PAGE_MAX = 200
+
+# 列表排序（分页与不分页一致）
+TASK_LIST_ORDER = (Task.created_at.desc(), Task.id.desc())
+
+# 查询时一并取出 created_at 的原始值，用于生成游标
+task_cursor_column = type_coerce(Task.created_at, String).label("cursor_created_at")
+
+
+class _CursorTimestamp(TypeDecorator):
+    """
+    游标中的 created_at
+
+    SQLite 以文本存储时间，服务端默认值（CURRENT_TIMESTAMP）不带微秒、Python 写入的带微秒，
+    把游标转换回 datetime 再按 SQLAlchemy 的格式绑定会和原值对不上，因此按原始文本比较
+    （与 ORDER BY 的文本排序一致）；其他数据库按时间类型比较
+    """
+    impl = String
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(String())
+        return dialect.type_descriptor(DateTime(timezone=True))
+
+    def process_bind_param(self, value, dialect):
+        if dialect.name == "sqlite":
+            return value
+        return datetime.fromisoformat(value)
+
+    def process_literal_param(self, value, dialect):
+        return self.process_bind_param(value, dialect)
+
+
+def encode_task_cursor(created_at, task_id: int) -> str:
+    """游标：上一页最后一行的 (created_at 原始值, id)，base64 编码，对客户端不透明"""
+    raw = json.dumps([str(created_at), task_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_task_cursor(cursor: str) -> Tuple[str, int]:
+    """解析游标，格式不对时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, task_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise ValueError("无效的游标") from e
+    if not isinstance(created_at, str) or not isinstance(task_id, int):
+        raise ValueError("无效的游标")
+    return created_at, task_id
+
+
+# 游标之后（更早创建）的任务，参数见 task_keyset_params
+TASK_KEYSET_FILTER = tuple_(Task.created_at, Task.id) < tuple_(
+    bindparam("cursor_created_at", type_=_CursorTimestamp()),
+    bindparam("cursor_id", type_=Integer),
+)
+
+
+def task_keyset_params(cursor: str) -> Dict[str, Any]:
+    """游标 -> TASK_KEYSET_FILTER 的参数，格式不对时抛出 ValueError"""
+    created_at, task_id = decode_task_cursor(cursor)
+    return {"cursor_created_at": created_at, "cursor_id": task_id}
+
+
+# ==================== 预构建语句 ====================
+# 固定的视图 / 计数语句只构建一次：同一个语句对象的缓存键 SQLAlchemy 只计算一次，
+# 编译出的 SQL 存在引擎的编译缓存中（容量见 SQL_COMPILED_CACHE_SIZE），
+# 之后的请求只传参数，不再构建表达式树、也不再编译
+
+# 仪表盘全部任务计数的单条聚合语句：每个计数是一个 count(*) FILTER (WHERE ...)，
+# 在数据库端一次扫描完成（PostgreSQL 和 SQLite 3.30+ 都支持 FILTER 子句）
+DASHBOARD_TASK_COUNTS = select(*[
+    func.count().filter(and_(*criteria)).label(name)
+    for name, criteria in dashboard_task_counters().items()
+]).where(Task.user_id == USER_ID, dashboard_task_scope())
+
+# 仪表盘今日 Top 任务
+DASHBOARD_TOP_TASKS = select(Task).where(
+    Task.user_id == USER_ID,
+    *top_task_filters()
+).order_by(Task.priority_rank.desc(), Task.created_at.desc()).limit(3)
+
+# 任务列表语句的缓存项数（视图 × 常用的 fields 组合 × 是否分页 / 有游标）
+TASK_LIST_STATEMENT_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=TASK_LIST_STATEMENT_CACHE_SIZE)
+def _task_list_statement(view: str, names: Tuple[str, ...], paginate: bool, after_cursor: bool):
+    statement = select(Task, task_cursor_column).options(*TASK_LIST_FIELDS.options(list(names))).where(
+        Task.user_id == USER_ID,
+        *task_view_filters(view)
+    ).order_by(*TASK_LIST_ORDER)
+    if after_cursor:
+        statement = statement.where(TASK_KEYSET_FILTER)
+    if paginate:
+        statement = statement.limit(bindparam("limit", type_=Integer))
+    return statement
+
+
+def task_list_statement(view: str, names: Sequence[str], paginate: bool = False, after_cursor: bool = False):
+    """
+    任务列表语句（按 视图、输出字段、是否分页、是否带游标 缓存）
+
+    参数：task_query_params()，带游标时加 task_keyset_params()，分页时加 limit
+    """
+    if view not in TASK_VIEWS:
+        view = "all"
+    return _task_list_statement(view, tuple(names), paginate, after_cursor)
+
+
+def task_statement_cache_stats() -> Dict[str, Any]:
+    """任务列表语句缓存的命中情况"""
+    info = _task_list_statement.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_ratio": round(info.hits / lookups, 4) if lookups else 0,
+    }
@@ -63,8 +63,8 @@ export const dashboardAPI = {
 
 // ==================== 目标 API ====================
 export const goalAPI = {
-  list: (period?: string, year?: number) =>
-    apiClient.get('/api/goals/', { params: { period, year } }),
+  list: (period?: string, year?: number, fields?: string) =>
+    apiClient.get('/api/goals/', { params: { period, year, fields } }),
   
   create: (data: { title: string; period: string; start_date: string; target_date?: string }) =>
     apiClient.post('/api/goals/', data),
@@ -95,7 +95,7 @@ export const goalsAPI = {
 
 // ==================== 项目 API ====================
 export const projectAPI = {
-  list: () => apiClient.get('/api/projects/'),
+  list: (fields?: string) => apiClient.get('/api/projects/', { params: { fields } }),
   
   get: (id: number) => apiClient.get(`/api/projects/${id}`),
   
@@ -130,12 +130,25 @@ export const projectAPI = {
 // ==================== 任务 API ====================
 export const taskAPI = {
   // 获取任务列表，支持多种视图：all/today/week/overdue/inbox/todo/completed
-  list: (view: string = 'all') =>
-    apiClient.get('/api/tasks/', { params: { view } }),
+  // fields：只返回指定字段（逗号分隔，例如 'id,title,priority'），不传则返回全部字段
+  list: (view: string = 'all', fields?: string) =>
+    apiClient.get('/api/tasks/', { params: { view, fields } }),
+  
+  // 分页获取任务列表：返回 { items, next_cursor }，next_cursor 为 null 表示没有下一页
+  listPage: (view: string = 'all', limit: number = 50, cursor?: string | null) =>
+    apiClient.get('/api/tasks/', { params: { view, limit, cursor: cursor || undefined } }),
   
   // 获取本周日历数据
   getWeekCalendar: (year?: number, week?: number) =>
     apiClient.get('/api/tasks/week-calendar', { params: { year, week } }),
+
+  // 月视图（42 格，in_month 标记是否属于当月）
+  getMonthCalendar: (year?: number, month?: number, options?: { include_completed?: boolean; include_habits?: boolean }) =>
+    apiClient.get('/api/tasks/month-calendar', { params: { year, month, ...options } }),
+  
+  // 滚动日程：从 start（默认今天）起 days 天内有任务的日期
+  getAgenda: (start?: string, days: number = 14, options?: { include_completed?: boolean; include_habits?: boolean }) =>
+    apiClient.get('/api/tasks/agenda', { params: { start, days, ...options } }),
   
   // 获取任务统计（用于已完成视图）
   getStats: () => apiClient.get('/api/tasks/stats'),
@@ -164,6 +177,14 @@ export const taskAPI = {
   
   // 删除任务
   delete: (id: number) => apiClient.delete(`/api/tasks/${id}`),
+
+  // 批量操作（一个事务内执行，任一操作不合法则整批不执行）
+  batch: (operations: {
+    op: 'create' | 'update' | 'complete' | 'reopen' | 'delete';
+    id?: number;
+    data?: any;
+    actual_pomodoros?: number;
+  }[]) => apiClient.post('/api/tasks/batch', { operations }),
 };
 
 // ==================== 习惯 API ====================
@@ -173,6 +194,10 @@ export const habitAPI = {
   getWeek: (year?: number, week?: number) =>
     apiClient.get('/api/habits/week', { params: { year, week } }),
   
+  // 打卡热力图：从 start 开始每天一个值（checkins / targets / values 等长数组）
+  getHeatmap: (start?: string, end?: string) =>
+    apiClient.get('/api/habits/heatmap', { params: { start, end } }),
+  
   toggle: (habitId: number, date: string, count?: number) =>
     apiClient.post('/api/habits/toggle', { habit_id: habitId, date, count }),
   
@@ -278,5 +303,44 @@ export const reviewsAPI = {
   delete: (id: number) => apiClient.delete(`/api/reviews/${id}`),
 };
 
+// ==================== 全文搜索 API ====================
+export const searchAPI = {
+  // 搜索任务/项目/目标/复盘：title、snippet 已做 HTML 转义，命中部分用 <mark> 包住
+  // types：逗号分隔的类型过滤，例如 'task,project'，不传则搜全部
+  search: (q: string, types?: string, limit: number = 20, offset: number = 0) =>
+    apiClient.get('/api/search', { params: { q, types, limit, offset } }),
+};
+
+// ==================== 增量同步 API ====================
+export const syncAPI = {
+  // since 之后新增/修改（upserts，完整行）和删除（deletes，id）的记录，按表分组
+  // 保存返回的 cursor 作为下次的 since；has_more 为 true 时继续请求；reset 为 true 时先清空本地数据
+  // supported 为 false 表示服务端不支持增量同步（PostgreSQL），改为重新加载完整列表
+  changes: (since: number = 0, limit: number = 500) =>
+    apiClient.get('/api/sync', { params: { since, limit } }),
+};
+
+// ==================== 数据导出 API ====================
+export const exportAPI = {
+  // 下载地址（服务端流式生成 CSV / NDJSON 附件），直接赋给 <a href> 或 window.location 即可，不经过 axios 缓冲
+  url: (kind: 'tasks' | 'habit_logs' | 'reviews', format: 'csv' | 'ndjson' = 'csv') =>
+    `${apiClient.defaults.baseURL}/api/export/${kind}?format=${format}`,
+};
+
+// ==================== 实时事件（SSE） ====================
+// 订阅数据变化：change 为本次提交改动的记录，counters 为最新的仪表盘计数，
+// resync 表示事件积压被丢弃，需要全量刷新。返回取消订阅函数
+export const subscribeEvents = (handlers: {
+  onChange?: (changes: { type: string; id: number | null; op: string; [key: string]: any }[]) => void;
+  onCounters?: (counters: Record<string, number>) => void;
+  onResync?: () => void;
+}) => {
+  const source = new EventSource(`${apiClient.defaults.baseURL}/api/events`);
+  source.addEventListener('change', (e) => handlers.onChange?.(JSON.parse((e as MessageEvent).data).changes));
+  source.addEventListener('counters', (e) => handlers.onCounters?.(JSON.parse((e as MessageEvent).data)));
+  source.addEventListener('resync', () => handlers.onResync?.());
+  return () => source.close();
+};
+
 // 导出默认实例
 export default apiClient;